@@ -3,6 +3,17 @@ ASGI config for Hotel_management project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Run it with any ASGI server, for example::
+
+    uvicorn Hotel_management.asgi:application --workers 4
+    daphne -b 0.0.0.0 -p 8000 Hotel_management.asgi:application
+
+The read paths have native async views under /hotels/async/ (hotel page,
+availability calendar and reservations list) that use the async ORM and do not
+occupy a worker thread while waiting on the database. The remaining views run in
+Django's sync thread pool. ``manage.py loadtest_read_paths`` compares WSGI and
+ASGI throughput on these endpoints.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 """
@@ -39,6 +39,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'hotels.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -52,7 +53,8 @@ ROOT_URLCONF = 'Hotel_management.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # The stock Django backend, with renders timed for the request metrics.
+        'BACKEND': 'hotels.request_metrics.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates']
         ,
         'APP_DIRS': True,
@@ -71,12 +73,132 @@ WSGI_APPLICATION = 'Hotel_management.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
+# HOTELS_DB_PROFILE picks the backend: "sqlite" for development and single-host deployments,
+# "postgres" when bookings arrive from several worker processes at once.
+
+DATABASE_PROFILES = {
+    'sqlite': {
+        # Accepts the Django 5.1 "init_command" and "transaction_mode" options on 5.0.
+        'ENGINE': 'hotels.backends.sqlite3',
+        'NAME': os.environ.get('HOTELS_DB_NAME', BASE_DIR / 'db.sqlite3'),
+        'OPTIONS': {
+            # Seconds a writer waits for the lock before giving up with "database is locked".
+            'timeout': int(os.environ.get('HOTELS_DB_BUSY_TIMEOUT', 20)),
+            'transaction_mode': 'IMMEDIATE',
+            # WAL lets readers carry on while a booking writes; synchronous=NORMAL is durable
+            # across application crashes in WAL mode and only fsyncs at checkpoints. journal_mode is
+            # stored in the file, so the first connection converts the checked-in db.sqlite3 to WAL
+            # (a one-time change to its header); the -wal and -shm files next to it are gitignored.
+            'init_command': (
+                'PRAGMA journal_mode=WAL;'
+                'PRAGMA synchronous=NORMAL;'
+                'PRAGMA cache_size=-20000;'
+                'PRAGMA temp_store=MEMORY;'
+                'PRAGMA mmap_size=134217728;'
+            ),
+        },
+    },
+    'postgres': {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('HOTELS_DB_NAME', 'hotels'),
+        'USER': os.environ.get('HOTELS_DB_USER', 'hotels'),
+        'PASSWORD': os.environ.get('HOTELS_DB_PASSWORD', ''),
+        'HOST': os.environ.get('HOTELS_DB_HOST', '127.0.0.1'),
+        'PORT': os.environ.get('HOTELS_DB_PORT', '5432'),
+        # Keep connections open between requests instead of reconnecting for each one, and
+        # check them before reuse so a restarted server does not surface as a failed request.
+        'CONN_MAX_AGE': int(os.environ.get('HOTELS_DB_CONN_MAX_AGE', 300)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'connect_timeout': 5,
+        },
+    },
+}
 
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': DATABASE_PROFILES[os.environ.get('HOTELS_DB_PROFILE', 'sqlite')],
+}
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# HOTELS_CACHE_BACKEND picks the backend: "locmem" for development, "file" or "redis"
+# when several worker processes must share cached pages.
+
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'hotels',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('HOTELS_CACHE_LOCATION', os.path.join(BASE_DIR, 'cache')),
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('HOTELS_CACHE_LOCATION', 'redis://127.0.0.1:6379/1'),
+    },
+}
+
+CACHES = {
+    'default': CACHE_BACKENDS[os.environ.get('HOTELS_CACHE_BACKEND', 'locmem')],
+}
+
+# Seconds a rendered hotel page fragment is kept; edits in the admin invalidate it sooner.
+HOTEL_DETAIL_CACHE_TIMEOUT = 600
+
+# Seconds the set of hotels a guest is registered at is remembered between requests.
+HOTEL_REGISTRATION_CACHE_TIMEOUT = 300
+
+# Seconds a service's compiled pricing rules are kept; rule and service edits invalidate them sooner.
+PRICING_CACHE_TIMEOUT = 3600
+
+# Days ahead for which each service's bookable slots are generated and cached
+# (see the precompute_schedules command), and how long those cache entries live.
+SCHEDULE_HORIZON_DAYS = 90
+SCHEDULE_CACHE_TIMEOUT = 2 * 24 * 3600
+
+# Seconds a guest's selected slots stay held for them (see the sweep_slot_holds command).
+SLOT_HOLD_TIMEOUT = 300
+
+# Days of past reservations kept in the live tables; older ones are moved to the archive
+# by the archive_reservations command.
+RESERVATION_RETENTION_DAYS = 365
+
+# Room-service intake: "sync" writes each request inside the view. "queue" accepts requests with
+# 202 and writes them in batches from a background thread in each worker process; requests still
+# in memory are lost if the process is killed or recycled, so it is opt-in.
+ROOM_SERVICE_INTAKE = os.environ.get('ROOM_SERVICE_INTAKE', 'sync')
+ROOM_SERVICE_QUEUE_BATCH_SIZE = 100
+
+# Request metrics: requests slower than this many milliseconds are logged, as is any SQL statement
+# run this many times within one request (a likely N+1).
+REQUEST_METRICS_SLOW_MS = int(os.environ.get('REQUEST_METRICS_SLOW_MS', 500))
+REQUEST_METRICS_REPEATED_QUERIES = 10
+
+# Logging
+# https://docs.djangoproject.com/en/5.0/topics/logging/
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'logfmt': {
+            'format': 'time={asctime} level={levelname} logger={name} {message}',
+            'style': '{',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'logfmt',
+        },
+    },
+    'loggers': {
+        'hotels': {
+            'handlers': ['console'],
+            'level': os.environ.get('HOTELS_LOG_LEVEL', 'INFO'),
+        },
+    },
 }
 
 # Password validation
@@ -125,6 +247,9 @@ LOGOUT_REDIRECT_URL = 'hotel_detail'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Widths of the resized variants made for uploaded images; service cards are 350 CSS pixels wide.
+THUMBNAIL_WIDTHS = (350, 700)
+
 # Static files (CSS, JavaScript, Images)
 STATIC_URL = '/static/'
 
@@ -135,3 +260,15 @@ STATICFILES_DIRS = [
 
 # Directory where collectstatic will collect static files for production
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+
+# Outside DEBUG, collectstatic fingerprints every file and writes .gz (and, with the brotli
+# package installed, .br) copies of text assets; serve_static serves them with immutable caching.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': ('django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+                    else 'hotels.storage.CompressedManifestStaticFilesStorage'),
+    },
+}
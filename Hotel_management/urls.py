@@ -1,7 +1,9 @@
 from django.contrib import admin
-from django.urls import path, include
+import re
+
+from django.urls import path, include, re_path
 from django.conf import settings
-from hotels.views import hotel_detail
+from hotels.views import hotel_detail, serve_static
 from django.conf.urls.static import static
 
 urlpatterns = [
@@ -12,3 +14,9 @@ urlpatterns = [
 
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+else:
+    # runserver serves static files while DEBUG is on; otherwise the collected, fingerprinted and
+    # pre-compressed files are served from STATIC_ROOT by the app itself.
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.+)$' % re.escape(settings.STATIC_URL.lstrip('/')), serve_static),
+    ]
@@ -1,7 +1,17 @@
 # admin.py
-from django.contrib import admin
+import io
+
+from django.contrib import admin, messages
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils.timezone import now
+
+from . import booking, roster
+from .forms import RosterImportForm
 from .models import Hotel, CustomUser, HotelRegisteredUser, Service, AvailableTime, Reservation, RoomService, \
-    RoomServiceRequest
+    RoomServiceRequest, SlotAvailability, DailyRollup, PricingRule, ServiceSchedule, OpeningHours, BlackoutDate, \
+    SlotHold, ArchivedReservation
 
 
 @admin.register(Hotel)
@@ -17,6 +27,51 @@ class CustomUserAdmin(admin.ModelAdmin):
 @admin.register(HotelRegisteredUser)
 class HotelRegisteredUserAdmin(admin.ModelAdmin):
     list_display = ('hotel', 'private_number', 'email')
+    list_select_related = ('hotel',)
+    search_fields = ('private_number', 'email')
+    change_list_template = 'admin/hotels/hotelregistereduser/change_list.html'
+    max_reported_errors = 20
+
+    def get_urls(self):
+        return [
+            path('import/', self.admin_site.admin_view(self.import_roster), name='hotels_hotelregistereduser_import'),
+        ] + super().get_urls()
+
+    def import_roster(self, request):
+        if not self.has_add_permission(request) or not self.has_change_permission(request):
+            return redirect('admin:hotels_hotelregistereduser_changelist')
+
+        form = RosterImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            upload, hotel = form.cleaned_data['roster'], form.cleaned_data['hotel']
+            file_format = form.cleaned_data['file_format'] or roster.guess_format(upload.name)
+            errors = []
+
+            def report(line, message):
+                if len(errors) < self.max_reported_errors:
+                    errors.append(f'line {line}: {message}')
+
+            # Large uploads are spooled to disk by Django; read them back as a text stream.
+            source = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+            importer = roster.RosterImport(hotel.pk if hotel else None, on_error=report)
+            result = importer.run(roster.read_rows(source, file_format))
+            self.message_user(request, f'Created {result.created}, updated {result.updated}, '
+                                       f'rejected {result.failed} row(s).',
+                              messages.WARNING if result.failed else messages.SUCCESS)
+            for error in errors:
+                self.message_user(request, error, messages.ERROR)
+            if result.failed > len(errors):
+                self.message_user(request, f'... and {result.failed - len(errors)} more rejected row(s); '
+                                           f'run the import_roster command with --errors for the full list.',
+                                  messages.ERROR)
+            return redirect('admin:hotels_hotelregistereduser_changelist')
+
+        return TemplateResponse(request, 'admin/hotels/hotelregistereduser/import_roster.html', {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'form': form,
+            'title': 'Import guest roster',
+        })
 
 
 @admin.register(Service)
@@ -26,12 +81,30 @@ class ServiceAdmin(admin.ModelAdmin):
 
 @admin.register(AvailableTime)
 class TakenDateAdmin(admin.ModelAdmin):
-    list_display = ('service', 'start_time', 'end_time', 'is_reserved')
+    list_display = ('service', 'start_time', 'end_time', 'capacity', 'remaining', 'is_reserved')
+    list_select_related = ('service',)
 
 
 @admin.register(Reservation)
 class ReservationAdmin(admin.ModelAdmin):
     list_display = ('user', 'service', 'reservation_date', 'reserved_for')
+    list_select_related = ('user', 'service', 'reserved_for__service')
+    actions = ['cancel_upcoming']
+
+    @admin.action(description='Cancel selected upcoming reservations')
+    def cancel_upcoming(self, request, queryset):
+        outcomes = booking.cancel_reservations(list(queryset.values_list('pk', flat=True)))
+        cancelled = list(outcomes.values()).count(booking.CANCELLED)
+        self.message_user(request, f'{cancelled} reservation(s) cancelled; '
+                                   f'{len(outcomes) - cancelled} had already started.')
+
+
+@admin.register(ArchivedReservation)
+class ArchivedReservationAdmin(admin.ModelAdmin):
+    list_display = ('user', 'hotel_name', 'service_name', 'start_time', 'price', 'archived_at')
+    list_filter = ('hotel',)
+    list_select_related = ('user',)
+    date_hierarchy = 'start_time'
 
 
 @admin.register(RoomService)
@@ -42,3 +115,55 @@ class RoomServiceAdmin(admin.ModelAdmin):
 @admin.register(RoomServiceRequest)
 class RoomServiceRequestAdmin(admin.ModelAdmin):
     list_display = ('user', 'room_service', 'request_date', 'status')
+    list_filter = ('status', 'room_service__hotel')
+    list_select_related = ('user', 'room_service')
+    actions = ['mark_completed']
+
+    @admin.action(description='Mark selected requests as Completed')
+    def mark_completed(self, request, queryset):
+        updated = queryset.filter(status='Pending').update(status='Completed', updated_at=now())
+        self.message_user(request, f'{updated} request(s) marked as Completed.')
+
+
+@admin.register(SlotHold)
+class SlotHoldAdmin(admin.ModelAdmin):
+    list_display = ('service', 'user', 'start_time', 'expires_at')
+    list_select_related = ('service', 'user')
+
+
+@admin.register(SlotAvailability)
+class SlotAvailabilityAdmin(admin.ModelAdmin):
+    list_display = ('service', 'day', 'reserved_slots')
+    list_filter = ('service',)
+
+
+class OpeningHoursInline(admin.TabularInline):
+    model = OpeningHours
+    extra = 0
+
+
+class BlackoutDateInline(admin.TabularInline):
+    model = BlackoutDate
+    extra = 0
+
+
+@admin.register(ServiceSchedule)
+class ServiceScheduleAdmin(admin.ModelAdmin):
+    list_display = ('service', 'slot_minutes', 'capacity')
+    list_select_related = ('service',)
+    inlines = [OpeningHoursInline, BlackoutDateInline]
+
+
+@admin.register(PricingRule)
+class PricingRuleAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'factor', 'hotel', 'service', 'start_time', 'end_time', 'weekdays', 'min_hours', 'active')
+    list_filter = ('kind', 'active', 'hotel')
+    list_select_related = ('hotel', 'service')
+
+
+@admin.register(DailyRollup)
+class DailyRollupAdmin(admin.ModelAdmin):
+    list_display = ('hotel', 'service', 'day', 'booked_hours', 'revenue', 'room_service_requests')
+    list_filter = ('hotel',)
+    list_select_related = ('hotel', 'service')
+    date_hierarchy = 'day'
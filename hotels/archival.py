@@ -0,0 +1,98 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.timezone import localtime
+
+from hotels import availability, booking
+from hotels.models import ArchivedReservation, AvailableTime, Reservation, SlotAvailability
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1000
+
+
+def retention_days():
+    return getattr(settings, 'RESERVATION_RETENTION_DAYS', 365)
+
+
+def cutoff(days=None):
+    """Start of the oldest day kept live; reservations for slots before it are archived."""
+    days = retention_days() if days is None else days
+    return availability.day_bounds(localtime().date() - timedelta(days=days))[0]
+
+
+def _archived(reservation):
+    slot, service = reservation.reserved_for, reservation.service
+    return ArchivedReservation(
+        id=reservation.id, user_id=reservation.user_id, hotel_id=service.hotel_id, service_id=service.id,
+        hotel_name=service.hotel.name, service_name=service.name, hourly_price=service.price,
+        reservation_date=reservation.reservation_date, start_time=slot.start_time, end_time=slot.end_time,
+        price=reservation.price,
+    )
+
+
+def archive_chunk(before, chunk_size=CHUNK_SIZE):
+    """Move the oldest ``chunk_size`` reservations for slots starting before ``before`` into the archive.
+
+    One short transaction per chunk, so an interrupted run loses nothing and simply resumes
+    with the next chunk. The bitmaps of the chunk's days are refreshed as it goes. Returns
+    ``(reservations, slots)`` removed from the live tables.
+    """
+    with transaction.atomic():
+        reservations = list(Reservation.objects.select_for_update(of=('self',)).filter(
+            reserved_for__start_time__lt=before
+        ).select_related('service__hotel', 'reserved_for').order_by('id')[:chunk_size])
+        if not reservations:
+            return 0, 0
+        ArchivedReservation.objects.bulk_create([_archived(reservation) for reservation in reservations],
+                                                ignore_conflicts=True)
+        # Without the delete signals: they would recount the slots being removed anyway and
+        # recompute the rollups, which keep counting archived history.
+        booking.delete_reservations([reservation.id for reservation in reservations])
+        slots = AvailableTime.objects.filter(
+            pk__in={reservation.reserved_for_id for reservation in reservations}, reservation__isnull=True
+        ).delete()[1].get(AvailableTime._meta.label, 0)
+        for service_id, day in sorted({(reservation.service_id, localtime(reservation.reserved_for.start_time).date())
+                                       for reservation in reservations}):
+            availability.refresh_day(service_id, day, create=False)
+    return len(reservations), slots
+
+
+def _prune(queryset, chunk_size):
+    """Delete ``queryset`` in chunks of ``chunk_size`` primary keys; returns the number of rows."""
+    removed = 0
+    while True:
+        chunk = list(queryset.order_by('pk').values_list('pk', flat=True)[:chunk_size])
+        if not chunk:
+            return removed
+        removed += queryset.model.objects.filter(pk__in=chunk).delete()[1].get(queryset.model._meta.label, 0)
+
+
+def archive(before, chunk_size=CHUNK_SIZE, max_chunks=None):
+    """Archive every reservation for a slot before ``before``, then prune what only they used.
+
+    Returns ``{'reservations': n, 'slots': n, 'index_days': n, 'complete': bool}``. With
+    ``max_chunks`` the run may stop early; index days are only deleted once no older
+    reservation is left.
+    """
+    totals = {'reservations': 0, 'slots': 0, 'index_days': 0, 'complete': False}
+    chunks = 0
+    while max_chunks is None or chunks < max_chunks:
+        reservations, slots = archive_chunk(before, chunk_size)
+        if not reservations:
+            totals['complete'] = True
+            break
+        chunks += 1
+        totals['reservations'] += reservations
+        totals['slots'] += slots
+        logger.info('archive chunk reservations=%d slots=%d before=%s', reservations, slots, before.isoformat())
+
+    if totals['complete']:
+        # Slots left empty by cancellations, and the bitmaps of days that are now fully archived.
+        totals['slots'] += _prune(AvailableTime.objects.filter(start_time__lt=before, reservation__isnull=True),
+                                  chunk_size)
+        totals['index_days'] = _prune(SlotAvailability.objects.filter(day__lt=localtime(before).date()),
+                                      chunk_size)
+    return totals
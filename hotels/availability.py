@@ -0,0 +1,233 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.utils.timezone import localtime, make_aware
+
+from hotels import holds, schedules
+from hotels.models import AvailableTime, Reservation, ServiceSchedule, SlotAvailability
+
+
+def day_bounds(day):
+    start = make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def is_reserved(reserved_slots, slot_time, schedule):
+    return bool(reserved_slots & schedule.slot_bit(slot_time))
+
+
+def reserved_slots(service, day):
+    return SlotAvailability.objects.filter(service=service, day=day).values_list(
+        'reserved_slots', flat=True).first() or 0
+
+
+def remaining_capacity(service, day):
+    """Return ``{start_time: units left}`` for the slots of ``day`` that have been booked, in one query."""
+    start, end = day_bounds(day)
+    return dict(AvailableTime.objects.filter(
+        service=service, start_time__gte=start, start_time__lt=end
+    ).values_list('start_time', 'remaining'))
+
+
+def open_slots(service, day, after=None, user=None):
+    """Return ``(start_time, units left)`` for every slot of ``day`` that can still be booked.
+
+    Units other guests hold count as taken; ``user``'s own holds do not.
+    """
+    schedule = schedules.get(service.id)
+    slots = schedules.slots_for_day([service.id], day, {service.id: schedule})[service.id]
+    if schedule.capacity == 1:
+        # A single-unit slot is either free or full, which the day's bitmap already records.
+        reserved = reserved_slots(service, day)
+        remaining = {slot: 0 for slot in slots if is_reserved(reserved, slot, schedule)}
+    else:
+        remaining = remaining_capacity(service, day)
+    held = holds.active_holds([service.id], *day_bounds(day), exclude_user=user)
+    units = [(slot, remaining.get(slot, schedule.capacity) - held.get((service.id, slot), (0, None))[0])
+             for slot in slots if after is None or slot > after]
+    return [(slot, left) for slot, left in units if left > 0]
+
+
+def free_slots(service, day, after=None, user=None):
+    return [slot for slot, _ in open_slots(service, day, after, user)]
+
+
+def _calendar_rows(service_ids, start, end):
+    return SlotAvailability.objects.filter(
+        service_id__in=service_ids, day__gte=start, day__lte=end
+    ).order_by('day').values('day', 'service_id', 'reserved_slots')
+
+
+def _calendar_day(service_ids, reserved, after, service_schedules, day_slots, held):
+    services = []
+    for service_id in service_ids:
+        bitmap, schedule, slots = reserved.get(service_id, 0), service_schedules[service_id], day_slots[service_id]
+        taken = [slot for slot in slots if is_reserved(bitmap, slot, schedule)
+                 or holds.held_out(held, service_id, slot, schedule.capacity)]
+        free = [slot for slot in slots if slot not in taken and (after is None or slot > after)]
+        services.append((service_id, free, taken))
+    return services
+
+
+def _calendar_holds(service_ids, start, end, user):
+    return holds.active_holds(service_ids, day_bounds(start)[0], day_bounds(end)[1], exclude_user=user)
+
+
+def iter_calendar(service_ids, start, end, after=None, user=None, chunk_size=500):
+    """Yield ``(day, [(service_id, free_slots, taken_slots), ...])`` for every day from start to end.
+
+    Reads the index for the whole range with one query and walks it day by day, so only a
+    single day's slots are held in memory at a time. Slots other guests hold count as taken.
+    """
+    service_schedules = schedules.get_many(service_ids)
+    held = _calendar_holds(service_ids, start, end, user)
+    rows = _calendar_rows(service_ids, start, end).iterator(chunk_size=chunk_size)
+    pending = next(rows, None)
+    day = start
+    while day <= end:
+        reserved = {}
+        while pending is not None and pending['day'] == day:
+            reserved[pending['service_id']] = pending['reserved_slots']
+            pending = next(rows, None)
+        day_slots = schedules.slots_for_day(service_ids, day, service_schedules)
+        yield day, _calendar_day(service_ids, reserved, after, service_schedules, day_slots, held)
+        day += timedelta(days=1)
+
+
+async def aiter_calendar(service_ids, start, end, after=None, user=None, chunk_size=500):
+    """Async counterpart of ``iter_calendar`` for ASGI views."""
+    service_schedules = await sync_to_async(schedules.get_many)(service_ids)
+    held = await sync_to_async(_calendar_holds)(service_ids, start, end, user)
+    rows = aiter(_calendar_rows(service_ids, start, end).aiterator(chunk_size=chunk_size))
+    pending = await anext(rows, None)
+    day = start
+    while day <= end:
+        reserved = {}
+        while pending is not None and pending['day'] == day:
+            reserved[pending['service_id']] = pending['reserved_slots']
+            pending = await anext(rows, None)
+        day_slots = await schedules.aslots_for_day(service_ids, day, service_schedules)
+        yield day, _calendar_day(service_ids, reserved, after, service_schedules, day_slots, held)
+        day += timedelta(days=1)
+
+
+def _full_slots(slots):
+    """Narrow ``slots`` to the ones whose reservations use up their capacity."""
+    return slots.alias(booked=Count('reservation')).filter(booked__gte=F('capacity'))
+
+
+def compute_reserved_slots(service_id, day):
+    schedule = schedules.get(service_id)
+    start, end = day_bounds(day)
+    bitmap = 0
+    for start_time in _full_slots(AvailableTime.objects.filter(
+            service_id=service_id, start_time__gte=start, start_time__lt=end
+    )).values_list('start_time', flat=True):
+        bitmap |= schedule.slot_bit(start_time)
+    return bitmap
+
+
+def refresh_day(service_id, day, create=True):
+    """Recompute the bitmap for one service/day from the reservations behind it."""
+    bitmap = compute_reserved_slots(service_id, day)
+    if create:
+        SlotAvailability.objects.update_or_create(
+            service_id=service_id, day=day, defaults={'reserved_slots': bitmap})
+    else:
+        SlotAvailability.objects.filter(service_id=service_id, day=day).update(reserved_slots=bitmap)
+
+
+def mark_reserved(service_id, slot_times, schedule):
+    """Set the bits for newly filled ``slot_times`` without recomputing their days."""
+    bits = defaultdict(int)
+    for slot_time in slot_times:
+        bits[localtime(slot_time).date()] |= schedule.slot_bit(slot_time)
+    for day, day_bits in bits.items():
+        rows = SlotAvailability.objects.filter(service_id=service_id, day=day)
+        if rows.update(reserved_slots=F('reserved_slots').bitor(day_bits)):
+            continue
+        try:
+            with transaction.atomic():
+                SlotAvailability.objects.create(service_id=service_id, day=day, reserved_slots=day_bits)
+        except IntegrityError:
+            rows.update(reserved_slots=F('reserved_slots').bitor(day_bits))
+
+
+def expected_index(service_ids=None):
+    slots = AvailableTime.objects.all()
+    slot_lengths = ServiceSchedule.objects.all()
+    if service_ids:
+        slots = slots.filter(service_id__in=service_ids)
+        slot_lengths = slot_lengths.filter(service_id__in=service_ids)
+    # Only the slot length decides a slot's bit, so a bare Schedule per length is enough.
+    bit_schedules = {service_id: schedules.Schedule(slot_minutes)
+                     for service_id, slot_minutes in slot_lengths.values_list('service_id', 'slot_minutes')}
+    index = defaultdict(int)
+    for service_id, start_time in _full_slots(slots).values_list('service_id', 'start_time').iterator(chunk_size=2000):
+        schedule = bit_schedules.get(service_id, schedules.DEFAULT_SCHEDULE)
+        index[(service_id, localtime(start_time).date())] |= schedule.slot_bit(start_time)
+    return index
+
+
+def stored_index(service_ids=None):
+    rows = SlotAvailability.objects.all()
+    if service_ids:
+        rows = rows.filter(service_id__in=service_ids)
+    return {(service_id, day): bitmap
+            for service_id, day, bitmap in rows.values_list('service_id', 'day', 'reserved_slots').iterator()}
+
+
+def rebuild(service_ids=None, batch_size=1000):
+    index = expected_index(service_ids)
+    with transaction.atomic():
+        rows = SlotAvailability.objects.all()
+        if service_ids:
+            rows = rows.filter(service_id__in=service_ids)
+        rows.delete()
+        SlotAvailability.objects.bulk_create(
+            [SlotAvailability(service_id=service_id, day=day, reserved_slots=bitmap)
+             for (service_id, day), bitmap in index.items() if bitmap],
+            batch_size=batch_size)
+    return len(index)
+
+
+def find_inconsistencies(service_ids=None):
+    """Return (service_id, day, stored, expected) for every entry that disagrees with the reservations."""
+    expected = expected_index(service_ids)
+    stored = stored_index(service_ids)
+    mismatches = []
+    for key in sorted(set(expected) | set(stored)):
+        if expected.get(key, 0) != stored.get(key, 0):
+            mismatches.append((key[0], key[1], stored.get(key, 0), expected.get(key, 0)))
+    return mismatches
+
+
+def _booked():
+    return Coalesce(Subquery(Reservation.objects.filter(reserved_for=OuterRef('pk')).order_by().values(
+        'reserved_for').annotate(count=Count('pk')).values('count')), 0)
+
+
+def recount_slots(slots, capacity=None):
+    """Reset the remaining units of ``slots`` from the reservations they hold.
+
+    Passing ``capacity`` resizes the slots in the same UPDATE, so ``remaining`` never exceeds it.
+    """
+    changes = {'remaining': Greatest(F('capacity') - _booked(), 0)}
+    if capacity is not None:
+        changes = {'capacity': capacity, 'remaining': Greatest(Value(capacity) - _booked(), 0)}
+    slots.update(**changes)
+    slots.update(is_reserved=Case(When(remaining=0, then=Value(True)), default=Value(False)))
+
+
+def find_miscounted_slots(service_ids=None):
+    """Return (slot_id, service_id, start_time, stored, expected) for every slot whose counter is off."""
+    slots = AvailableTime.objects.all()
+    if service_ids:
+        slots = slots.filter(service_id__in=service_ids)
+    slots = slots.annotate(expected=Greatest(F('capacity') - Count('reservation'), 0)).filter(
+        ~Q(remaining=F('expected')) | Q(is_reserved=True, expected__gt=0) | Q(is_reserved=False, expected=0))
+    return list(slots.order_by('pk').values_list('pk', 'service_id', 'start_time', 'remaining', 'expected'))
@@ -0,0 +1,39 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = {'DEFERRED', 'EXCLUSIVE', 'IMMEDIATE'}
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """SQLite backend that understands the ``init_command`` and ``transaction_mode`` options.
+
+    ``init_command`` holds ``;``-separated statements (typically PRAGMAs) run on every new
+    connection. ``transaction_mode`` is used to begin ``atomic`` blocks; ``IMMEDIATE`` takes the
+    write lock up front, so concurrent writers wait out the busy timeout instead of failing with
+    "database is locked" when a read transaction tries to become a write. Django 5.1 supports both
+    options itself, after which the stock ``django.db.backends.sqlite3`` engine can be used again.
+    """
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        transaction_mode = kwargs.pop('transaction_mode', None)
+        if transaction_mode is not None and transaction_mode.upper() not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                f'settings.DATABASES is improperly configured. transaction_mode must be one of '
+                f'{", ".join(sorted(TRANSACTION_MODES))}, or None.')
+        self.transaction_mode = transaction_mode.upper() if transaction_mode else None
+        self.init_commands = [command.strip() for command in kwargs.pop('init_command', '').split(';')
+                              if command.strip()]
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for command in self.init_commands:
+            conn.execute(command)
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        if self.transaction_mode is None:
+            super()._start_transaction_under_autocommit()
+        else:
+            self.cursor().execute(f'BEGIN {self.transaction_mode}')
@@ -0,0 +1,127 @@
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.timezone import now
+
+from hotels import availability, pricing, rollups, schedules
+from hotels.models import AvailableTime, CustomUser, Hotel, HotelRegisteredUser, Reservation, RoomService, Service
+
+BENCHMARK_PASSWORD = 'benchmark-password'
+
+
+@contextmanager
+def throwaway_database(verbosity=0):
+    """Run the block against a freshly migrated database that is destroyed afterwards.
+
+    SQLite databases are created as a file in a temporary directory rather than in memory so
+    several threads can share them.
+    """
+    connection = connections[DEFAULT_DB_ALIAS]
+    test_settings = connection.settings_dict['TEST']
+    old_name, old_test_name = connection.settings_dict['NAME'], test_settings.get('NAME')
+    workdir = None
+    if connection.vendor == 'sqlite' and not old_test_name:
+        workdir = tempfile.mkdtemp(prefix='hotels-benchmark-')
+        test_settings['NAME'] = os.path.join(workdir, 'benchmark.sqlite3')
+    connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+        test_settings['NAME'] = old_test_name
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def seed(hotels=5, services_per_hotel=4, guests=2000, days=365, bookings_per_day=6, room_services_per_hotel=3,
+         batch_size=5000, random_seed=0):
+    """Fill the database with hotels, registered guests and ``days`` of booking history.
+
+    Returns a dict describing what was created; guests log in with ``BENCHMARK_PASSWORD``.
+    """
+    rng = random.Random(random_seed)
+    hotel_rows = Hotel.objects.bulk_create(
+        [Hotel(name=f'Hotel {i}', location=f'City {i}') for i in range(hotels)])
+    service_rows = Service.objects.bulk_create([
+        Service(hotel=hotel, name=f'Service {hotel.pk}-{i}', description='Benchmark service',
+                price=Decimal(rng.randrange(10, 200)))
+        for hotel in hotel_rows for i in range(services_per_hotel)
+    ])
+    room_service_rows = RoomService.objects.bulk_create([
+        RoomService(hotel=hotel, name=f'Room service {hotel.pk}-{i}')
+        for hotel in hotel_rows for i in range(room_services_per_hotel)
+    ])
+
+    password = make_password(BENCHMARK_PASSWORD)
+    user_rows = CustomUser.objects.bulk_create([
+        CustomUser(username=f'guest{i}', email=f'guest{i}@example.com', private_number=f'{i:011d}',
+                   password=password, hotel=hotel_rows[i % hotels])
+        for i in range(guests)
+    ], batch_size=batch_size)
+    HotelRegisteredUser.objects.bulk_create([
+        HotelRegisteredUser(hotel_id=user.hotel_id, private_number=user.private_number, email=user.email)
+        for user in user_rows
+    ], batch_size=batch_size)
+    guests_by_hotel = {}
+    for user in user_rows:
+        guests_by_hotel.setdefault(user.hotel_id, []).append(user)
+
+    today = now().date()
+    first_day = today - timedelta(days=days)
+    reservations = 0
+    for service in service_rows:
+        slots = []
+        for offset in range(days + 30):
+            day = first_day + timedelta(days=offset)
+            day_slots = schedules.DEFAULT_SCHEDULE.slots(day)
+            for start_time in rng.sample(day_slots, min(bookings_per_day, len(day_slots))):
+                slots.append(AvailableTime(service=service, start_time=start_time,
+                                           end_time=start_time + schedules.DEFAULT_SCHEDULE.slot_length,
+                                           remaining=0, is_reserved=True))
+        slots = AvailableTime.objects.bulk_create(slots, batch_size=batch_size)
+        hotel_guests = guests_by_hotel[service.hotel_id]
+        # Price each slot on its own, as if every seeded reservation was booked separately.
+        rule_set = pricing.rule_set(service)
+        Reservation.objects.bulk_create(
+            [Reservation(user=rng.choice(hotel_guests), service=service, reserved_for=slot,
+                         price=rule_set.quote([slot.start_time]).total) for slot in slots],
+            batch_size=batch_size)
+        reservations += len(slots)
+    availability.rebuild()
+    rollups.rebuild()
+
+    return {
+        'hotels': hotels,
+        'services': len(service_rows),
+        'room_services': len(room_service_rows),
+        'guests': guests,
+        'days': days,
+        'reservations': reservations,
+    }
+
+
+def timed(fn, repeat):
+    """Call ``fn`` ``repeat`` times and return the wall-clock duration of each call in seconds."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method='inclusive')[max(0, min(98, round(pct) - 1))]
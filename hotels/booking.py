@@ -0,0 +1,269 @@
+from collections import defaultdict
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Case, F, Value, When
+from django.utils.timezone import localtime, now
+
+from hotels import availability, holds, pricing, rollups, schedules
+from hotels.models import AvailableTime, Reservation
+
+
+class BookingError(Exception):
+    pass
+
+
+class PastSlotError(BookingError):
+    pass
+
+
+class UnavailableSlotError(BookingError):
+    pass
+
+
+class SlotConflictError(BookingError):
+    def __init__(self, times):
+        self.times = sorted(times)
+        super().__init__(f'{len(self.times)} slot(s) already reserved')
+
+
+class SlotHeldError(SlotConflictError):
+    """Other guests hold the last free units of some slots while they finish booking them."""
+
+
+def book_slots(user, service, slot_times):
+    """Reserve every slot in ``slot_times`` for ``user`` or none of them.
+
+    Runs a fixed number of queries however many slots are requested: one locking read of the
+    existing rows, one bulk insert for new slots, one conditional update that takes a unit from
+    each existing slot that still has one, one bulk insert of reservations, and one index and
+    one rollup update per day, plus a read and a delete of slot holds. Each reservation keeps the
+    price quoted for its slot, and the guest's holds on the booked slots are released.
+    """
+    slot_times = sorted(set(slot_times))
+    if not slot_times:
+        raise BookingError('No time slots were chosen.')
+    if any(slot_time <= now() for slot_time in slot_times):
+        raise PastSlotError('Some of the selected times are in the past.')
+    schedule = schedules.get(service.id)
+    if not all(schedule.is_slot(slot_time) for slot_time in slot_times):
+        raise UnavailableSlotError('Some of the selected times are not offered.')
+
+    prices = dict(pricing.quote(service, slot_times, schedule).lines)
+    try:
+        with transaction.atomic():
+            existing = list(AvailableTime.objects.select_for_update().filter(
+                service=service, start_time__in=slot_times
+            ).only('id', 'start_time', 'end_time', 'remaining'))
+
+            conflicts = [slot.start_time for slot in existing if not slot.remaining]
+            if conflicts:
+                raise SlotConflictError(conflicts)
+
+            free_units = {slot_time: schedule.capacity for slot_time in slot_times}
+            free_units.update((slot.start_time, slot.remaining) for slot in existing)
+            held = holds.blocked_slots(user, service, free_units)
+            if held:
+                raise SlotHeldError(held)
+
+            if existing:
+                # Both expressions read the row as it was before the update.
+                claimed = AvailableTime.objects.filter(
+                    pk__in=[slot.pk for slot in existing], remaining__gt=0
+                ).update(remaining=F('remaining') - 1,
+                         is_reserved=Case(When(remaining=1, then=Value(True)), default=Value(False)))
+                if claimed != len(existing):
+                    raise SlotConflictError([slot.start_time for slot in existing])
+
+            known = {slot.start_time for slot in existing}
+            created = AvailableTime.objects.bulk_create([
+                AvailableTime(service=service, start_time=slot_time, end_time=slot_time + schedule.slot_length,
+                              capacity=schedule.capacity, remaining=schedule.capacity - 1,
+                              is_reserved=schedule.capacity == 1)
+                for slot_time in slot_times if slot_time not in known
+            ])
+
+            reservations = Reservation.objects.bulk_create([
+                Reservation(user=user, service=service, reserved_for=slot, price=prices[slot.start_time])
+                for slot in existing + created
+            ])
+            # Rows are locked (or the database is, on SQLite), so the counts read above are current.
+            filled = [slot.start_time for slot in existing if slot.remaining == 1]
+            filled += [slot.start_time for slot in created if not slot.remaining]
+            availability.mark_reserved(service.id, filled, schedule)
+            rollups.record_reservations(reservations)
+            holds.release(user, service, slot_times)
+    except IntegrityError:
+        # Another booking inserted one of the same service/start_time rows first, or the guest
+        # has already booked a unit of one of the slots.
+        raise SlotConflictError(slot_times)
+    return reservations
+
+
+# Per-reservation outcomes of cancel_reservations and reschedule_reservations.
+CANCELLED = 'cancelled'
+RESCHEDULED = 'rescheduled'
+NOT_FOUND = 'not_found'
+STARTED = 'started'
+PAST = 'past'
+UNAVAILABLE = 'unavailable'
+CONFLICT = 'conflict'
+
+# Keeps the IN list of delete_reservations under SQLite's bound-parameter limit.
+DELETE_BATCH_SIZE = 500
+
+
+def delete_reservations(reservation_ids):
+    """Delete reservations with plain DELETE statements, without the per-row signal handlers.
+
+    Callers recount the slots and adjust the index and rollups themselves.
+    """
+    reservation_ids = list(reservation_ids)
+    table = connection.ops.quote_name(Reservation._meta.db_table)
+    column = connection.ops.quote_name(Reservation._meta.pk.column)
+    with connection.cursor() as cursor:
+        for start in range(0, len(reservation_ids), DELETE_BATCH_SIZE):
+            batch = reservation_ids[start:start + DELETE_BATCH_SIZE]
+            cursor.execute(f'DELETE FROM {table} WHERE {column} IN ({", ".join(["%s"] * len(batch))})', batch)
+
+
+def _locked_reservations(reservations, reservation_ids):
+    return {reservation.id: reservation for reservation in reservations.select_for_update(of=('self',)).filter(
+        pk__in=reservation_ids
+    ).select_related('service', 'reserved_for').only(
+        'user_id', 'price', 'service__hotel_id', 'reserved_for__start_time', 'reserved_for__end_time')}
+
+
+def _refresh(slot_ids, service_days, create=True):
+    """Recount the slots reservations left or joined and refresh the bitmaps of their days."""
+    availability.recount_slots(AvailableTime.objects.filter(pk__in=slot_ids))
+    for service_id, day in sorted(service_days):
+        availability.refresh_day(service_id, day, create=create)
+
+
+def _day(reservation):
+    return reservation.service_id, localtime(reservation.reserved_for.start_time).date()
+
+
+def cancel_reservations(reservation_ids, reservations=None):
+    """Cancel every reservation in ``reservation_ids`` that has not started yet, in one transaction.
+
+    ``reservations`` limits which ones the caller may touch (e.g. a guest's own); the rest are
+    reported as not found. Returns ``{reservation_id: outcome}`` in the order given. The rows
+    are removed with one DELETE and their slots recounted with one UPDATE, without per-row
+    signals, so the index and rollups are adjusted here.
+    """
+    reservation_ids = list(dict.fromkeys(reservation_ids))
+    reservations = Reservation.objects.all() if reservations is None else reservations
+    current = now()
+    with transaction.atomic():
+        found = _locked_reservations(reservations, reservation_ids)
+        outcomes, cancelled = {}, []
+        for reservation_id in reservation_ids:
+            reservation = found.get(reservation_id)
+            if reservation is None:
+                outcomes[reservation_id] = NOT_FOUND
+            elif reservation.reserved_for.start_time <= current:
+                outcomes[reservation_id] = STARTED
+            else:
+                outcomes[reservation_id] = CANCELLED
+                cancelled.append(reservation)
+        if cancelled:
+            # The per-row signal handlers would recount each slot separately.
+            delete_reservations([reservation.id for reservation in cancelled])
+            _refresh({reservation.reserved_for_id for reservation in cancelled},
+                     {_day(reservation) for reservation in cancelled}, create=False)
+            rollups.record_reservations(cancelled, sign=-1)
+    return outcomes
+
+
+def _target_slots(targets, service_schedules):
+    """Lock the slots in ``targets`` (``(service_id, start_time)`` pairs), creating the missing ones."""
+    slots = {(slot.service_id, slot.start_time): slot for slot in AvailableTime.objects.select_for_update().filter(
+        service_id__in={service_id for service_id, _ in targets},
+        start_time__in={start_time for _, start_time in targets},
+    ).only('id', 'service_id', 'start_time', 'end_time', 'remaining') if (slot.service_id, slot.start_time) in targets}
+    created = AvailableTime.objects.bulk_create([
+        AvailableTime(service_id=service_id, start_time=start_time,
+                      end_time=start_time + service_schedules[service_id].slot_length,
+                      capacity=service_schedules[service_id].capacity,
+                      remaining=service_schedules[service_id].capacity)
+        for service_id, start_time in sorted(targets) if (service_id, start_time) not in slots
+    ])
+    slots.update(((slot.service_id, slot.start_time), slot) for slot in created)
+    return slots
+
+
+def reschedule_reservations(moves, reservations=None):
+    """Move reservations to other slots of their service in one transaction.
+
+    ``moves`` maps reservation ids to new start times; ``reservations`` limits which ones the
+    caller may touch. Moves are applied in order and units freed by earlier moves can be taken
+    by later ones. A move that cannot be made is reported and skipped while the others go
+    ahead. Returns ``{reservation_id: outcome}``. Reservations keep the price they were booked
+    at. Slot holds are not consulted, as they only guard new bookings.
+    """
+    moves = dict(moves)
+    reservations = Reservation.objects.all() if reservations is None else reservations
+    current = now()
+    try:
+        with transaction.atomic():
+            found = _locked_reservations(reservations, list(moves))
+            service_schedules = schedules.get_many({reservation.service_id for reservation in found.values()})
+            outcomes, wanted = {}, {}
+            for reservation_id, start_time in moves.items():
+                reservation = found.get(reservation_id)
+                if reservation is None:
+                    outcomes[reservation_id] = NOT_FOUND
+                elif reservation.reserved_for.start_time <= current:
+                    outcomes[reservation_id] = STARTED
+                elif start_time <= current:
+                    outcomes[reservation_id] = PAST
+                elif not service_schedules[reservation.service_id].is_slot(start_time):
+                    outcomes[reservation_id] = UNAVAILABLE
+                elif start_time == reservation.reserved_for.start_time:
+                    outcomes[reservation_id] = RESCHEDULED
+                else:
+                    wanted[reservation_id] = (reservation, start_time)
+
+            slots = _target_slots({(reservation.service_id, start_time) for reservation, start_time in wanted.values()},
+                                  service_schedules)
+            free = {slot.pk: slot.remaining for slot in slots.values()}
+            guests = defaultdict(set)
+            for user_id, slot_id in Reservation.objects.filter(reserved_for__in=list(free)).values_list(
+                    'user_id', 'reserved_for_id'):
+                guests[slot_id].add(user_id)
+
+            moved = []
+            for reservation_id, (reservation, start_time) in wanted.items():
+                slot = slots[(reservation.service_id, start_time)]
+                if not free[slot.pk] or reservation.user_id in guests[slot.pk]:
+                    outcomes[reservation_id] = CONFLICT
+                    continue
+                free[slot.pk] -= 1
+                guests[slot.pk].add(reservation.user_id)
+                if reservation.reserved_for_id in free:
+                    free[reservation.reserved_for_id] += 1
+                    guests[reservation.reserved_for_id].discard(reservation.user_id)
+                outcomes[reservation_id] = RESCHEDULED
+                moved.append((reservation, slot))
+            if moved:
+                _move(moved)
+    except IntegrityError:
+        # Another booking inserted one of the same service/start_time rows first.
+        raise SlotConflictError(moves.values())
+    return {reservation_id: outcomes[reservation_id] for reservation_id in moves}
+
+
+def _move(moved):
+    reservations = [reservation for reservation, _ in moved]
+    rollups.record_reservations(reservations, sign=-1)
+    slot_ids, service_days = set(), set()
+    for reservation, slot in moved:
+        slot_ids.add(reservation.reserved_for_id)
+        service_days.add(_day(reservation))
+        reservation.reserved_for = slot
+        slot_ids.add(slot.pk)
+        service_days.add(_day(reservation))
+    Reservation.objects.bulk_update(reservations, ['reserved_for'])
+    _refresh(slot_ids, service_days)
+    rollups.record_reservations(reservations)
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+
+HOTEL_DETAIL_FRAGMENT = 'hotel_detail'
+VIEWER_STATES = ('anonymous', 'guest', 'registered')
+
+
+def hotel_detail_timeout():
+    return getattr(settings, 'HOTEL_DETAIL_CACHE_TIMEOUT', 600)
+
+
+def viewer_state(user, is_registered):
+    if not user.is_authenticated:
+        return 'anonymous'
+    return 'registered' if is_registered else 'guest'
+
+
+def hotel_detail_key(hotel_id, state):
+    return make_template_fragment_key(HOTEL_DETAIL_FRAGMENT, [hotel_id, state])
+
+
+async def ahas_hotel_detail(hotel_id, state):
+    return await cache.ahas_key(hotel_detail_key(hotel_id, state))
+
+
+def invalidate_hotel_detail(hotel_id):
+    cache.delete_many([hotel_detail_key(hotel_id, state) for state in VIEWER_STATES])
@@ -0,0 +1,91 @@
+import asyncio
+import time
+from datetime import datetime
+
+from django.db.models import Q
+from django.utils.timezone import now
+
+from hotels.models import RoomServiceRequest
+
+# A sync long-poll holds a worker thread while it waits, so it returns quickly and the board
+# polls again; the async endpoint only parks a coroutine and may wait longer.
+MAX_WAIT_SECONDS = 5
+MAX_ASYNC_WAIT_SECONDS = 25
+POLL_INTERVAL_SECONDS = 1
+MAX_CHANGES = 200
+
+
+def parse_cursor(value):
+    try:
+        updated_at, request_id = value.split(',')
+        return datetime.fromisoformat(updated_at), int(request_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def format_cursor(room_service_request):
+    return f'{room_service_request.updated_at.isoformat()},{room_service_request.id}'
+
+
+def board_snapshot(hotel_id, limit=MAX_CHANGES):
+    """The hotel's pending requests plus the cursor clients should poll for changes from."""
+    requests = RoomServiceRequest.objects.filter(room_service__hotel_id=hotel_id)
+    latest = requests.order_by('-updated_at', '-id').only('id', 'updated_at').first()
+    pending = list(requests.filter(status='Pending').select_related('user', 'room_service').order_by('id')[:limit])
+    return pending, format_cursor(latest) if latest else ''
+
+
+def _changes(hotel_id, cursor, limit):
+    requests = RoomServiceRequest.objects.filter(room_service__hotel_id=hotel_id).select_related(
+        'user', 'room_service').order_by('updated_at', 'id')
+    if cursor:
+        updated_at, request_id = cursor
+        requests = requests.filter(Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=request_id))
+    return requests[:limit]
+
+
+def changes_since(hotel_id, cursor, limit=MAX_CHANGES):
+    """Room-service requests of ``hotel_id`` created or updated after ``cursor``, oldest change first."""
+    return list(_changes(hotel_id, cursor, limit))
+
+
+async def achanges_since(hotel_id, cursor, limit=MAX_CHANGES):
+    return [room_service_request async for room_service_request in _changes(hotel_id, cursor, limit)]
+
+
+def wait_for_changes(hotel_id, cursor, wait_seconds):
+    """Long-poll for changes, returning as soon as there are any or after ``wait_seconds``."""
+    deadline = time.monotonic() + min(wait_seconds, MAX_WAIT_SECONDS)
+    while True:
+        changes = changes_since(hotel_id, cursor)
+        if changes or time.monotonic() >= deadline:
+            return changes
+        time.sleep(POLL_INTERVAL_SECONDS)
+
+
+async def await_for_changes(hotel_id, cursor, wait_seconds):
+    """Async long-poll: like :func:`wait_for_changes`, but sleeps without holding a thread."""
+    deadline = time.monotonic() + min(wait_seconds, MAX_ASYNC_WAIT_SECONDS)
+    while True:
+        changes = await achanges_since(hotel_id, cursor)
+        if changes or time.monotonic() >= deadline:
+            return changes
+        await asyncio.sleep(POLL_INTERVAL_SECONDS)
+
+
+def complete_requests(hotel_id, request_ids):
+    """Mark the given pending requests Completed with a single UPDATE; returns how many changed."""
+    return RoomServiceRequest.objects.filter(
+        room_service__hotel_id=hotel_id, id__in=request_ids, status='Pending'
+    ).update(status='Completed', updated_at=now())
+
+
+def serialize(room_service_request):
+    return {
+        'id': room_service_request.id,
+        'room_service': room_service_request.room_service.name,
+        'guest': room_service_request.user.private_number,
+        'status': room_service_request.status,
+        'request_date': room_service_request.request_date.isoformat(),
+        'updated_at': room_service_request.updated_at.isoformat(),
+    }
@@ -0,0 +1,144 @@
+import csv
+import json
+from datetime import datetime
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.timezone import localtime
+
+from hotels import availability, pricing
+from hotels.models import ArchivedReservation, Reservation, RoomServiceRequest
+
+FORMATS = ('csv', 'jsonl')
+CONTENT_TYPES = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+CHUNK_SIZE = 2000
+
+RESERVATION_COLUMNS = (
+    'id', 'reserved_at', 'starts_at', 'ends_at', 'hours', 'hotel_id', 'hotel', 'service_id', 'service',
+    'guest_id', 'guest_email', 'guest_private_number', 'hourly_price', 'revenue',
+)
+ROOM_SERVICE_COLUMNS = (
+    'id', 'requested_at', 'updated_at', 'status', 'hotel_id', 'hotel', 'room_service_id', 'room_service',
+    'guest_id', 'guest_email', 'guest_private_number',
+)
+
+
+def parse_day(value):
+    """Parse a ``YYYY-MM-DD`` filter value; empty means unbounded. Raises ``ValueError``."""
+    return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+
+
+def _in_range(queryset, field, start, end):
+    if start:
+        queryset = queryset.filter(**{f'{field}__gte': availability.day_bounds(start)[0]})
+    if end:
+        queryset = queryset.filter(**{f'{field}__lt': availability.day_bounds(end)[1]})
+    return queryset
+
+
+def archived_reservation_rows(start=None, end=None, hotel_id=None, chunk_size=CHUNK_SIZE):
+    """``reservation_rows`` for reservations that have been archived."""
+    reservations = _in_range(ArchivedReservation.objects.all(), 'start_time', start, end)
+    if hotel_id:
+        reservations = reservations.filter(hotel_id=hotel_id)
+    reservations = reservations.select_related('user').only(
+        'user__email', 'user__private_number', 'hotel_id', 'service_id', 'hotel_name', 'service_name', 'hourly_price',
+        'reservation_date', 'start_time', 'end_time', 'price',
+    ).order_by('id')
+
+    for reservation in reservations.iterator(chunk_size=chunk_size):
+        yield {
+            'id': reservation.id,
+            'reserved_at': localtime(reservation.reservation_date),
+            'starts_at': localtime(reservation.start_time),
+            'ends_at': localtime(reservation.end_time),
+            'hours': pricing.slot_hours(reservation.start_time, reservation.end_time),
+            'hotel_id': reservation.hotel_id,
+            'hotel': reservation.hotel_name,
+            'service_id': reservation.service_id,
+            'service': reservation.service_name,
+            'guest_id': reservation.user_id,
+            'guest_email': reservation.user.email,
+            'guest_private_number': reservation.user.private_number,
+            'hourly_price': reservation.hourly_price,
+            'revenue': reservation.price,
+        }
+
+
+def reservation_rows(start=None, end=None, hotel_id=None, chunk_size=CHUNK_SIZE):
+    """Yield one dict per reservation whose slot starts between ``start`` and ``end`` (inclusive days).
+
+    Archived reservations come first.
+    """
+    yield from archived_reservation_rows(start, end, hotel_id, chunk_size)
+    reservations = _in_range(Reservation.objects.all(), 'reserved_for__start_time', start, end)
+    if hotel_id:
+        reservations = reservations.filter(service__hotel_id=hotel_id)
+    reservations = reservations.select_related('user', 'service__hotel', 'reserved_for').only(
+        'reservation_date', 'price', 'user__email', 'user__private_number', 'service__name', 'service__price',
+        'service__hotel__name', 'reserved_for__start_time', 'reserved_for__end_time',
+    ).order_by('id')
+
+    for reservation in reservations.iterator(chunk_size=chunk_size):
+        slot, service = reservation.reserved_for, reservation.service
+        yield {
+            'id': reservation.id,
+            'reserved_at': localtime(reservation.reservation_date),
+            'starts_at': localtime(slot.start_time),
+            'ends_at': localtime(slot.end_time),
+            'hours': pricing.slot_hours(slot.start_time, slot.end_time),
+            'hotel_id': service.hotel_id,
+            'hotel': service.hotel.name,
+            'service_id': service.id,
+            'service': service.name,
+            'guest_id': reservation.user_id,
+            'guest_email': reservation.user.email,
+            'guest_private_number': reservation.user.private_number,
+            'hourly_price': service.price,
+            'revenue': reservation.price,
+        }
+
+
+def room_service_rows(start=None, end=None, hotel_id=None, chunk_size=CHUNK_SIZE):
+    """Yield one dict per room-service request made between ``start`` and ``end`` (inclusive days)."""
+    requests = _in_range(RoomServiceRequest.objects.all(), 'request_date', start, end)
+    if hotel_id:
+        requests = requests.filter(room_service__hotel_id=hotel_id)
+    requests = requests.select_related('user', 'room_service__hotel').only(
+        'request_date', 'updated_at', 'status', 'user__email', 'user__private_number', 'room_service__name',
+        'room_service__hotel__name',
+    ).order_by('id')
+
+    for request in requests.iterator(chunk_size=chunk_size):
+        room_service = request.room_service
+        yield {
+            'id': request.id,
+            'requested_at': localtime(request.request_date),
+            'updated_at': localtime(request.updated_at),
+            'status': request.status,
+            'hotel_id': room_service.hotel_id,
+            'hotel': room_service.hotel.name,
+            'room_service_id': room_service.id,
+            'room_service': room_service.name,
+            'guest_id': request.user_id,
+            'guest_email': request.user.email,
+            'guest_private_number': request.user.private_number,
+        }
+
+
+class _Echo:
+    """File-like object whose ``write`` hands the formatted line back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def serialize(rows, columns, file_format):
+    """Turn row dicts into CSV (with a header) or JSON Lines text, one line at a time."""
+    if file_format == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(columns)
+        for row in rows:
+            yield writer.writerow([row[column] for column in columns])
+    else:
+        for row in rows:
+            yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
@@ -1,5 +1,6 @@
 from django import forms
-from .models import Reservation, RoomServiceRequest, CustomUser
+from .models import Hotel, Reservation, RoomServiceRequest, CustomUser
+from .roster import FORMATS
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 
 
@@ -26,3 +27,11 @@ class CustomUserCreationForm(UserCreationForm):
 class CustomAuthenticationForm(AuthenticationForm):
     username = forms.EmailField(label='Email')
     password = forms.CharField(widget=forms.PasswordInput)
+
+
+class RosterImportForm(forms.Form):
+    roster = forms.FileField(help_text='CSV with a header row, or JSON Lines, with private_number, email and hotel.')
+    file_format = forms.ChoiceField(choices=[('', 'From the file extension')] + [(f, f.upper()) for f in FORMATS],
+                                    required=False, label='Format')
+    hotel = forms.ModelChoiceField(Hotel.objects.all(), required=False,
+                                   help_text='Used for rows that do not name a hotel.')
@@ -0,0 +1,106 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.utils.timezone import now
+
+from hotels.models import AvailableTime, SlotHold
+
+
+def hold_timeout():
+    return getattr(settings, 'SLOT_HOLD_TIMEOUT', 300)
+
+
+def active_holds(service_ids, start, end, exclude_user=None):
+    """Return ``{(service_id, start_time): (units held, units left or None)}`` for live holds.
+
+    ``units left`` is the slot's booking counter, ``None`` while nobody has booked it yet. Holds
+    of ``exclude_user`` are left out, so guests never compete with their own selection.
+    """
+    holds = SlotHold.objects.filter(
+        service_id__in=service_ids, start_time__gte=start, start_time__lt=end, expires_at__gt=now())
+    if exclude_user is not None:
+        holds = holds.exclude(user=exclude_user)
+    remaining = AvailableTime.objects.filter(
+        service_id=OuterRef('service_id'), start_time=OuterRef('start_time')).values('remaining')
+    return {
+        (service_id, start_time): (held, left)
+        for service_id, start_time, held, left in holds.order_by().values('service_id', 'start_time').annotate(
+            held=Count('pk'), left=Subquery(remaining)).values_list('service_id', 'start_time', 'held', 'left')
+    }
+
+
+def held_out(holds, service_id, slot_time, capacity):
+    """Whether other guests' holds cover every unit of the slot that is still free."""
+    held, left = holds.get((service_id, slot_time), (0, None))
+    return held > 0 and held >= (capacity if left is None else left)
+
+
+def blocked_slots(user, service, free_units):
+    """Return the slots of ``free_units`` (``{start_time: units left}``) that other guests hold first.
+
+    Holds are served in the order they were placed: only the ones placed before ``user``'s own
+    hold on a slot count against them, so two guests racing for the same unit never block each
+    other.
+    """
+    ahead, own = defaultdict(int), set()
+    for start_time, user_id in SlotHold.objects.filter(
+            service=service, start_time__in=list(free_units), expires_at__gt=now()
+    ).order_by('pk').values_list('start_time', 'user_id'):
+        if user_id == user.id:
+            own.add(start_time)
+        elif start_time not in own:
+            ahead[start_time] += 1
+    return sorted(start_time for start_time, held in ahead.items() if held >= free_units[start_time])
+
+
+def place(user, service, slot_times, schedule):
+    """Hold ``slot_times`` for ``user``, replacing their earlier selection on ``service``.
+
+    Returns ``(held, unavailable, expires_at)``. Slots the guest already holds keep their place
+    in line and have their expiry pushed back.
+    """
+    slot_times = sorted(set(slot_times))
+    current = now()
+    expires_at = current + timedelta(seconds=hold_timeout())
+    with transaction.atomic():
+        left = dict(AvailableTime.objects.filter(service=service, start_time__in=slot_times).values_list(
+            'start_time', 'remaining'))
+        free_units = {slot_time: left.get(slot_time, schedule.capacity) for slot_time in slot_times}
+        full = [slot_time for slot_time in slot_times if not free_units[slot_time]]
+
+        own = SlotHold.objects.filter(user=user, service=service)
+        own.filter(Q(expires_at__lte=current) | ~Q(start_time__in=slot_times) | Q(start_time__in=full)).delete()
+        kept = set(own.values_list('start_time', flat=True))
+        if kept:
+            own.update(expires_at=expires_at)
+
+        wanted = {slot_time: free_units[slot_time] for slot_time in slot_times
+                  if slot_time not in kept and free_units[slot_time]}
+        taken = set(blocked_slots(user, service, wanted))
+        fresh = [slot_time for slot_time in wanted if slot_time not in taken]
+        SlotHold.objects.bulk_create([
+            SlotHold(service=service, user=user, start_time=slot_time, expires_at=expires_at) for slot_time in fresh
+        ], ignore_conflicts=True)
+    held = sorted(kept | set(fresh))
+    return held, [slot_time for slot_time in slot_times if slot_time not in held], expires_at
+
+
+def release(user, service, slot_times):
+    SlotHold.objects.filter(user=user, service=service, start_time__in=slot_times).delete()
+
+
+def sweep(batch_size=1000):
+    """Delete expired holds in batches of ``batch_size``; returns how many were removed.
+
+    Expired holds are already ignored everywhere, so sweeping only keeps the table small.
+    """
+    removed = 0
+    while True:
+        expired = list(SlotHold.objects.filter(expires_at__lte=now()).order_by('expires_at').values_list(
+            'pk', flat=True)[:batch_size])
+        if not expired:
+            return removed
+        removed += SlotHold.objects.filter(pk__in=expired).delete()[0]
@@ -0,0 +1,224 @@
+import asyncio
+import io
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.signals import got_request_exception
+from django.db import OperationalError
+from django.db.models import Count, F
+from django.middleware.csrf import CSRF_ALLOWED_CHARS, CSRF_SECRET_LENGTH
+from django.test import Client
+from django.utils.crypto import get_random_string
+
+from hotels import availability
+from hotels.benchmarking import percentile
+from hotels.models import AvailableTime
+
+HOST = 'testserver'
+
+
+def session_cookie(user):
+    """Log ``user`` in and return the Cookie header value for their session."""
+    client = Client()
+    client.force_login(user)
+    return f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+
+
+def form_post(url, cookie, data):
+    """Build a form POST request tuple that passes the CSRF check."""
+    secret = get_random_string(CSRF_SECRET_LENGTH, allowed_chars=CSRF_ALLOWED_CHARS)
+    body = urlencode({**data, 'csrfmiddlewaretoken': secret}).encode()
+    return ('POST', url, f'{cookie}; {settings.CSRF_COOKIE_NAME}={secret}', body,
+            'application/x-www-form-urlencoded')
+
+
+def wsgi_call(application, method, url, cookie='', body=b'', content_type=''):
+    """Send one request straight to a WSGI application; returns the status code."""
+    parts = urlsplit(url)
+    environ = {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': parts.path,
+        'QUERY_STRING': parts.query,
+        'SERVER_NAME': HOST,
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': HOST,
+        'HTTP_COOKIE': cookie,
+        'CONTENT_TYPE': content_type,
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': io.StringIO(),
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    status = []
+    result = application(environ, lambda line, headers, exc_info=None: status.append(int(line.split()[0])))
+    try:
+        for _ in result:
+            pass
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return status[0]
+
+
+async def asgi_call(application, method, url, cookie='', body=b'', content_type=''):
+    """Send one request straight to an ASGI application; returns the status code."""
+    parts = urlsplit(url)
+    headers = [(b'host', HOST.encode()), (b'cookie', cookie.encode())]
+    if content_type:
+        headers.append((b'content-type', content_type.encode()))
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': parts.path,
+        'raw_path': parts.path.encode(),
+        'query_string': parts.query.encode(),
+        'headers': headers,
+        'server': (HOST, 80),
+        'client': ('127.0.0.1', 0),
+    }
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    disconnected = asyncio.Event()
+    status = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    await application(scope, receive, send)
+    disconnected.set()
+    return status[0]
+
+
+def summarize(samples, elapsed):
+    """Reduce ``(status, seconds)`` samples collected over ``elapsed`` seconds to a report dict."""
+    latencies = [seconds for _, seconds in samples]
+    errors = sum(1 for status, _ in samples if status is None or status >= 500)
+    return {
+        'requests': len(samples),
+        'throughput_rps': len(samples) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'errors': errors,
+        'statuses': dict(Counter(status for status, _ in samples)),
+    }
+
+
+def replay_wsgi(requests, concurrency, application=None):
+    """Replay ``requests`` (``(method, url, cookie, body, content_type)`` tuples) on a thread pool.
+
+    Returns ``(samples, elapsed)``: one ``(status, seconds)`` sample per request, in request order.
+    """
+    application = application or WSGIHandler()
+
+    def send(request):
+        started = time.perf_counter()
+        try:
+            status = wsgi_call(application, *request)
+        except Exception:
+            status = None
+        return status, time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(send, requests))
+    return samples, time.perf_counter() - started
+
+
+def run_wsgi(requests, concurrency, application=None):
+    return summarize(*replay_wsgi(requests, concurrency, application))
+
+
+def replay_asgi(requests, concurrency, application=None):
+    """Replay ``requests`` against the ASGI handler with at most ``concurrency`` in flight.
+
+    Returns ``(samples, elapsed)`` like :func:`replay_wsgi`.
+    """
+    application = application or ASGIHandler()
+
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def send(request):
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    status = await asgi_call(application, *request)
+                except Exception:
+                    status = None
+                return status, time.perf_counter() - started
+
+        started = time.perf_counter()
+        samples = await asyncio.gather(*(send(request) for request in requests))
+        return samples, time.perf_counter() - started
+
+    return asyncio.run(main())
+
+
+def run_asgi(requests, concurrency, application=None):
+    return summarize(*replay_asgi(requests, concurrency, application))
+
+
+def is_lock_timeout(exc):
+    """Whether ``exc`` is the database giving up on a lock: SQLite's busy timeout, or a lock
+    timeout or deadlock on PostgreSQL."""
+    return isinstance(exc, OperationalError) and 'lock' in str(exc).lower()
+
+
+@contextmanager
+def request_exceptions():
+    """Count the exceptions views raise inside the block, keyed ``'lock_timeout'`` or by class name.
+
+    Django turns them into 500 responses, so the status code alone cannot tell a lock timeout
+    from a bug.
+    """
+    counts, lock = Counter(), threading.Lock()
+
+    def record(sender, **kwargs):
+        exc = sys.exc_info()[1]
+        with lock:
+            counts['lock_timeout' if is_lock_timeout(exc) else type(exc).__name__] += 1
+
+    got_request_exception.connect(record)
+    try:
+        yield counts
+    finally:
+        got_request_exception.disconnect(record)
+
+
+def booking_integrity(service_ids):
+    """Check the reservations of ``service_ids`` for double bookings after a load run.
+
+    Returns a dict of problem counts that should all be zero: slots holding more reservations
+    than units, slots whose ``remaining`` counter disagrees with their reservations, and days
+    whose availability bitmap disagrees with them.
+    """
+    overbooked = AvailableTime.objects.filter(service_id__in=service_ids).annotate(
+        booked=Count('reservation')).filter(booked__gt=F('capacity')).count()
+    return {
+        'overbooked_slots': overbooked,
+        'miscounted_slots': len(availability.find_miscounted_slots(service_ids)),
+        'index_mismatches': len(availability.find_inconsistencies(service_ids)),
+    }
@@ -0,0 +1,33 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from hotels import exports
+
+
+class ExportCommand(BaseCommand):
+    """Shared options for the streaming export commands; subclasses set ``rows`` and ``columns``."""
+    rows = None
+    columns = ()
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=exports.FORMATS, default='csv')
+        parser.add_argument('--start', help='First day to include (YYYY-MM-DD).')
+        parser.add_argument('--end', help='Last day to include (YYYY-MM-DD).')
+        parser.add_argument('--hotel', type=int, help='Only export this hotel id.')
+        parser.add_argument('--chunk-size', type=int, default=exports.CHUNK_SIZE)
+        parser.add_argument('--output', help='Write to this file instead of standard output.')
+
+    def handle(self, *args, **options):
+        try:
+            start, end = exports.parse_day(options['start']), exports.parse_day(options['end'])
+        except ValueError:
+            raise CommandError('--start and --end must use the YYYY-MM-DD format.')
+
+        rows = type(self).rows(start, end, options['hotel'], chunk_size=options['chunk_size'])
+        output = open(options['output'], 'w', newline='', encoding='utf-8') if options['output'] else sys.stdout
+        try:
+            output.writelines(exports.serialize(rows, self.columns, options['format']))
+        finally:
+            if output is not sys.stdout:
+                output.close()
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from hotels import archival
+from hotels.models import AvailableTime, Reservation
+
+
+class Command(BaseCommand):
+    help = ('Move reservations for slots older than RESERVATION_RETENTION_DAYS into the archive table, in '
+            'chunks of one transaction each, then delete the slots and index days only they used. Safe to '
+            'interrupt and rerun: every run picks up where the last one stopped.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int,
+                            help='Keep this many past days live (default: RESERVATION_RETENTION_DAYS).')
+        parser.add_argument('--chunk-size', type=int, default=archival.CHUNK_SIZE,
+                            help='Reservations moved per transaction.')
+        parser.add_argument('--max-chunks', type=int, help='Stop after this many chunks; rerun to continue.')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be archived.')
+
+    def handle(self, *args, days=None, chunk_size=archival.CHUNK_SIZE, max_chunks=None, dry_run=False, **options):
+        before = archival.cutoff(days)
+        if dry_run:
+            reservations = Reservation.objects.filter(reserved_for__start_time__lt=before).count()
+            slots = AvailableTime.objects.filter(start_time__lt=before).count()
+            self.stdout.write(f'Would archive {reservations} reservation(s) and remove {slots} slot(s) '
+                              f'starting before {before.isoformat()}.')
+            return
+
+        totals = archival.archive(before, chunk_size, max_chunks)
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {totals["reservations"]} reservation(s); removed {totals["slots"]} slot(s) and '
+            f'{totals["index_days"]} index day(s) before {before.isoformat()}.'))
+        if not totals['complete']:
+            self.stdout.write('Stopped at --max-chunks; rerun to archive the rest.')
@@ -0,0 +1,142 @@
+import json
+import time
+import tracemalloc
+from datetime import timedelta
+from itertools import count
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils.timezone import now
+
+from hotels import availability
+from hotels.benchmarking import percentile, seed, throwaway_database
+from hotels.models import CustomUser, RoomService, Service
+from hotels.room_service_queue import room_service_queue
+
+
+class Command(BaseCommand):
+    help = ('Benchmark the booking and browsing flows through the test client against a seeded throwaway '
+            'database, report latency, queries per request and peak memory, and compare with a baseline.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hotels', type=int, default=5)
+        parser.add_argument('--services', type=int, default=4, help='Services per hotel.')
+        parser.add_argument('--guests', type=int, default=2000)
+        parser.add_argument('--days', type=int, default=730, help='Days of booking history per service.')
+        parser.add_argument('--requests', type=int, default=200, help='Timed requests per scenario.')
+        parser.add_argument('--output', help='Write the results as JSON to this file.')
+        parser.add_argument('--baseline', help='Compare against the results stored in this JSON file.')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed p99 latency growth over the baseline, as a fraction.')
+
+    def handle(self, *args, **options):
+        with throwaway_database(), override_settings(ALLOWED_HOSTS=['*']):
+            self.stdout.write('Seeding...')
+            dataset = seed(hotels=options['hotels'], services_per_hotel=options['services'],
+                           guests=options['guests'], days=options['days'])
+            cache.clear()
+            scenarios = self.scenarios()
+            results = {
+                'dataset': dataset,
+                'room_service_intake': settings.ROOM_SERVICE_INTAKE,
+                'scenarios': {name: self.measure(send, options['requests']) for name, send in scenarios.items()},
+            }
+            room_service_queue.flush()
+
+        for name, result in results['scenarios'].items():
+            self.stdout.write(f'{name:<24} p50={result["p50_ms"]:7.2f}ms  p99={result["p99_ms"]:7.2f}ms  '
+                              f'queries={result["queries"]:5.1f}  peak={result["peak_kib"]:8.1f}KiB')
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(results, fh, indent=2)
+        if options['baseline']:
+            self.compare(results, options['baseline'], options['tolerance'])
+
+    def scenarios(self):
+        guest = CustomUser.objects.annotate(bookings=Count('reservation')).order_by('-bookings').first()
+        service = Service.objects.filter(hotel_id=guest.hotel_id).order_by('id').first()
+        room_service = RoomService.objects.filter(hotel_id=guest.hotel_id).order_by('id').first()
+        client = Client()
+        client.force_login(guest)
+        anonymous = Client()
+
+        browse_day = (now() + timedelta(days=1)).date()
+        # POSTs book two fresh slots each, walking forward past the seeded history.
+        free_slots = self.free_slot_pairs(service, (now() + timedelta(days=60)).date())
+
+        def reserve_post():
+            first, second = next(free_slots)
+            return client.post(f'/hotels/reserve/{service.id}/?date={first.date()}', {
+                'reservation_times': f'{first:%Y-%m-%d %H:%M:%S},{second:%Y-%m-%d %H:%M:%S}',
+            })
+
+        return {
+            'hotel_detail_anonymous': lambda: anonymous.get(f'/hotels/hotel/{guest.hotel_id}/'),
+            'hotel_detail_guest': lambda: client.get(f'/hotels/hotel/{guest.hotel_id}/'),
+            'reserve_service_get': lambda: client.get(f'/hotels/reserve/{service.id}/?date={browse_day}'),
+            'reserve_service_post': reserve_post,
+            'room_service_request': lambda: client.post(f'/hotels/room_service_request/{room_service.id}/'),
+            'user_reservations': lambda: client.get('/hotels/reservations/'),
+        }
+
+    def free_slot_pairs(self, service, first_day):
+        for offset in count():
+            day = first_day + timedelta(days=offset)
+            slots = availability.free_slots(service, day)
+            for index in range(0, len(slots) - 1, 2):
+                yield slots[index], slots[index + 1]
+
+    def measure(self, send, repeat):
+        for _ in range(5):
+            self.check_response(send())
+
+        latencies, queries = [], []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                self.check_response(send())
+                latencies.append(time.perf_counter() - started)
+            queries.append(len(captured))
+
+        peaks = []
+        for _ in range(min(repeat, 20)):
+            tracemalloc.start()
+            send()
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+        return {
+            'requests': repeat,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            'queries': sum(queries) / len(queries),
+            'max_queries': max(queries),
+            'peak_kib': max(peaks) / 1024,
+        }
+
+    def check_response(self, response):
+        if response.status_code >= 400:
+            raise CommandError(f'{response.request["PATH_INFO"]} returned {response.status_code}')
+
+    def compare(self, results, baseline_path, tolerance):
+        with open(baseline_path) as fh:
+            baseline = json.load(fh)
+
+        regressions = []
+        for name, result in results['scenarios'].items():
+            previous = baseline['scenarios'].get(name)
+            if previous is None:
+                continue
+            if result['p99_ms'] > previous['p99_ms'] * (1 + tolerance):
+                regressions.append(f'{name}: p99 {previous["p99_ms"]:.2f}ms -> {result["p99_ms"]:.2f}ms')
+            if result['max_queries'] > previous['max_queries']:
+                regressions.append(f'{name}: queries {previous["max_queries"]} -> {result["max_queries"]}')
+
+        if regressions:
+            raise CommandError('Performance regressions against the baseline:\n  ' + '\n  '.join(regressions))
+        self.stdout.write(self.style.SUCCESS('No regressions against the baseline.'))
@@ -0,0 +1,100 @@
+import gc
+import json
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import override_settings
+from django.utils.timezone import now
+
+from hotels import loadtest, schedules
+from hotels.benchmarking import seed, throwaway_database
+from hotels.models import CustomUser, Reservation, Service
+
+
+class Command(BaseCommand):
+    help = ('Measure booking throughput under concurrent reserve_service POSTs for the configured database '
+            'profile, tuned and untuned, against a seeded throwaway database per run.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=400, help='Booking POSTs per run.')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+        parser.add_argument('--services', type=int, default=4)
+        parser.add_argument('--guests', type=int, default=100)
+        parser.add_argument('--conflicts', type=float, default=0.1,
+                            help='Fraction of extra requests that race for an already requested slot pair.')
+        parser.add_argument('--json', dest='json_path', help='Also write the results to this file.')
+
+    def handle(self, *args, **options):
+        connection = connections[DEFAULT_DB_ALIAS]
+        results = []
+        for variant, overrides in self.variants(connection).items():
+            with self.database_settings(connection, overrides):
+                for concurrency in options['concurrency']:
+                    with throwaway_database(), override_settings(ALLOWED_HOSTS=['*']):
+                        seed(hotels=1, services_per_hotel=options['services'], guests=options['guests'], days=0)
+                        result = {'vendor': connection.vendor, 'variant': variant, 'concurrency': concurrency,
+                                  **self.run_bookings(options['requests'], concurrency, options['conflicts'])}
+                        # Drop the worker threads' connections before the database is destroyed.
+                        gc.collect()
+                    results.append(result)
+                    self.stdout.write(
+                        f'{variant:<12} c={concurrency:<3} {result["throughput_rps"]:8.1f} req/s  '
+                        f'p50={result["p50_ms"]:.1f}ms  p99={result["p99_ms"]:.1f}ms  errors={result["errors"]}  '
+                        f'booked={result["booked_slots"]}/{result["expected_slots"]}  statuses={result["statuses"]}')
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as fh:
+                json.dump(results, fh, indent=2)
+
+    def variants(self, connection):
+        """Settings overrides to compare; an empty dict runs the profile as configured."""
+        if connection.vendor == 'sqlite':
+            return {'untuned': {'OPTIONS': {}}, 'tuned': {}}
+        return {'untuned': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False}, 'tuned': {}}
+
+    @contextmanager
+    def database_settings(self, connection, overrides):
+        # Every thread's connection is built from this same settings dict.
+        saved = {key: connection.settings_dict[key] for key in overrides}
+        connection.close()
+        connection.settings_dict.update(overrides)
+        try:
+            yield
+        finally:
+            connection.close()
+            connection.settings_dict.update(saved)
+
+    def run_bookings(self, count, concurrency, conflicts):
+        rng = random.Random(0)
+        service_ids = list(Service.objects.order_by('id').values_list('id', flat=True))
+        cookies = [loadtest.session_cookie(guest) for guest in CustomUser.objects.order_by('id')]
+        # Seeded history covers the next 30 days; book well past it, two adjacent hours per request.
+        first_day = now().date() + timedelta(days=45)
+        pairs_per_day = len(schedules.DEFAULT_SCHEDULE.slots(first_day)) // 2
+
+        pairs = []
+        for index in range(count):
+            position = index // len(service_ids)
+            day = first_day + timedelta(days=position // pairs_per_day)
+            start = schedules.DEFAULT_SCHEDULE.slots(day)[2 * (position % pairs_per_day)]
+            pairs.append((service_ids[index % len(service_ids)], start))
+        contested = [rng.choice(pairs) for _ in range(int(count * conflicts))]
+        expected_slots = 2 * len(pairs)
+        pairs += contested
+        rng.shuffle(pairs)
+
+        requests = []
+        for index, (service_id, start) in enumerate(pairs):
+            second = start + schedules.DEFAULT_SCHEDULE.slot_length
+            requests.append(loadtest.form_post(
+                f'/hotels/reserve/{service_id}/?date={start.date()}', cookies[index % len(cookies)],
+                {'reservation_times': f'{start:%Y-%m-%d %H:%M:%S},{second:%Y-%m-%d %H:%M:%S}'}))
+
+        result = loadtest.run_wsgi(requests, concurrency)
+        result['booked_slots'] = Reservation.objects.filter(
+            reserved_for__start_time__date__gte=first_day).count()
+        result['expected_slots'] = expected_slots
+        return result
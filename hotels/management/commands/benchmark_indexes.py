@@ -0,0 +1,146 @@
+import json
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils.timezone import now
+
+from hotels import availability, schedules
+from hotels.benchmarking import percentile, seed, throwaway_database, timed
+from hotels.models import AvailableTime, CustomUser, HotelRegisteredUser, Reservation, Service
+
+# The registration lookup is still measured; it is served by the unique private_number index.
+BENCHMARKED_MODELS = (AvailableTime, Reservation)
+
+
+class Command(BaseCommand):
+    help = ('Seed a throwaway database and compare query plans and latency of the booking hot paths '
+            'with and without the composite indexes and constraints.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hotels', type=int, default=5)
+        parser.add_argument('--services', type=int, default=4, help='Services per hotel.')
+        parser.add_argument('--guests', type=int, default=5000)
+        parser.add_argument('--days', type=int, default=365, help='Days of booking history per service.')
+        parser.add_argument('--repeat', type=int, default=200, help='Executions per query and phase.')
+        parser.add_argument('--json', dest='json_path', help='Also write the results to this file.')
+
+    def handle(self, *args, **options):
+        with throwaway_database():
+            self.stdout.write('Seeding...')
+            dataset = seed(hotels=options['hotels'], services_per_hotel=options['services'],
+                           guests=options['guests'], days=options['days'])
+            self.stdout.write(', '.join(f'{key}={value}' for key, value in dataset.items()))
+
+            queries = self.hot_queries()
+            connection.ensure_connection()
+            with connection.schema_editor() as editor:
+                self.drop_indexes(editor)
+            before = self.run_queries(queries, options['repeat'])
+            with connection.schema_editor() as editor:
+                self.create_indexes(editor)
+            after = self.run_queries(queries, options['repeat'])
+
+        results = {'dataset': dataset, 'queries': []}
+        for name in queries:
+            results['queries'].append({'name': name, 'before': before[name], 'after': after[name]})
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            for phase, result in (('before', before[name]), ('after', after[name])):
+                self.stdout.write(f'  {phase:<6} p50={result["p50_ms"]:.3f}ms p99={result["p99_ms"]:.3f}ms')
+                for line in result['plan'].splitlines():
+                    self.stdout.write(f'         {line}')
+        if options['json_path']:
+            with open(options['json_path'], 'w') as fh:
+                json.dump(results, fh, indent=2)
+
+    def hot_queries(self):
+        rng = random.Random(1)
+        service_ids = list(Service.objects.values_list('id', flat=True))
+        private_numbers = list(HotelRegisteredUser.objects.values_list('private_number', flat=True))
+        user_ids = list(CustomUser.objects.values_list('id', flat=True))
+        today = now().date()
+
+        def random_day():
+            return today - timedelta(days=rng.randrange(0, 365))
+
+        def random_slot():
+            return rng.choice(schedules.DEFAULT_SCHEDULE.slots(random_day()))
+
+        def reserved_times():
+            start, end = availability.day_bounds(random_day())
+            return Reservation.objects.filter(
+                service_id=rng.choice(service_ids),
+                reserved_for__start_time__gte=start,
+                reserved_for__start_time__lt=end
+            ).values_list('reserved_for__start_time', flat=True)
+
+        def slot_probe():
+            start_time = random_slot()
+            return AvailableTime.objects.filter(service_id=rng.choice(service_ids), start_time=start_time,
+                                                end_time=start_time + schedules.DEFAULT_SCHEDULE.slot_length)
+
+        def booking_lock():
+            return AvailableTime.objects.filter(service_id=rng.choice(service_ids),
+                                                start_time__in=[random_slot() for _ in range(3)])
+
+        def registration():
+            return HotelRegisteredUser.objects.filter(
+                private_number=rng.choice(private_numbers)).values_list('hotel_id', flat=True)
+
+        def user_reservations():
+            return Reservation.objects.filter(user_id=rng.choice(user_ids)).order_by('-reservation_date')[:25]
+
+        return {
+            'reserved start times for a service/day': reserved_times,
+            'AvailableTime probe by service/start/end': slot_probe,
+            'booking engine slot read': booking_lock,
+            'registration lookup': registration,
+            'user reservations page': user_reservations,
+        }
+
+    def run_queries(self, queries, repeat):
+        results = {}
+        for name, build in queries.items():
+            plan = build().explain()
+            samples = timed(lambda: list(build()), repeat)
+            results[name] = {
+                'plan': plan,
+                'p50_ms': percentile(samples, 50) * 1000,
+                'p99_ms': percentile(samples, 99) * 1000,
+            }
+        return results
+
+    def drop_indexes(self, editor):
+        for model in BENCHMARKED_MODELS:
+            if connection.vendor == 'sqlite':
+                # SQLite keeps unique constraints inside the table definition, so rebuild the table
+                # while the model declares no indexes or constraints.
+                with without_indexes(model):
+                    editor._remake_table(model)
+                continue
+            for index in model._meta.indexes:
+                editor.remove_index(model, index)
+            for constraint in model._meta.constraints:
+                editor.remove_constraint(model, constraint)
+
+    def create_indexes(self, editor):
+        for model in BENCHMARKED_MODELS:
+            if connection.vendor == 'sqlite':
+                editor._remake_table(model)
+                continue
+            for index in model._meta.indexes:
+                editor.add_index(model, index)
+            for constraint in model._meta.constraints:
+                editor.add_constraint(model, constraint)
+
+
+@contextmanager
+def without_indexes(model):
+    indexes, constraints = model._meta.indexes, model._meta.constraints
+    model._meta.indexes, model._meta.constraints = [], []
+    try:
+        yield
+    finally:
+        model._meta.indexes, model._meta.constraints = indexes, constraints
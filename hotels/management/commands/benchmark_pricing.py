@@ -0,0 +1,111 @@
+import json
+import pickle
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils.timezone import localtime, now
+
+from hotels import pricing, schedules
+from hotels.benchmarking import percentile, timed
+from hotels.models import PricingRule, Service
+
+
+class Command(BaseCommand):
+    help = ('Micro-benchmark the pricing engine: compiling a rule set, loading it from the cache and quoting '
+            'slot batches of growing size, compared with evaluating the raw rules slot by slot.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--slots', type=int, action='append',
+                            help='Batch size to quote (may be repeated; default 1, 12, 1000 and 10000).')
+        parser.add_argument('--rules', type=int, default=200, help='Rules of other services mixed into the set.')
+        parser.add_argument('--repeat', type=int, default=50, help='Timed runs per measurement.')
+        parser.add_argument('--json', dest='json_path', help='Also write the results to this file.')
+
+    def handle(self, *args, **options):
+        service = Service(id=1, hotel_id=1, name='Benchmark service', price=Decimal('80.00'))
+        rules = self.rules(options['rules'])
+        repeat = options['repeat']
+        compiled = pricing.RuleSet.compile(service, rules)
+        cached = pickle.dumps(compiled)
+
+        results = {
+            'compile': self.summary(timed(lambda: pricing.RuleSet.compile(service, rules), repeat)),
+            # What a cache hit costs on top of the backend round trip.
+            'cache_load': self.summary(timed(lambda: pickle.loads(cached), repeat)),
+            'quotes': [],
+        }
+        for size in options['slots'] or [1, 12, 1000, 10000]:
+            slot_times = self.slot_times(size)
+            engine = timed(lambda: compiled.quote(slot_times), repeat)
+            naive = timed(lambda: naive_quote(service, rules, slot_times), max(1, repeat // 5))
+            assert naive_quote(service, rules, slot_times) == compiled.quote(slot_times).total
+            results['quotes'].append({
+                'slots': size,
+                'engine': self.summary(engine, size),
+                'naive': self.summary(naive, size),
+            })
+
+        self.stdout.write(f'compile     p50={results["compile"]["p50_ms"]:.3f}ms')
+        self.stdout.write(f'cache load  p50={results["cache_load"]["p50_ms"]:.3f}ms')
+        for quote in results['quotes']:
+            engine, naive = quote['engine'], quote['naive']
+            self.stdout.write(
+                f'{quote["slots"]:>6} slots  engine p50={engine["p50_ms"]:8.3f}ms ({engine["us_per_slot"]:6.2f}us/slot)'
+                f'  naive p50={naive["p50_ms"]:8.3f}ms ({naive["us_per_slot"]:6.2f}us/slot)'
+                f'  x{naive["p50_ms"] / engine["p50_ms"]:.1f}')
+        if options['json_path']:
+            with open(options['json_path'], 'w') as fh:
+                json.dump(results, fh, indent=2)
+
+    def summary(self, samples, slots=1):
+        p50 = percentile(samples, 50)
+        return {'p50_ms': p50 * 1000, 'p99_ms': percentile(samples, 99) * 1000, 'us_per_slot': p50 * 1e6 / slots}
+
+    def rules(self, others):
+        rules = [
+            PricingRule(kind='rate', factor=Decimal('0.2')),
+            PricingRule(hotel_id=1, kind='rate', factor=Decimal('0.25')),
+            PricingRule(hotel_id=1, kind='peak', factor=Decimal('1.5'), start_time=time(17), end_time=time(21),
+                        weekdays='1,2,3,4,5'),
+            PricingRule(hotel_id=1, kind='peak', factor=Decimal('1.25'), start_time=time(10), end_time=time(13),
+                        weekdays='6,7'),
+            PricingRule(service_id=1, hotel_id=1, kind='multi_hour', factor=Decimal('0.95'), min_hours=3),
+            PricingRule(service_id=1, hotel_id=1, kind='multi_hour', factor=Decimal('0.9'), min_hours=6),
+        ]
+        for i in range(others):
+            rules.append(PricingRule(service_id=i + 2, hotel_id=i % 5 + 1, kind='peak', factor=Decimal('2'),
+                                     start_time=time(12), end_time=time(14)))
+        return rules
+
+    def slot_times(self, size):
+        day, slot_times = (now() + timedelta(days=1)).date(), []
+        while len(slot_times) < size:
+            slot_times.extend(schedules.DEFAULT_SCHEDULE.slots(day))
+            day += timedelta(days=1)
+        return slot_times[:size]
+
+
+def naive_quote(service, rules, slot_times):
+    """Price slots by re-evaluating every raw rule for every slot, as inline arithmetic would."""
+    def applicable(kind):
+        matching = [rule for rule in rules if rule.kind == kind and rule.active
+                    and rule.service_id in (None, service.id) and rule.hotel_id in (None, service.hotel_id)]
+        scope = max((2 if rule.service_id else 1 if rule.hotel_id else 0 for rule in matching), default=0)
+        return [rule for rule in matching if (2 if rule.service_id else 1 if rule.hotel_id else 0) == scope]
+
+    hours = pricing.slot_hours(datetime.min, datetime.min + schedules.DEFAULT_SCHEDULE.slot_length)
+    total = Decimal(0)
+    for slot_time in slot_times:
+        rate = next((rule.factor for rule in applicable('rate')), pricing.DEFAULT_CHARGED_RATE)
+        local = localtime(slot_time)
+        minute = local.hour * 60 + local.minute
+        peak = max((rule.factor for rule in applicable('peak')
+                    if rule.start_time.hour * 60 + rule.start_time.minute <= minute
+                    < rule.end_time.hour * 60 + rule.end_time.minute
+                    and (not rule.weekdays or local.isoweekday() in rule.weekday_numbers())), default=Decimal(1))
+        batch_hours = hours * len(slot_times)
+        discount = max(((rule.min_hours, rule.factor) for rule in applicable('multi_hour')
+                        if batch_hours >= rule.min_hours), default=(0, Decimal(1)))[1]
+        total += (service.price * rate * peak * hours * discount).quantize(pricing.CENT)
+    return total
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from hotels import availability
+from hotels.models import AvailableTime
+
+
+class Command(BaseCommand):
+    help = ('Compare the slot availability index and the per-slot capacity counters against the reservations '
+            'they are built from.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--service', type=int, action='append', dest='service_ids',
+                            help='Only check this service id (may be repeated).')
+        parser.add_argument('--fix', action='store_true', help='Rewrite the entries that disagree.')
+
+    def handle(self, *args, service_ids=None, fix=False, **options):
+        miscounted = availability.find_miscounted_slots(service_ids)
+        for slot_id, service_id, start_time, stored, expected in miscounted:
+            self.stdout.write(f'service={service_id} slot={slot_id} start={start_time.isoformat()} '
+                              f'remaining={stored} expected={expected}')
+        if fix and miscounted:
+            availability.recount_slots(AvailableTime.objects.filter(pk__in=[slot[0] for slot in miscounted]))
+
+        mismatches = availability.find_inconsistencies(service_ids)
+        if not mismatches and not miscounted:
+            self.stdout.write(self.style.SUCCESS('Slot availability index is consistent.'))
+            return
+
+        for service_id, day, stored, expected in mismatches:
+            self.stdout.write(f'service={service_id} day={day} stored={stored:#x} expected={expected:#x}')
+            if fix:
+                availability.refresh_day(service_id, day)
+        problems = len(mismatches) + len(miscounted)
+        if fix:
+            self.stdout.write(self.style.SUCCESS(f'Fixed {problems} entr(ies).'))
+        else:
+            raise CommandError(f'{problems} inconsistent entr(ies) found; rerun with --fix to repair.')
@@ -0,0 +1,46 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from hotels import availability, booking, exports
+from hotels.models import Reservation
+
+
+class Command(BaseCommand):
+    help = ('Cancel, or move by whole days, every upcoming reservation of the given services between two '
+            'days, e.g. while a spa or court is closed for maintenance. Runs as one transaction.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--service', type=int, action='append', dest='service_ids', required=True,
+                            help='Service id to close (may be repeated).')
+        parser.add_argument('--start', required=True, help='First closed day (YYYY-MM-DD).')
+        parser.add_argument('--end', help='Last closed day (YYYY-MM-DD); defaults to --start.')
+        parser.add_argument('--move-days', type=int,
+                            help='Move each reservation this many days instead of cancelling it.')
+
+    def handle(self, *args, service_ids=None, move_days=None, **options):
+        try:
+            start = exports.parse_day(options['start'])
+            end = exports.parse_day(options['end']) or start
+        except ValueError:
+            raise CommandError('--start and --end must use the YYYY-MM-DD format.')
+
+        reservations = Reservation.objects.filter(
+            service_id__in=service_ids,
+            reserved_for__start_time__gte=availability.day_bounds(start)[0],
+            reserved_for__start_time__lt=availability.day_bounds(end)[1],
+        ).order_by('reserved_for__start_time', 'id')
+        if move_days:
+            outcomes = booking.reschedule_reservations(
+                (reservation_id, start_time + timedelta(days=move_days))
+                for reservation_id, start_time in reservations.values_list('id', 'reserved_for__start_time'))
+        else:
+            outcomes = booking.cancel_reservations(list(reservations.values_list('id', flat=True)))
+
+        if options['verbosity'] > 1:
+            for reservation_id, outcome in outcomes.items():
+                self.stdout.write(f'reservation={reservation_id} status={outcome}')
+        counts = Counter(outcomes.values())
+        summary = ', '.join(f'{outcome}={count}' for outcome, count in sorted(counts.items())) or 'nothing to do'
+        self.stdout.write(self.style.SUCCESS(f'Closed {len(service_ids)} service(s) from {start} to {end}: {summary}.'))
@@ -0,0 +1,10 @@
+from hotels import exports
+
+from ._export import ExportCommand
+
+
+class Command(ExportCommand):
+    help = ('Stream reservations, with hotel, service, guest and revenue per line, as CSV or JSON Lines. '
+            'Dates filter on the day the reserved slot starts.')
+    rows = exports.reservation_rows
+    columns = exports.RESERVATION_COLUMNS
@@ -0,0 +1,10 @@
+from hotels import exports
+
+from ._export import ExportCommand
+
+
+class Command(ExportCommand):
+    help = ('Stream room-service requests, with hotel, room service and guest per line, as CSV or JSON Lines. '
+            'Dates filter on the day the request was made.')
+    rows = exports.room_service_rows
+    columns = exports.ROOM_SERVICE_COLUMNS
@@ -0,0 +1,51 @@
+import os
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.core.management.base import BaseCommand
+
+from hotels import caching, thumbnails
+from hotels.models import Hotel, RoomService, Service
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.jfif', '.webp', '.gif')
+
+
+class Command(BaseCommand):
+    help = ('Backfill the resized JPEG and WebP variants of uploaded hotel, service and room-service images '
+            'and, with --static, of the images under STATICFILES_DIRS.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--static', action='store_true', help='Also process images under STATICFILES_DIRS.')
+        parser.add_argument('--force', action='store_true', help='Regenerate variants that already exist.')
+
+    def handle(self, *args, **options):
+        written = 0
+        hotel_ids = set()
+        for model in (Hotel, Service, RoomService):
+            hotel_field = 'pk' if model is Hotel else 'hotel_id'
+            for hotel_id, name in model.objects.exclude(image='').exclude(image=None).values_list(hotel_field, 'image'):
+                written += self.process(model._meta.get_field('image').storage, name, options['force'])
+                hotel_ids.add(hotel_id)
+
+        if options['static']:
+            hotel_ids.update(Hotel.objects.values_list('pk', flat=True))
+            for directory in settings.STATICFILES_DIRS:
+                storage = FileSystemStorage(location=directory)
+                for root, _, files in os.walk(directory):
+                    for filename in sorted(files):
+                        name = os.path.relpath(os.path.join(root, filename), directory)
+                        if name.lower().endswith(IMAGE_EXTENSIONS) and not thumbnails.is_variant(name):
+                            written += self.process(storage, name, options['force'])
+
+        for hotel_id in hotel_ids:
+            caching.invalidate_hotel_detail(hotel_id)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} image variant(s).'))
+
+    def process(self, storage, name, force):
+        if not storage.exists(name):
+            self.stderr.write(f'Missing original: {name}')
+            return 0
+        written = thumbnails.generate_variants(storage, name, force=force)
+        if written:
+            self.stdout.write(f'{name}: {len(written)} variant(s)')
+        return len(written)
@@ -0,0 +1,47 @@
+import csv
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from hotels import roster
+
+
+class Command(BaseCommand):
+    help = ('Stream a CSV or JSON Lines guest roster (private_number, email, hotel) into HotelRegisteredUser, '
+            'updating guests that are already registered.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Roster file, or - to read standard input.')
+        parser.add_argument('--format', choices=roster.FORMATS, help='Defaults to the file extension.')
+        parser.add_argument('--hotel', type=int, help='Hotel id for rows that do not name one.')
+        parser.add_argument('--chunk-size', type=int, default=roster.DEFAULT_CHUNK_SIZE)
+        parser.add_argument('--errors', help='Write rejected rows as CSV (line, error) to this file.')
+
+    def handle(self, *args, path, **options):
+        file_format = options['format'] or roster.guess_format(path)
+        errors_file = open(options['errors'], 'w', newline='') if options['errors'] else None
+        errors = csv.writer(errors_file) if errors_file else None
+        if errors:
+            errors.writerow(['line', 'error'])
+
+        def report(line, message):
+            if errors:
+                errors.writerow([line, message])
+            else:
+                self.stderr.write(f'line {line}: {message}')
+
+        try:
+            source = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8-sig')
+        except OSError as exc:
+            raise CommandError(exc)
+        try:
+            result = roster.RosterImport(options['hotel'], options['chunk_size'], report).run(
+                roster.read_rows(source, file_format))
+        finally:
+            if source is not sys.stdin:
+                source.close()
+            if errors_file:
+                errors_file.close()
+
+        summary = f'Created {result.created}, updated {result.updated}, rejected {result.failed} row(s).'
+        self.stdout.write(self.style.WARNING(summary) if result.failed else self.style.SUCCESS(summary))
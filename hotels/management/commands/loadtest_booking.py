@@ -0,0 +1,124 @@
+import gc
+import json
+import random
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.utils.timezone import now
+
+from hotels import loadtest, schedules
+from hotels.benchmarking import seed, throwaway_database
+from hotels.models import CustomUser, Reservation, Service, ServiceSchedule
+
+
+class Command(BaseCommand):
+    help = ('Load-test reserve_service with many registered guests racing for the same few slots of one '
+            'service: concurrent page and calendar GETs mixed with booking POSTs over overlapping slots, '
+            'driven in-process through the WSGI or ASGI handler against a seeded throwaway database. '
+            'Reports throughput, latency percentiles, error and lock-timeout rates and checks that no '
+            'slot was booked beyond its capacity.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--guests', type=int, default=200, help='Registered guests taking part.')
+        parser.add_argument('--bookings', type=int, default=400, help='Booking POSTs to send.')
+        parser.add_argument('--reads', type=int, default=2, help='GETs sent along with every booking POST.')
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--slots', type=int, default=6, help='Contested slots of the day everyone books.')
+        parser.add_argument('--slots-per-booking', type=int, default=2,
+                            help='Consecutive slots each POST asks for, so bookings overlap.')
+        parser.add_argument('--capacity', type=int, default=1, help='Units per slot, e.g. courts or spa beds.')
+        parser.add_argument('--handler', choices=['wsgi', 'asgi'], default='wsgi')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the request mix.')
+        parser.add_argument('--json', dest='json_path', help='Also write the results to this file.')
+
+    def handle(self, *args, **options):
+        if not 1 <= options['slots_per_booking'] <= options['slots']:
+            raise CommandError('--slots-per-booking must be between 1 and --slots.')
+        if options['capacity'] < 1 or options['bookings'] < 1:
+            raise CommandError('--capacity and --bookings must be at least 1.')
+
+        with throwaway_database(), override_settings(ALLOWED_HOSTS=['*']):
+            seed(hotels=1, services_per_hotel=1, guests=options['guests'], days=0)
+            service = Service.objects.get()
+            ServiceSchedule.objects.create(service=service, capacity=options['capacity'])
+            result = self.run(service, options)
+            # Drop the worker threads' connections before the database is destroyed.
+            gc.collect()
+
+        for kind in ('read', 'booking'):
+            summary = result[kind]
+            self.stdout.write(
+                f'{kind:<8} {summary["requests"]:>6} requests  {summary["throughput_rps"]:8.1f} req/s  '
+                f'p50={summary["p50_ms"]:.1f}ms  p95={summary["p95_ms"]:.1f}ms  p99={summary["p99_ms"]:.1f}ms  '
+                f'statuses={summary["statuses"]}')
+        self.stdout.write(
+            f'total    {result["requests"]:>6} requests  {result["throughput_rps"]:8.1f} req/s  '
+            f'error rate={result["error_rate"]:.2%}  lock-timeout rate={result["lock_timeout_rate"]:.2%}  '
+            f'exceptions={result["exceptions"]}')
+        self.stdout.write(
+            f'booked {result["confirmed"]} of {result["booking"]["requests"]} POSTs; '
+            f'{result["reserved_slots"]} reservation(s) for {result["offered_units"]} unit(s) on offer')
+
+        integrity = result['integrity']
+        if options['json_path']:
+            with open(options['json_path'], 'w') as fh:
+                json.dump(result, fh, indent=2)
+        if any(integrity.values()):
+            raise CommandError('Double booking detected: ' + ', '.join(f'{key}={value}'
+                                                                       for key, value in integrity.items()))
+        self.stdout.write(self.style.SUCCESS('Integrity check passed: no slot was booked beyond its capacity.'))
+
+    def run(self, service, options):
+        rng = random.Random(options['seed'])
+        cookies = [loadtest.session_cookie(guest) for guest in CustomUser.objects.order_by('id')]
+        # Seeded history covers the next 30 days; everyone fights over a few slots of a later day.
+        day = now().date() + timedelta(days=45)
+        contested = schedules.get(service.id).slots(day)[:options['slots']]
+        per_booking = options['slots_per_booking']
+
+        requests, kinds = [], []
+        for index in range(options['bookings']):
+            cookie = cookies[index % len(cookies)]
+            first = rng.randrange(len(contested) - per_booking + 1)
+            times = ','.join(f'{slot_time:%Y-%m-%d %H:%M:%S}' for slot_time in contested[first:first + per_booking])
+            requests.append(loadtest.form_post(f'/hotels/reserve/{service.id}/?date={day}', cookie,
+                                               {'reservation_times': times}))
+            kinds.append('booking')
+            for _ in range(options['reads']):
+                requests.append(('GET', rng.choice([
+                    f'/hotels/reserve/{service.id}/?date={day}',
+                    f'/hotels/reserve/{service.id}/availability/?start={day}&end={day}',
+                ]), cookie))
+                kinds.append('read')
+
+        replay = loadtest.replay_asgi if options['handler'] == 'asgi' else loadtest.replay_wsgi
+        with loadtest.request_exceptions() as exceptions:
+            samples, elapsed = replay(requests, options['concurrency'])
+
+        total = loadtest.summarize(samples, elapsed)
+        result = {
+            'handler': options['handler'],
+            'concurrency': options['concurrency'],
+            'guests': len(cookies),
+            'capacity': options['capacity'],
+            **total,
+            'error_rate': total['errors'] / total['requests'],
+            'lock_timeout_rate': exceptions['lock_timeout'] / total['requests'],
+            'exceptions': dict(exceptions),
+        }
+        for kind in ('read', 'booking'):
+            result[kind] = loadtest.summarize(
+                [sample for sample, sample_kind in zip(samples, kinds) if sample_kind == kind], elapsed)
+
+        # A successful booking redirects; a rejected one renders the form again with a message.
+        result['confirmed'] = result['booking']['statuses'].get(302, 0)
+        result['reserved_slots'] = Reservation.objects.filter(
+            service=service, reserved_for__start_time__in=contested).count()
+        result['offered_units'] = len(contested) * options['capacity']
+        result['integrity'] = {
+            **loadtest.booking_integrity([service.id]),
+            # Every confirmed POST must have left exactly its slots behind, and nothing else.
+            'lost_or_phantom_reservations': abs(result['reserved_slots'] - result['confirmed'] * per_booking),
+        }
+        return result
@@ -0,0 +1,50 @@
+import json
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from django.utils.timezone import now
+
+from hotels import loadtest
+from hotels.benchmarking import seed, throwaway_database
+from hotels.models import CustomUser, Service
+
+
+class Command(BaseCommand):
+    help = ('Compare WSGI and ASGI throughput on the read paths (hotel page, availability calendar and '
+            'reservations list) by driving both handlers in-process against a seeded throwaway database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Requests per endpoint and handler.')
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--json', dest='json_path', help='Also write the results to this file.')
+
+    def handle(self, *args, **options):
+        results = []
+        with throwaway_database(), override_settings(ALLOWED_HOSTS=['*']):
+            seed(hotels=2, services_per_hotel=4, guests=200, days=90)
+            guest = CustomUser.objects.order_by('id').first()
+            service = Service.objects.filter(hotel_id=guest.hotel_id).order_by('id').first()
+            cookie = loadtest.session_cookie(guest)
+            today = now().date()
+            calendar = f'?start={today}&end={today + timedelta(days=30)}'
+
+            endpoints = [
+                ('hotel_detail', f'/hotels/hotel/{guest.hotel_id}/', f'/hotels/async/hotel/{guest.hotel_id}/'),
+                ('availability', f'/hotels/reserve/{service.id}/availability/{calendar}',
+                 f'/hotels/async/reserve/{service.id}/availability/{calendar}'),
+                ('user_reservations', '/hotels/reservations/', '/hotels/async/reservations/'),
+            ]
+            for name, wsgi_url, asgi_url in endpoints:
+                for handler, url, run in (('wsgi', wsgi_url, loadtest.run_wsgi),
+                                          ('asgi', asgi_url, loadtest.run_asgi)):
+                    requests = [('GET', url, cookie)] * options['requests']
+                    result = {'endpoint': name, 'handler': handler, **run(requests, options['concurrency'])}
+                    results.append(result)
+                    self.stdout.write(
+                        f'{name:<18} {handler}  {result["throughput_rps"]:8.1f} req/s  '
+                        f'p50={result["p50_ms"]:.1f}ms  p99={result["p99_ms"]:.1f}ms  errors={result["errors"]}')
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as fh:
+                json.dump(results, fh, indent=2)
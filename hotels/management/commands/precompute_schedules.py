@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from hotels import schedules
+
+
+class Command(BaseCommand):
+    help = ('Generate and cache the bookable slots of every service for the rolling SCHEDULE_HORIZON_DAYS '
+            'horizon. Run it daily so the horizon keeps moving forward.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--service', type=int, action='append', dest='service_ids',
+                            help='Only precompute this service id (may be repeated).')
+        parser.add_argument('--days', type=int, help='Days ahead to generate; capped at SCHEDULE_HORIZON_DAYS.')
+
+    def handle(self, *args, service_ids=None, **options):
+        written = schedules.precompute(service_ids, options['days'])
+        self.stdout.write(self.style.SUCCESS(f'Precomputed slots for {written} service day(s).'))
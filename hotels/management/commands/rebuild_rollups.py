@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from hotels import rollups
+
+
+class Command(BaseCommand):
+    help = ('Backfill the per-hotel, per-service, per-day revenue, booked hours and room-service request '
+            'rollups from existing reservations and requests.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hotel', type=int, action='append', dest='hotel_ids',
+                            help='Only rebuild the rollups of this hotel id (may be repeated).')
+
+    def handle(self, *args, hotel_ids=None, **options):
+        rows = rollups.rebuild(hotel_ids)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rows} daily rollup row(s).'))
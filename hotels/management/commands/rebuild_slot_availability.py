@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from hotels import availability
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-service, per-day slot availability index from existing reservations.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--service', type=int, action='append', dest='service_ids',
+                            help='Only rebuild the index for this service id (may be repeated).')
+
+    def handle(self, *args, service_ids=None, **options):
+        days = availability.rebuild(service_ids)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt slot availability for {days} service day(s).'))
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from hotels import holds
+
+
+class Command(BaseCommand):
+    help = ('Delete expired slot holds in batches. Expired holds never block a booking, so this only keeps '
+            'the table small; run it from cron or keep it running with --interval.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Holds deleted per statement.')
+        parser.add_argument('--interval', type=int,
+                            help='Keep running and sweep again every this many seconds.')
+
+    def handle(self, *args, batch_size=1000, interval=None, **options):
+        while True:
+            removed = holds.sweep(batch_size)
+            self.stdout.write(self.style.SUCCESS(f'Removed {removed} expired slot hold(s).'))
+            if not interval:
+                return
+            time.sleep(interval)
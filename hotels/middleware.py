@@ -0,0 +1,74 @@
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from django.conf import settings
+
+from hotels import request_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class RequestMetricsMiddleware:
+    """Time each request's SQL, template rendering and total duration per URL name.
+
+    The numbers go into the per-process aggregates served by the ``request_metrics`` view, and
+    out in a ``Server-Timing`` header for staff, or for everyone while ``DEBUG`` is on. Slow requests and statements repeated often enough to look
+    like an N+1 are logged. Put it first in ``MIDDLEWARE`` so the total covers the other
+    middleware as well; work done while a streaming response is iterated is not counted.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        request_metrics.install()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        stats, token = request_metrics.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            request_metrics.stop(token)
+        self.finish(request, response, stats, settings.DEBUG or self.is_staff(getattr(request, 'user', None)))
+        return response
+
+    async def __acall__(self, request):
+        stats, token = request_metrics.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            request_metrics.stop(token)
+        show_timing = settings.DEBUG or (hasattr(request, 'auser') and self.is_staff(await request.auser()))
+        self.finish(request, response, stats, show_timing)
+        return response
+
+    def is_staff(self, user):
+        return user is not None and user.is_staff
+
+    def finish(self, request, response, stats, show_timing):
+        total = stats.elapsed()
+        view_name = request.resolver_match.view_name if request.resolver_match else 'unresolved'
+        total_ms = total * 1000
+        slow = total_ms >= request_metrics.slow_request_ms()
+        repeated = stats.repeated_queries(request_metrics.repeated_query_threshold())
+
+        request_metrics.record(view_name, stats, total, slow, bool(repeated))
+        if show_timing:
+            response['Server-Timing'] = (
+                f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries", '
+                f'tpl;dur={stats.template_seconds * 1000:.1f}, total;dur={total_ms:.1f}'
+            )
+
+        if slow:
+            logger.warning('slow_request view=%s path=%s total_ms=%.1f db_ms=%.1f tpl_ms=%.1f queries=%d',
+                           view_name, request.path, total_ms, stats.db_seconds * 1000,
+                           stats.template_seconds * 1000, stats.queries)
+        for shape, executions in repeated:
+            logger.warning('repeated_query view=%s path=%s executions=%d sql="%s"',
+                           view_name, request.path, executions, shape.replace('"', "'"))
@@ -0,0 +1,48 @@
+# Generated by Django 5.0.14 on 2026-10-18 06:01
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils.timezone import localtime
+
+
+def build_slot_availability(apps, schema_editor):
+    Reservation = apps.get_model('hotels', 'Reservation')
+    SlotAvailability = apps.get_model('hotels', 'SlotAvailability')
+    index = defaultdict(int)
+    for service_id, start_time in Reservation.objects.values_list('service_id', 'reserved_for__start_time'):
+        start_time = localtime(start_time)
+        index[(service_id, start_time.date())] |= 1 << start_time.hour
+    SlotAvailability.objects.bulk_create(
+        [SlotAvailability(service_id=service_id, day=day, reserved_slots=bitmap)
+         for (service_id, day), bitmap in index.items()],
+        batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0007_remove_hotel_description_hotel_image_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlotAvailability',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('reserved_slots', models.BigIntegerField(default=0)),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slot_availability', to='hotels.service')),
+            ],
+            options={
+                'verbose_name': 'Slot Availability',
+                'verbose_name_plural': 'Slot Availability',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='slotavailability',
+            constraint=models.UniqueConstraint(fields=('service', 'day'), name='unique_slot_availability_per_day'),
+        ),
+        migrations.RunPython(build_slot_availability, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations
+from django.db.models import Count, Exists, Min, OuterRef
+
+
+def merge_duplicate_available_times(apps, schema_editor):
+    AvailableTime = apps.get_model('hotels', 'AvailableTime')
+    Reservation = apps.get_model('hotels', 'Reservation')
+    duplicates = AvailableTime.objects.values('service_id', 'start_time').annotate(
+        count=Count('id'), keep_id=Min('id')).filter(count__gt=1)
+    for duplicate in duplicates:
+        extra = AvailableTime.objects.filter(
+            service_id=duplicate['service_id'], start_time=duplicate['start_time']
+        ).exclude(pk=duplicate['keep_id'])
+        Reservation.objects.filter(reserved_for__in=extra).update(reserved_for_id=duplicate['keep_id'])
+        extra.delete()
+
+    has_reservation = Exists(Reservation.objects.filter(reserved_for=OuterRef('pk')))
+    AvailableTime.objects.filter(is_reserved=True).exclude(has_reservation).update(is_reserved=False)
+    AvailableTime.objects.filter(is_reserved=False).filter(has_reservation).update(is_reserved=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0008_slotavailability'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_available_times, migrations.RunPython.noop),
+    ]
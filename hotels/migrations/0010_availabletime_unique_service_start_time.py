@@ -0,0 +1,17 @@
+# Generated by Django 5.0.14 on 2026-10-18 06:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0009_merge_duplicate_available_times'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='availabletime',
+            constraint=models.UniqueConstraint(fields=('service', 'start_time'), name='unique_available_time_per_service'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicate_reservations(apps, schema_editor):
+    Reservation = apps.get_model('hotels', 'Reservation')
+    duplicates = Reservation.objects.values('user_id', 'reserved_for_id').annotate(
+        count=Count('id'), keep_id=Min('id')).filter(count__gt=1)
+    for duplicate in duplicates:
+        Reservation.objects.filter(
+            user_id=duplicate['user_id'], reserved_for_id=duplicate['reserved_for_id']
+        ).exclude(pk=duplicate['keep_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0010_availabletime_unique_service_start_time'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_reservations, migrations.RunPython.noop),
+    ]
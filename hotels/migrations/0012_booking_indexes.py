@@ -0,0 +1,25 @@
+# Generated by Django 5.0.14 on 2026-10-18 06:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0011_merge_duplicate_reservations'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['service', 'reserved_for'], name='reservation_service_slot_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['user', '-reservation_date'], name='reservation_user_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='reservation',
+            constraint=models.UniqueConstraint(fields=('user', 'reserved_for'), name='unique_reservation_per_user_slot'),
+        ),
+    ]
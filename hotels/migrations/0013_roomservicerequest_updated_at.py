@@ -0,0 +1,22 @@
+# Generated by Django 5.0.14 on 2026-10-18 06:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0012_booking_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='roomservicerequest',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='roomservicerequest',
+            index=models.Index(fields=['updated_at', 'id'], name='room_service_request_delta_idx'),
+        ),
+    ]
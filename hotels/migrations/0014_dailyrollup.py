@@ -0,0 +1,65 @@
+# Generated by Django 5.0.14 on 2026-10-18 06:33
+
+from collections import defaultdict
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils.timezone import localtime
+
+
+def build_daily_rollups(apps, schema_editor):
+    Reservation = apps.get_model('hotels', 'Reservation')
+    RoomServiceRequest = apps.get_model('hotels', 'RoomServiceRequest')
+    DailyRollup = apps.get_model('hotels', 'DailyRollup')
+    rollups = defaultdict(lambda: {'booked_hours': Decimal(0), 'revenue': Decimal(0), 'room_service_requests': 0})
+    for hotel_id, service_id, price, start_time, end_time in Reservation.objects.values_list(
+            'service__hotel_id', 'service_id', 'service__price', 'reserved_for__start_time',
+            'reserved_for__end_time').iterator(chunk_size=2000):
+        hours = Decimal(int((end_time - start_time).total_seconds())) / 3600
+        totals = rollups[(hotel_id, service_id, localtime(start_time).date())]
+        totals['booked_hours'] += hours
+        totals['revenue'] += (price * hours * Decimal('0.2')).quantize(Decimal('0.01'))
+    for hotel_id, request_date in RoomServiceRequest.objects.values_list(
+            'room_service__hotel_id', 'request_date').iterator(chunk_size=2000):
+        rollups[(hotel_id, None, localtime(request_date).date())]['room_service_requests'] += 1
+    DailyRollup.objects.bulk_create(
+        [DailyRollup(hotel_id=hotel_id, service_id=service_id, day=day, **totals)
+         for (hotel_id, service_id, day), totals in rollups.items()],
+        batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0013_roomservicerequest_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('booked_hours', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('room_service_requests', models.IntegerField(default=0)),
+                ('hotel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='hotels.hotel')),
+                ('service', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='hotels.service')),
+            ],
+            options={
+                'verbose_name': 'Daily Rollup',
+                'verbose_name_plural': 'Daily Rollups',
+                'indexes': [models.Index(fields=['day', 'hotel'], name='rollup_day_hotel_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailyrollup',
+            constraint=models.UniqueConstraint(fields=('hotel', 'service', 'day'), name='unique_rollup_per_service_day'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('service__isnull', True)), fields=('hotel', 'day'), name='unique_room_service_rollup_per_day'),
+        ),
+        migrations.RunPython(build_daily_rollups, migrations.RunPython.noop),
+    ]
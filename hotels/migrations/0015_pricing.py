@@ -0,0 +1,53 @@
+# Generated by Django 5.0.14 on 2026-10-18 06:37
+
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def price_existing_reservations(apps, schema_editor):
+    # Reservations made so far were charged the flat 20% of the hourly list price.
+    Reservation = apps.get_model('hotels', 'Reservation')
+    batch = []
+    for reservation in Reservation.objects.filter(price=None).select_related('service', 'reserved_for').only(
+            'service__price', 'reserved_for__start_time', 'reserved_for__end_time').iterator(chunk_size=2000):
+        slot = reservation.reserved_for
+        hours = Decimal(int((slot.end_time - slot.start_time).total_seconds())) / 3600
+        reservation.price = (reservation.service.price * hours * Decimal('0.2')).quantize(Decimal('0.01'))
+        batch.append(reservation)
+        if len(batch) >= 2000:
+            Reservation.objects.bulk_update(batch, ['price'])
+            batch = []
+    Reservation.objects.bulk_update(batch, ['price'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0014_dailyrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservation',
+            name='price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.CreateModel(
+            name='PricingRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('peak', 'Peak hours'), ('multi_hour', 'Multi-hour discount'), ('rate', 'Charged rate')], max_length=20)),
+                ('factor', models.DecimalField(decimal_places=4, help_text='Price multiplier for peak hours and discounts; share of the list price that is charged for rates.', max_digits=6)),
+                ('start_time', models.TimeField(blank=True, help_text='Peak hours start (inclusive).', null=True)),
+                ('end_time', models.TimeField(blank=True, help_text='Peak hours end (exclusive).', null=True)),
+                ('weekdays', models.CharField(blank=True, help_text='Comma-separated ISO weekdays (1 = Monday) for peak hours; empty means every day.', max_length=13)),
+                ('min_hours', models.PositiveSmallIntegerField(blank=True, help_text='Hours booked at once for a discount to apply.', null=True)),
+                ('active', models.BooleanField(default=True)),
+                ('hotel', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='pricing_rules', to='hotels.hotel')),
+                ('service', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='pricing_rules', to='hotels.service')),
+            ],
+        ),
+        migrations.RunPython(price_existing_reservations, migrations.RunPython.noop),
+    ]
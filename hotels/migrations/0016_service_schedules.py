@@ -0,0 +1,53 @@
+# Generated by Django 5.0.14 on 2026-10-18 06:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0015_pricing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ServiceSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slot_minutes', models.PositiveSmallIntegerField(choices=[(30, '30 minutes'), (45, '45 minutes'), (60, '1 hour'), (90, '90 minutes'), (120, '2 hours')], default=60)),
+                ('service', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='schedule', to='hotels.service')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='OpeningHours',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(choices=[(1, 'Monday'), (2, 'Tuesday'), (3, 'Wednesday'), (4, 'Thursday'), (5, 'Friday'), (6, 'Saturday'), (7, 'Sunday')])),
+                ('opens', models.TimeField()),
+                ('closes', models.TimeField()),
+                ('schedule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='opening_hours', to='hotels.serviceschedule')),
+            ],
+            options={
+                'verbose_name': 'Opening Hours',
+                'verbose_name_plural': 'Opening Hours',
+                'ordering': ['weekday', 'opens'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BlackoutDate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('reason', models.CharField(blank=True, max_length=255)),
+                ('schedule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='blackout_dates', to='hotels.serviceschedule')),
+            ],
+            options={
+                'ordering': ['day'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='blackoutdate',
+            constraint=models.UniqueConstraint(fields=('schedule', 'day'), name='unique_blackout_date_per_schedule'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.0.14 on 2026-10-18 06:46
+
+import django.core.validators
+from django.db import migrations, models
+
+
+def count_existing_slots(apps, schema_editor):
+    # Every slot so far held a single unit, taken by its reservation if it had one.
+    AvailableTime = apps.get_model('hotels', 'AvailableTime')
+    AvailableTime.objects.filter(reservation__isnull=False).update(remaining=0, is_reserved=True)
+    AvailableTime.objects.filter(reservation__isnull=True).update(remaining=1, is_reserved=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0016_service_schedules'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='availabletime',
+            name='capacity',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='availabletime',
+            name='remaining',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='serviceschedule',
+            name='capacity',
+            field=models.PositiveSmallIntegerField(default=1, help_text='Guests that can book the same slot, e.g. the number of courts or spa beds.', validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+        migrations.RunPython(count_existing_slots, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='availabletime',
+            constraint=models.CheckConstraint(check=models.Q(('remaining__lte', models.F('capacity'))), name='available_time_remaining_within_capacity'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.0.14 on 2026-10-18 06:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0018_slot_holds'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedReservation',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('hotel_name', models.CharField(max_length=255)),
+                ('service_name', models.CharField(max_length=255)),
+                ('hourly_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('reservation_date', models.DateTimeField()),
+                ('start_time', models.DateTimeField()),
+                ('end_time', models.DateTimeField()),
+                ('price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('hotel', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_reservations', to='hotels.hotel')),
+                ('service', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_reservations', to='hotels.service')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_reservations', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-reservation_date'], name='archived_user_date_idx'), models.Index(fields=['start_time'], name='archived_start_idx')],
+            },
+        ),
+    ]
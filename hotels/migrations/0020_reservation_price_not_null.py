@@ -0,0 +1,27 @@
+# Generated by Django 5.0.14 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # 0015 priced every existing reservation; reservations are priced on save since then, and
+    # archived ones copy their price. Kept apart from 0015 so the backfill's UPDATEs and this
+    # ALTER never share a transaction (PostgreSQL refuses to alter a table with pending
+    # trigger events).
+
+    dependencies = [
+        ('hotels', '0019_archived_reservations'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reservation',
+            name='price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10),
+        ),
+        migrations.AlterField(
+            model_name='archivedreservation',
+            name='price',
+            field=models.DecimalField(decimal_places=2, max_digits=10),
+        ),
+    ]
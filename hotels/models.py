@@ -1,4 +1,7 @@
+from django.core.exceptions import ValidationError
+from django.core.validators import MinValueValidator
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth.models import AbstractUser
 
 
@@ -47,10 +50,69 @@ class Service(models.Model):
         return self.name
 
 
+class ServiceSchedule(models.Model):
+    """When a service can be booked and in what slot length.
+
+    Services without a schedule, and schedules without opening hours, are open 10:00-22:00
+    every day.
+    """
+    service = models.OneToOneField(Service, related_name='schedule', on_delete=models.CASCADE)
+    slot_minutes = models.PositiveSmallIntegerField(
+        choices=[(30, '30 minutes'), (45, '45 minutes'), (60, '1 hour'), (90, '90 minutes'), (120, '2 hours')],
+        default=60)
+    capacity = models.PositiveSmallIntegerField(
+        default=1, validators=[MinValueValidator(1)],
+        help_text='Guests that can book the same slot, e.g. the number of courts or spa beds.')
+
+    def __str__(self):
+        return f"Schedule of {self.service}"
+
+
+class OpeningHours(models.Model):
+    schedule = models.ForeignKey(ServiceSchedule, related_name='opening_hours', on_delete=models.CASCADE)
+    weekday = models.PositiveSmallIntegerField(choices=[
+        (1, 'Monday'), (2, 'Tuesday'), (3, 'Wednesday'), (4, 'Thursday'), (5, 'Friday'), (6, 'Saturday'),
+        (7, 'Sunday'),
+    ])
+    opens = models.TimeField()
+    closes = models.TimeField()
+
+    def __str__(self):
+        return f"{self.get_weekday_display()} {self.opens:%H:%M}-{self.closes:%H:%M}"
+
+    def clean(self):
+        if self.opens is not None and self.closes is not None and self.opens >= self.closes:
+            raise ValidationError('Opening hours must close after they open.')
+
+    class Meta:
+        verbose_name = "Opening Hours"
+        verbose_name_plural = "Opening Hours"
+        ordering = ['weekday', 'opens']
+
+
+class BlackoutDate(models.Model):
+    schedule = models.ForeignKey(ServiceSchedule, related_name='blackout_dates', on_delete=models.CASCADE)
+    day = models.DateField()
+    reason = models.CharField(max_length=255, blank=True)
+
+    def __str__(self):
+        return f"{self.day}"
+
+    class Meta:
+        ordering = ['day']
+        constraints = [
+            models.UniqueConstraint(fields=['schedule', 'day'], name='unique_blackout_date_per_schedule'),
+        ]
+
+
 class AvailableTime(models.Model):
     service = models.ForeignKey(Service, related_name='available_times', on_delete=models.CASCADE)
     start_time = models.DateTimeField()
     end_time = models.DateTimeField()
+    # Units bookable in this slot and how many are still free; booking decrements ``remaining``
+    # with a conditional UPDATE, and ``is_reserved`` is set once it reaches zero.
+    capacity = models.PositiveSmallIntegerField(default=1)
+    remaining = models.PositiveSmallIntegerField(default=1)
     is_reserved = models.BooleanField(default=False)
 
     def __str__(self):
@@ -59,6 +121,11 @@ class AvailableTime(models.Model):
     class Meta:
         verbose_name = "Taken Date"
         verbose_name_plural = "Taken Dates"
+        constraints = [
+            models.UniqueConstraint(fields=['service', 'start_time'], name='unique_available_time_per_service'),
+            models.CheckConstraint(check=Q(remaining__lte=models.F('capacity')),
+                                   name='available_time_remaining_within_capacity'),
+        ]
 
 
 class Reservation(models.Model):
@@ -66,10 +133,138 @@ class Reservation(models.Model):
     service = models.ForeignKey(Service, on_delete=models.CASCADE)
     reservation_date = models.DateTimeField(auto_now_add=True)
     reserved_for = models.ForeignKey(AvailableTime, on_delete=models.CASCADE)
+    # What the guest was quoted for this slot, fixed at booking time. Left blank, it is quoted
+    # on save (see signals.price_reservation).
+    price = models.DecimalField(max_digits=10, decimal_places=2, blank=True)
 
     def __str__(self):
         return f"{self.user} - {self.service} on {self.reserved_for.start_time}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['service', 'reserved_for'], name='reservation_service_slot_idx'),
+            models.Index(fields=['user', '-reservation_date'], name='reservation_user_date_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'reserved_for'], name='unique_reservation_per_user_slot'),
+        ]
+
+
+class ArchivedReservation(models.Model):
+    """A past reservation moved out of the live tables by the archive_reservations command.
+
+    Keeps the original id and a copy of everything the guest history and exports show, so it
+    outlives the slot, and possibly the service, it was made for.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(CustomUser, related_name='archived_reservations', on_delete=models.CASCADE)
+    hotel = models.ForeignKey(Hotel, related_name='archived_reservations', null=True, on_delete=models.SET_NULL)
+    service = models.ForeignKey(Service, related_name='archived_reservations', null=True,
+                                on_delete=models.SET_NULL)
+    hotel_name = models.CharField(max_length=255)
+    service_name = models.CharField(max_length=255)
+    hourly_price = models.DecimalField(max_digits=10, decimal_places=2)
+    reservation_date = models.DateTimeField()
+    start_time = models.DateTimeField()
+    end_time = models.DateTimeField()
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.user} - {self.service_name} on {self.start_time}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-reservation_date'], name='archived_user_date_idx'),
+            models.Index(fields=['start_time'], name='archived_start_idx'),
+        ]
+
+
+class PricingRule(models.Model):
+    """One adjustment to what guests are charged for a service's slots.
+
+    A rule applies to one service, to every service of a hotel, or (with neither set) to every
+    service. For each kind, rules of the most specific scope replace the broader ones.
+    """
+    hotel = models.ForeignKey(Hotel, related_name='pricing_rules', on_delete=models.CASCADE, null=True, blank=True)
+    service = models.ForeignKey(Service, related_name='pricing_rules', on_delete=models.CASCADE, null=True,
+                                blank=True)
+    kind = models.CharField(max_length=20, choices=[('peak', 'Peak hours'), ('multi_hour', 'Multi-hour discount'),
+                                                    ('rate', 'Charged rate')])
+    factor = models.DecimalField(max_digits=6, decimal_places=4,
+                                 help_text='Price multiplier for peak hours and discounts; share of the list '
+                                           'price that is charged for rates.')
+    start_time = models.TimeField(null=True, blank=True, help_text='Peak hours start (inclusive).')
+    end_time = models.TimeField(null=True, blank=True, help_text='Peak hours end (exclusive).')
+    weekdays = models.CharField(max_length=13, blank=True,
+                                help_text='Comma-separated ISO weekdays (1 = Monday) for peak hours; '
+                                          'empty means every day.')
+    min_hours = models.PositiveSmallIntegerField(null=True, blank=True,
+                                                 help_text='Hours booked at once for a discount to apply.')
+    active = models.BooleanField(default=True)
+
+    def __str__(self):
+        return f"{self.get_kind_display()} x{self.factor} for {self.service or self.hotel or 'all services'}"
+
+    def clean(self):
+        if self.service_id and self.hotel_id and self.service.hotel_id != self.hotel_id:
+            raise ValidationError({'service': 'The service belongs to another hotel.'})
+        if self.factor is not None and self.factor <= 0:
+            raise ValidationError({'factor': 'The factor must be positive.'})
+        if self.kind == 'peak':
+            if self.start_time is None or self.end_time is None or self.start_time >= self.end_time:
+                raise ValidationError('Peak hours need a start time before their end time.')
+            try:
+                self.weekday_numbers()
+            except ValueError:
+                raise ValidationError({'weekdays': 'Use ISO weekday numbers from 1 to 7, separated by commas.'})
+        if self.kind == 'multi_hour' and not self.min_hours:
+            raise ValidationError({'min_hours': 'Multi-hour discounts need a minimum number of hours.'})
+
+    def weekday_numbers(self):
+        days = frozenset(int(day) for day in self.weekdays.split(',') if day.strip())
+        if not days <= set(range(1, 8)):
+            raise ValueError(self.weekdays)
+        return days
+
+
+class SlotAvailability(models.Model):
+    service = models.ForeignKey(Service, related_name='slot_availability', on_delete=models.CASCADE)
+    day = models.DateField()
+    # One bit per slot, numbered by start minute // slot length (bit 10 is 10:00 for 1-hour slots),
+    # set once every unit of the slot is reserved.
+    reserved_slots = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.service.name} on {self.day}"
+
+    class Meta:
+        verbose_name = "Slot Availability"
+        verbose_name_plural = "Slot Availability"
+        constraints = [
+            models.UniqueConstraint(fields=['service', 'day'], name='unique_slot_availability_per_day'),
+        ]
+
+
+class SlotHold(models.Model):
+    """A unit of a slot set aside for a guest for a few minutes while they finish booking it."""
+    service = models.ForeignKey(Service, related_name='slot_holds', on_delete=models.CASCADE)
+    user = models.ForeignKey(CustomUser, related_name='slot_holds', on_delete=models.CASCADE)
+    start_time = models.DateTimeField()
+    expires_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.service.name} at {self.start_time} held until {self.expires_at}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['service', 'user', 'start_time'], name='unique_slot_hold_per_guest'),
+        ]
+        indexes = [
+            models.Index(fields=['service', 'start_time'], name='slot_hold_service_start_idx'),
+            models.Index(fields=['expires_at'], name='slot_hold_expires_idx'),
+        ]
+
 
 class RoomService(models.Model):
     hotel = models.ForeignKey(Hotel, related_name='room_services', on_delete=models.CASCADE)
@@ -86,6 +281,42 @@ class RoomServiceRequest(models.Model):
     request_date = models.DateTimeField(auto_now_add=True)
     status = models.CharField(max_length=20, choices=[('Pending', 'Pending'), ('Completed', 'Completed')],
                               default='Pending')
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.user} - {self.room_service} on {self.request_date}"
+
+    class Meta:
+        indexes = [
+            # Dispatch boards read changes in (updated_at, id) order from a cursor.
+            models.Index(fields=['updated_at', 'id'], name='room_service_request_delta_idx'),
+        ]
+
+
+class DailyRollup(models.Model):
+    """Precomputed totals for one hotel and day, maintained as reservations and requests come and go.
+
+    Rows with a service hold that service's booked hours and revenue; the row without one holds the
+    hotel's room-service request count.
+    """
+    hotel = models.ForeignKey(Hotel, related_name='rollups', on_delete=models.CASCADE)
+    service = models.ForeignKey(Service, related_name='rollups', on_delete=models.CASCADE, null=True, blank=True)
+    day = models.DateField()
+    booked_hours = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    room_service_requests = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.service or self.hotel} on {self.day}"
+
+    class Meta:
+        verbose_name = "Daily Rollup"
+        verbose_name_plural = "Daily Rollups"
+        indexes = [
+            models.Index(fields=['day', 'hotel'], name='rollup_day_hotel_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['hotel', 'service', 'day'], name='unique_rollup_per_service_day'),
+            models.UniqueConstraint(fields=['hotel', 'day'], condition=Q(service__isnull=True),
+                                    name='unique_room_service_rollup_per_day'),
+        ]
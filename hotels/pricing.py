@@ -0,0 +1,145 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils.timezone import localtime
+
+from hotels import schedules
+from hotels.models import PricingRule, Service
+
+# Guests pay this share of a service's hourly list price unless a rate rule says otherwise.
+DEFAULT_CHARGED_RATE = Decimal('0.2')
+CENT = Decimal('0.01')
+ONE = Decimal(1)
+
+
+def _cache_key(service_id):
+    return f'hotels:pricing:{service_id}'
+
+
+def _cache_timeout():
+    return getattr(settings, 'PRICING_CACHE_TIMEOUT', 3600)
+
+
+def slot_hours(start_time, end_time):
+    return Decimal(int((end_time - start_time).total_seconds())) / 3600
+
+
+class Quote:
+    """Prices for one batch of slots: ``lines`` holds ``(start_time, amount)`` in slot order."""
+
+    def __init__(self, lines, hours, discount):
+        self.lines = lines
+        self.hours = hours
+        self.discount = discount
+        self.total = sum((amount for _, amount in lines), Decimal(0))
+
+
+class RuleSet:
+    """A service's pricing rules compiled into plain lookup tables.
+
+    Compiling resolves rule scopes once, so quoting a slot is a local-time conversion and a
+    dictionary lookup.
+    """
+
+    def __init__(self, price, rate=DEFAULT_CHARGED_RATE, peaks=(), discounts=()):
+        self.price = Decimal(price)
+        self.rate = rate
+        # (weekdays or None for every day, start minute, end minute, factor), largest factor first.
+        self.peaks = sorted(peaks, key=lambda peak: peak[3], reverse=True)
+        # (min_hours, factor), longest bookings first.
+        self.discounts = sorted(discounts, reverse=True)
+
+    @classmethod
+    def compile(cls, service, rules):
+        """Build the rule set of ``service`` from every active rule that could apply to it."""
+        chosen = {}
+        for rule in rules:
+            if not rule.active or rule.service_id not in (None, service.id) or \
+                    rule.hotel_id not in (None, service.hotel_id):
+                continue
+            scope = 2 if rule.service_id else 1 if rule.hotel_id else 0
+            best_scope, kind_rules = chosen.get(rule.kind, (-1, []))
+            if scope > best_scope:
+                chosen[rule.kind] = (scope, [rule])
+            elif scope == best_scope:
+                kind_rules.append(rule)
+
+        rate_rules = chosen.get('rate', (0, []))[1]
+        return cls(
+            service.price,
+            rate=rate_rules[0].factor if rate_rules else DEFAULT_CHARGED_RATE,
+            peaks=[(rule.weekday_numbers() or None, _minutes(rule.start_time), _minutes(rule.end_time), rule.factor)
+                   for rule in chosen.get('peak', (0, []))[1]],
+            discounts=[(rule.min_hours, rule.factor) for rule in chosen.get('multi_hour', (0, []))[1]],
+        )
+
+    def peak_factor(self, weekday, minute):
+        for weekdays, start, end, factor in self.peaks:
+            if start <= minute < end and (weekdays is None or weekday in weekdays):
+                return factor
+        return ONE
+
+    def discount(self, hours):
+        for min_hours, factor in self.discounts:
+            if hours >= min_hours:
+                return factor
+        return ONE
+
+    def quote(self, slot_times, slot_length=schedules.DEFAULT_SCHEDULE.slot_length):
+        """Price every slot in ``slot_times`` in one pass; the discount depends on the whole batch."""
+        slot_times = sorted(slot_times)
+        hours_per_slot = Decimal(int(slot_length.total_seconds())) / 3600
+        hours = hours_per_slot * len(slot_times)
+        discount = self.discount(hours)
+        base = self.price * self.rate * hours_per_slot * discount
+        # Slots recur at the same local times, so each distinct (weekday, minute) is priced once.
+        amounts, lines = {}, []
+        for slot_time in slot_times:
+            local = localtime(slot_time)
+            key = (local.isoweekday(), local.hour * 60 + local.minute)
+            amount = amounts.get(key)
+            if amount is None:
+                amount = amounts[key] = (base * self.peak_factor(*key)).quantize(CENT)
+            lines.append((slot_time, amount))
+        return Quote(lines, hours, discount)
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def _applicable_rules(service):
+    return PricingRule.objects.filter(active=True).filter(
+        Q(service=service) | Q(service=None, hotel_id=service.hotel_id) | Q(service=None, hotel=None))
+
+
+def rule_set(service):
+    """Return the compiled rule set of ``service``, cached across requests."""
+    key = _cache_key(service.id)
+    rules = cache.get(key)
+    if rules is None:
+        rules = RuleSet.compile(service, _applicable_rules(service))
+        cache.set(key, rules, _cache_timeout())
+    return rules
+
+
+def quote(service, slot_times, schedule=None):
+    schedule = schedule or schedules.get(service.id)
+    return rule_set(service).quote(slot_times, schedule.slot_length)
+
+
+def invalidate(service_ids):
+    cache.delete_many([_cache_key(service_id) for service_id in service_ids])
+
+
+def invalidate_scope(hotel_id, service_id):
+    """Drop the rule sets a rule with this hotel/service scope can affect."""
+    if service_id:
+        invalidate([service_id])
+        return
+    services = Service.objects.all()
+    if hotel_id:
+        services = services.filter(hotel_id=hotel_id)
+    invalidate(list(services.values_list('pk', flat=True)))
@@ -0,0 +1,94 @@
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.shortcuts import aget_object_or_404, get_object_or_404
+
+from hotels.models import Hotel, HotelRegisteredUser
+
+
+def _cache_key(private_number):
+    return f'hotels:registered:{private_number}'
+
+
+def _cache_timeout():
+    return getattr(settings, 'HOTEL_REGISTRATION_CACHE_TIMEOUT', 300)
+
+
+def registered_hotel_ids(user):
+    """Return the ids of the hotels ``user`` is registered at, cached across requests."""
+    if not user.is_authenticated:
+        return frozenset()
+    hotel_ids = getattr(user, '_registered_hotel_ids', None)
+    if hotel_ids is None:
+        key = _cache_key(user.private_number)
+        hotel_ids = cache.get(key)
+        if hotel_ids is None:
+            hotel_ids = frozenset(HotelRegisteredUser.objects.filter(
+                private_number=user.private_number).values_list('hotel_id', flat=True))
+            cache.set(key, hotel_ids, _cache_timeout())
+        user._registered_hotel_ids = hotel_ids
+    return hotel_ids
+
+
+async def aregistered_hotel_ids(user):
+    if not user.is_authenticated:
+        return frozenset()
+    hotel_ids = getattr(user, '_registered_hotel_ids', None)
+    if hotel_ids is None:
+        key = _cache_key(user.private_number)
+        hotel_ids = await cache.aget(key)
+        if hotel_ids is None:
+            hotel_ids = frozenset([hotel_id async for hotel_id in HotelRegisteredUser.objects.filter(
+                private_number=user.private_number).values_list('hotel_id', flat=True)])
+            await cache.aset(key, hotel_ids, _cache_timeout())
+        user._registered_hotel_ids = hotel_ids
+    return hotel_ids
+
+
+def is_registered(user, hotel_id):
+    return hotel_id in registered_hotel_ids(user)
+
+
+async def ais_registered(user, hotel_id):
+    return hotel_id in await aregistered_hotel_ids(user)
+
+
+def invalidate(private_number):
+    cache.delete(_cache_key(private_number))
+
+
+def invalidate_many(private_numbers):
+    cache.delete_many([_cache_key(private_number) for private_number in private_numbers])
+
+
+def _hotel_id(obj):
+    return obj.pk if isinstance(obj, Hotel) else obj.hotel_id
+
+
+def registration_required(model, url_kwarg, denied):
+    """Load ``model`` from ``url_kwarg`` and only call the view if the user is registered at its hotel.
+
+    The view receives the loaded object in place of the id; ``denied(request, obj)`` builds the
+    response for guests who are not registered there. Works for both sync and async views.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                obj = await aget_object_or_404(model, pk=kwargs.pop(url_kwarg))
+                if not await ais_registered(await request.auser(), _hotel_id(obj)):
+                    return denied(request, obj)
+                return await view(request, obj, *args, **kwargs)
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            obj = get_object_or_404(model, pk=kwargs.pop(url_kwarg))
+            if not is_registered(request.user, _hotel_id(obj)):
+                return denied(request, obj)
+            return view(request, obj, *args, **kwargs)
+        return wrapper
+    return decorator
+
@@ -0,0 +1,202 @@
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends import django as django_backend
+
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+_current = ContextVar('hotels_request_stats', default=None)
+
+
+def slow_request_ms():
+    return getattr(settings, 'REQUEST_METRICS_SLOW_MS', 500)
+
+
+def repeated_query_threshold():
+    return getattr(settings, 'REQUEST_METRICS_REPEATED_QUERIES', 10)
+
+
+class RequestStats:
+    """What one request spent on SQL and templates; filled in while the request runs."""
+    __slots__ = ('started', 'queries', 'db_seconds', 'template_seconds', 'statements')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+        # Keyed on the SQL before parameters are bound, so the same ORM query run in a loop
+        # lands on a single key without normalising every statement up front.
+        self.statements = Counter()
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def repeated_queries(self, threshold):
+        """Return ``(shape, count)`` for statements run at least ``threshold`` times."""
+        if self.queries < threshold:
+            return []
+        shapes = Counter()
+        for sql, executions in self.statements.items():
+            shapes[sql_shape(sql)] += executions
+        return [(shape, executions) for shape, executions in shapes.most_common() if executions >= threshold]
+
+
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def sql_shape(sql, max_length=300):
+    """Reduce ``sql`` to its shape: literals and IN lists collapsed, whitespace squeezed."""
+    shape = _IN_LIST.sub('IN (...)', sql)
+    shape = _NUMBER.sub('?', _STRING.sub('?', shape))
+    shape = _WHITESPACE.sub(' ', shape).strip()
+    return shape if len(shape) <= max_length else shape[:max_length] + '...'
+
+
+def _execute_wrapper(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.db_seconds += time.perf_counter() - started
+        stats.queries += 1
+        stats.statements[sql] += 1
+
+
+def _wrap_connection(connection, **kwargs):
+    if _execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute_wrapper)
+
+
+class TimedTemplate(django_backend.Template):
+    def render(self, context=None, request=None):
+        stats = _current.get()
+        if stats is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            stats.template_seconds += time.perf_counter() - started
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """The Django template backend, timing renders for the request metrics.
+
+    Selected in ``TEMPLATES``; templates of any other backend are not timed.
+    """
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+
+_installed = False
+
+
+def install():
+    """Hook query timing into every database connection; safe to call more than once."""
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    connection_created.connect(_wrap_connection, dispatch_uid='hotels_request_metrics')
+    for connection in connections.all(initialized_only=True):
+        _wrap_connection(connection)
+
+
+def start():
+    """Begin collecting for the current request; returns the stats and a token for ``stop``."""
+    stats = RequestStats()
+    return stats, _current.set(stats)
+
+
+def stop(token):
+    _current.reset(token)
+
+
+class Histogram:
+    """Fixed-bucket histogram; ``counts[i]`` holds observations up to ``bounds[i]``, the last one the rest."""
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def as_dict(self):
+        return {
+            'buckets': dict(zip([*map(str, self.bounds), '+Inf'], self.counts)),
+            'count': self.count,
+            'sum': round(self.sum, 3),
+        }
+
+
+class ViewMetrics:
+    def __init__(self):
+        self.total_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.db_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.template_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.slow = 0
+        self.repeated_queries = 0
+
+    def as_dict(self):
+        return {
+            'requests': self.total_ms.count,
+            'slow': self.slow,
+            'repeated_queries': self.repeated_queries,
+            'total_ms': self.total_ms.as_dict(),
+            'db_ms': self.db_ms.as_dict(),
+            'template_ms': self.template_ms.as_dict(),
+            'queries': self.queries.as_dict(),
+        }
+
+
+_lock = threading.Lock()
+_views = {}
+
+
+def record(view_name, stats, total_seconds, slow, repeated):
+    with _lock:
+        metrics = _views.get(view_name)
+        if metrics is None:
+            metrics = _views[view_name] = ViewMetrics()
+        metrics.total_ms.observe(total_seconds * 1000)
+        metrics.db_ms.observe(stats.db_seconds * 1000)
+        metrics.template_ms.observe(stats.template_seconds * 1000)
+        metrics.queries.observe(stats.queries)
+        metrics.slow += slow
+        metrics.repeated_queries += repeated
+
+
+def snapshot():
+    """Per-view aggregates collected by this process since start-up or the last ``reset``."""
+    with _lock:
+        return {view_name: metrics.as_dict() for view_name, metrics in sorted(_views.items())}
+
+
+def reset():
+    with _lock:
+        _views.clear()
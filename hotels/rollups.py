@@ -0,0 +1,150 @@
+from collections import defaultdict
+from decimal import Decimal
+from itertools import chain
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils.timezone import localtime
+
+from hotels import availability, pricing, schedules
+from hotels.models import ArchivedReservation, DailyRollup, Reservation, RoomService, RoomServiceRequest, Service
+
+# Dashboard total -> rollup column it sums.
+TOTALS = {'hours': 'booked_hours', 'revenue_total': 'revenue', 'requests': 'room_service_requests'}
+
+
+def _apply(deltas, create=True):
+    """Add ``{(hotel_id, service_id, day): {field: delta}}`` to the rollups, creating missing rows."""
+    for (hotel_id, service_id, day), values in deltas.items():
+        rows = DailyRollup.objects.filter(hotel_id=hotel_id, service_id=service_id, day=day)
+        changes = {field: F(field) + delta for field, delta in values.items()}
+        if rows.update(**changes) or not create:
+            continue
+        try:
+            with transaction.atomic():
+                DailyRollup.objects.create(hotel_id=hotel_id, service_id=service_id, day=day, **values)
+        except IntegrityError:
+            rows.update(**changes)
+
+
+def record_reservations(reservations, sign=1):
+    """Add the hours and revenue of new ``reservations`` to their days (``sign=-1`` removes them)."""
+    deltas = defaultdict(lambda: {'booked_hours': Decimal(0), 'revenue': Decimal(0)})
+    for reservation in reservations:
+        slot = reservation.reserved_for
+        totals = deltas[(reservation.service.hotel_id, reservation.service_id, localtime(slot.start_time).date())]
+        totals['booked_hours'] += sign * pricing.slot_hours(slot.start_time, slot.end_time)
+        totals['revenue'] += sign * reservation.price
+    _apply(deltas)
+
+
+def record_room_service_requests(requests, sign=1):
+    """Count newly written room-service requests against their hotel and day (``sign=-1`` uncounts them)."""
+    hotel_ids = dict(RoomService.objects.filter(
+        pk__in={request.room_service_id for request in requests}).values_list('pk', 'hotel_id'))
+    deltas = defaultdict(lambda: {'room_service_requests': 0})
+    for request in requests:
+        hotel_id = hotel_ids.get(request.room_service_id)
+        if hotel_id is not None:
+            deltas[(hotel_id, None, localtime(request.request_date).date())]['room_service_requests'] += sign
+    # Removals never create rows: during a cascading delete the hotel's rollups may already be gone.
+    _apply(deltas, create=sign > 0)
+
+
+def refresh_service_day(service_id, day, create=True):
+    """Recompute one service/day rollup from the reservations behind it, archived ones included."""
+    hotel_id = Service.objects.filter(pk=service_id).values_list('hotel_id', flat=True).first()
+    if hotel_id is None:
+        return
+    start, end = availability.day_bounds(day)
+    live = Reservation.objects.filter(
+        service_id=service_id,
+        reserved_for__start_time__gte=start,
+        reserved_for__start_time__lt=end
+    ).values_list('reserved_for__start_time', 'reserved_for__end_time', 'price')
+    # A day can be partly archived when the cutoff or an interrupted run splits it.
+    archived = ArchivedReservation.objects.filter(
+        service_id=service_id, start_time__gte=start, start_time__lt=end
+    ).values_list('start_time', 'end_time', 'price')
+    hours = revenue = Decimal(0)
+    for start_time, end_time, price in chain(live, archived):
+        hours += pricing.slot_hours(start_time, end_time)
+        revenue += price
+    totals = {'booked_hours': hours, 'revenue': revenue}
+    if create:
+        DailyRollup.objects.update_or_create(hotel_id=hotel_id, service_id=service_id, day=day, defaults=totals)
+    else:
+        DailyRollup.objects.filter(hotel_id=hotel_id, service_id=service_id, day=day).update(**totals)
+
+
+def expected_rollups(hotel_ids=None):
+    """Compute every rollup row from scratch: ``{(hotel_id, service_id, day): totals}``."""
+    rollups = defaultdict(lambda: {'booked_hours': Decimal(0), 'revenue': Decimal(0), 'room_service_requests': 0})
+
+    reservations = Reservation.objects.all()
+    if hotel_ids:
+        reservations = reservations.filter(service__hotel_id__in=hotel_ids)
+    for hotel_id, service_id, price, start_time, end_time in reservations.values_list(
+            'service__hotel_id', 'service_id', 'price', 'reserved_for__start_time',
+            'reserved_for__end_time').iterator(chunk_size=2000):
+        totals = rollups[(hotel_id, service_id, localtime(start_time).date())]
+        totals['booked_hours'] += pricing.slot_hours(start_time, end_time)
+        totals['revenue'] += price
+
+    # Archived reservations still count; those of deleted services went with the service's rollups.
+    archived = ArchivedReservation.objects.filter(service__isnull=False)
+    if hotel_ids:
+        archived = archived.filter(service__hotel_id__in=hotel_ids)
+    for hotel_id, service_id, price, start_time, end_time in archived.values_list(
+            'service__hotel_id', 'service_id', 'price', 'start_time', 'end_time').iterator(chunk_size=2000):
+        totals = rollups[(hotel_id, service_id, localtime(start_time).date())]
+        totals['booked_hours'] += pricing.slot_hours(start_time, end_time)
+        totals['revenue'] += price
+
+    requests = RoomServiceRequest.objects.all()
+    if hotel_ids:
+        requests = requests.filter(room_service__hotel_id__in=hotel_ids)
+    for row in requests.annotate(day=TruncDate('request_date')).values(
+            'room_service__hotel_id', 'day').annotate(count=Count('id')).order_by():
+        rollups[(row['room_service__hotel_id'], None, row['day'])]['room_service_requests'] = row['count']
+    return rollups
+
+
+def rebuild(hotel_ids=None, batch_size=1000):
+    rollups = expected_rollups(hotel_ids)
+    with transaction.atomic():
+        rows = DailyRollup.objects.all()
+        if hotel_ids:
+            rows = rows.filter(hotel_id__in=hotel_ids)
+        rows.delete()
+        DailyRollup.objects.bulk_create(
+            [DailyRollup(hotel_id=hotel_id, service_id=service_id, day=day, **totals)
+             for (hotel_id, service_id, day), totals in rollups.items()],
+            batch_size=batch_size)
+    return len(rollups)
+
+
+def _sums():
+    return {name: Sum(field) for name, field in TOTALS.items()}
+
+
+def dashboard(start, end, hotel_id=None):
+    """Revenue, booked hours, occupancy and request counts between two days, read from the rollups only."""
+    rows = DailyRollup.objects.filter(day__gte=start, day__lte=end).order_by()
+    if hotel_id:
+        rows = rows.filter(hotel_id=hotel_id)
+
+    services = list(rows.filter(service__isnull=False).values('hotel__name', 'service_id', 'service__name').annotate(
+        **_sums()).order_by('-revenue_total', 'service__name'))
+    service_schedules = schedules.get_many([service['service_id'] for service in services])
+    for service in services:
+        open_hours = service_schedules[service['service_id']].open_hours(start, end)
+        service['occupancy'] = service['hours'] / open_hours * 100 if open_hours else Decimal(0)
+
+    return {
+        'totals': rows.aggregate(**_sums()),
+        'by_hotel': list(rows.values('hotel_id', 'hotel__name').annotate(**_sums()).order_by('hotel__name')),
+        'by_service': services,
+        'by_day': list(rows.values('day').annotate(**_sums()).order_by('day')),
+    }
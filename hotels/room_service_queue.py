@@ -0,0 +1,83 @@
+import atexit
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from hotels import rollups
+from hotels.models import RoomServiceRequest
+
+logger = logging.getLogger(__name__)
+
+
+class RoomServiceQueue:
+    """In-process intake queue for room-service requests.
+
+    Views enqueue requests and return immediately; a daemon worker thread writes them to the
+    database in batches with ``bulk_create``. Nothing is persisted until a batch is written, so
+    it is only used when ``ROOM_SERVICE_INTAKE`` is set to ``"queue"``.
+    """
+
+    def __init__(self, batch_size=100, wait_seconds=0.2):
+        self.batch_size = batch_size
+        self.wait_seconds = wait_seconds
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def submit(self, user_id, room_service_id):
+        self._ensure_worker()
+        self._queue.put(RoomServiceRequest(user_id=user_id, room_service_id=room_service_id))
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def flush(self):
+        """Write everything queued so far from the calling thread."""
+        while self._write_batch(self._take_batch(block=False)):
+            pass
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='room-service-queue', daemon=True)
+                self._worker.start()
+
+    def _take_batch(self, block):
+        batch = []
+        try:
+            batch.append(self._queue.get(block=block, timeout=self.wait_seconds if block else None))
+            while len(batch) < self.batch_size:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _write_batch(self, batch):
+        if not batch:
+            return 0
+        try:
+            with transaction.atomic():
+                RoomServiceRequest.objects.bulk_create(batch)
+                rollups.record_room_service_requests(batch)
+        except Exception:
+            logger.exception('room_service_queue batch_failed size=%d', len(batch))
+        else:
+            logger.info('room_service_queue batch_written size=%d backlog=%d', len(batch), self.pending())
+        return len(batch)
+
+    def _run(self):
+        while True:
+            batch = self._take_batch(block=True)
+            if batch:
+                close_old_connections()
+                self._write_batch(batch)
+                close_old_connections()
+
+
+room_service_queue = RoomServiceQueue(batch_size=getattr(settings, 'ROOM_SERVICE_QUEUE_BATCH_SIZE', 100))
+atexit.register(room_service_queue.flush)
@@ -0,0 +1,150 @@
+import csv
+import json
+import os
+
+from django.contrib.auth.base_user import BaseUserManager
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from hotels import registration
+from hotels.models import Hotel, HotelRegisteredUser
+
+FORMATS = ('csv', 'jsonl')
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def guess_format(filename):
+    extension = os.path.splitext(filename)[1].lower().lstrip('.')
+    return 'jsonl' if extension in ('jsonl', 'ndjson', 'json') else 'csv'
+
+
+def read_rows(fh, file_format):
+    """Yield ``(line number, row dict, error)`` from a CSV or JSON Lines text stream, one row at a time."""
+    if file_format == 'csv':
+        reader = csv.DictReader(fh)
+        for row in reader:
+            yield reader.line_num, row, None
+        return
+    for number, line in enumerate(fh, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield number, None, f'invalid JSON: {exc}'
+            continue
+        if not isinstance(row, dict):
+            yield number, None, 'expected a JSON object'
+            continue
+        yield number, row, None
+
+
+class RosterImport:
+    """Upsert guest-roster rows into ``HotelRegisteredUser`` in chunks.
+
+    Rows are matched on ``private_number``; a known guest gets the row's hotel and email. Only one
+    chunk is held in memory at a time and errors go to ``on_error(line, message)`` as they are
+    found, so memory stays flat however long the file is.
+    """
+    max_private_number_length = HotelRegisteredUser._meta.get_field('private_number').max_length
+
+    def __init__(self, default_hotel_id=None, chunk_size=DEFAULT_CHUNK_SIZE, on_error=None):
+        self.default_hotel_id = default_hotel_id
+        self.chunk_size = chunk_size
+        self.on_error = on_error
+        self.hotel_ids = set(Hotel.objects.values_list('pk', flat=True))
+        self.created = self.updated = self.failed = 0
+
+    def run(self, rows):
+        chunk, chunk_emails = {}, {}
+        for line, row, error in rows:
+            guest = None if error else self.clean(line, row)
+            if error:
+                self.fail(line, error)
+            if guest is None:
+                continue
+            owner = chunk_emails.get(guest.email)
+            if owner is not None and owner != guest.private_number:
+                self.fail(line, f'email {guest.email} is also used for private number {owner} in this file')
+                continue
+            previous = chunk.pop(guest.private_number, None)
+            if previous is not None:
+                chunk_emails.pop(previous[1].email, None)
+            chunk[guest.private_number] = (line, guest)
+            chunk_emails[guest.email] = guest.private_number
+            if len(chunk) >= self.chunk_size:
+                self.write(chunk)
+                chunk, chunk_emails = {}, {}
+        if chunk:
+            self.write(chunk)
+        return self
+
+    def clean(self, line, row):
+        private_number = str(row.get('private_number') or '').strip()
+        email = BaseUserManager.normalize_email(str(row.get('email') or '').strip())
+        hotel = row.get('hotel_id') or row.get('hotel') or self.default_hotel_id
+
+        if not private_number:
+            return self.fail(line, 'private_number is required')
+        if len(private_number) > self.max_private_number_length:
+            return self.fail(line, f'private_number is longer than {self.max_private_number_length} characters')
+        try:
+            validate_email(email)
+        except ValidationError:
+            return self.fail(line, f'invalid email {email!r}')
+        try:
+            hotel_id = int(hotel)
+        except (TypeError, ValueError):
+            return self.fail(line, 'hotel is required' if not hotel else f'invalid hotel {hotel!r}')
+        if hotel_id not in self.hotel_ids:
+            return self.fail(line, f'unknown hotel {hotel_id}')
+        return HotelRegisteredUser(hotel_id=hotel_id, private_number=private_number, email=email)
+
+    def fail(self, line, message):
+        self.failed += 1
+        if self.on_error is not None:
+            self.on_error(line, message)
+
+    def write(self, chunk):
+        emails = [guest.email for _, guest in chunk.values()]
+        existing = dict(HotelRegisteredUser.objects.filter(
+            Q(private_number__in=list(chunk)) | Q(email__in=emails)
+        ).values_list('private_number', 'email'))
+        email_owners = {email: private_number for private_number, email in existing.items()}
+
+        guests = []
+        for private_number, (line, guest) in chunk.items():
+            owner = email_owners.get(guest.email)
+            if owner is not None and owner != private_number:
+                self.fail(line, f'email {guest.email} is already registered to private number {owner}')
+            else:
+                guests.append((line, guest))
+
+        try:
+            with transaction.atomic():
+                self.upsert([guest for _, guest in guests])
+        except IntegrityError:
+            # Lost a race with another writer; retry row by row to pin the error on the right lines.
+            written = []
+            for line, guest in guests:
+                try:
+                    with transaction.atomic():
+                        self.upsert([guest])
+                except IntegrityError as exc:
+                    self.fail(line, f'could not be saved: {exc}')
+                else:
+                    written.append((line, guest))
+            guests = written
+
+        for _, guest in guests:
+            if guest.private_number in existing:
+                self.updated += 1
+            else:
+                self.created += 1
+        registration.invalidate_many([guest.private_number for _, guest in guests])
+
+    def upsert(self, guests):
+        HotelRegisteredUser.objects.bulk_create(
+            guests, update_conflicts=True, unique_fields=['private_number'], update_fields=['hotel', 'email'])
@@ -0,0 +1,194 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.timezone import localtime, make_aware
+
+from hotels.models import Service, ServiceSchedule
+
+DEFAULT_OPENING_HOURS = ((time(10, 0), time(22, 0)),)
+DEFAULT_SLOT_MINUTES = 60
+WEEKDAYS = range(1, 8)
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def _schedule_key(service_id):
+    return f'hotels:schedule:{service_id}'
+
+
+def _slots_key(service_id, day):
+    return f'hotels:slots:{service_id}:{day.isoformat()}'
+
+
+def _cache_timeout():
+    return getattr(settings, 'SCHEDULE_CACHE_TIMEOUT', 2 * 24 * 3600)
+
+
+def horizon_days():
+    return getattr(settings, 'SCHEDULE_HORIZON_DAYS', 90)
+
+
+class Schedule:
+    """A service's weekly opening hours, slot length, capacity and blackout days, compiled for slot lookups.
+
+    ``offsets`` holds each weekday's slot start times as minutes after midnight.
+    """
+
+    def __init__(self, slot_minutes=DEFAULT_SLOT_MINUTES, opening_hours=None, blackout_days=(), capacity=1):
+        self.slot_minutes = slot_minutes
+        self.capacity = capacity
+        self.slot_length = timedelta(minutes=slot_minutes)
+        self.blackout_days = frozenset(blackout_days)
+        self.offsets = {}
+        for weekday in WEEKDAYS:
+            intervals = opening_hours.get(weekday, ()) if opening_hours else DEFAULT_OPENING_HOURS
+            starts = []
+            for opens, closes in sorted(intervals):
+                minute = _minutes(opens)
+                # Overlapping intervals must not produce overlapping slots.
+                if starts and minute < starts[-1] + slot_minutes:
+                    minute = starts[-1] + slot_minutes
+                while minute + slot_minutes <= _minutes(closes):
+                    starts.append(minute)
+                    minute += slot_minutes
+            self.offsets[weekday] = tuple(starts)
+
+    @classmethod
+    def compile(cls, schedule):
+        """Build the compiled form of a ``ServiceSchedule`` (or of the default one for ``None``)."""
+        if schedule is None:
+            return cls()
+        opening_hours = defaultdict(list)
+        for row in schedule.opening_hours.all():
+            opening_hours[row.weekday].append((row.opens, row.closes))
+        return cls(schedule.slot_minutes, opening_hours, [blackout.day for blackout in schedule.blackout_dates.all()],
+                   schedule.capacity)
+
+    def slots(self, day):
+        if day in self.blackout_days:
+            return ()
+        return tuple(make_aware(datetime.combine(day, time(minute // 60, minute % 60)))
+                     for minute in self.offsets[day.isoweekday()])
+
+    def slot_bit(self, slot_time):
+        """Bit of ``slot_time`` in the day's availability bitmap; slots never share one."""
+        slot_time = localtime(slot_time)
+        return 1 << (slot_time.hour * 60 + slot_time.minute) // self.slot_minutes
+
+    def is_slot(self, slot_time):
+        slot_time = localtime(slot_time)
+        return (slot_time.second == 0 and slot_time.microsecond == 0
+                and slot_time.date() not in self.blackout_days
+                and slot_time.hour * 60 + slot_time.minute in self.offsets[slot_time.isoweekday()])
+
+    def open_hours(self, start, end):
+        """Bookable unit-hours from ``start`` to ``end`` (inclusive days)."""
+        slots, day = 0, start
+        while day <= end:
+            if day not in self.blackout_days:
+                slots += len(self.offsets[day.isoweekday()])
+            day += timedelta(days=1)
+        return Decimal(slots * self.slot_minutes * self.capacity) / 60
+
+
+DEFAULT_SCHEDULE = Schedule()
+
+
+def _load(service_ids):
+    schedules = {service_id: DEFAULT_SCHEDULE for service_id in service_ids}
+    for schedule in ServiceSchedule.objects.filter(service_id__in=service_ids).prefetch_related(
+            'opening_hours', 'blackout_dates'):
+        schedules[schedule.service_id] = Schedule.compile(schedule)
+    return schedules
+
+
+def get_many(service_ids):
+    """Return ``{service_id: Schedule}``, compiling and caching the ones that are not cached yet."""
+    keys = {_schedule_key(service_id): service_id for service_id in service_ids}
+    cached = cache.get_many(keys)
+    schedules = {keys[key]: schedule for key, schedule in cached.items()}
+    missing = [service_id for service_id in service_ids if service_id not in schedules]
+    if missing:
+        loaded = _load(missing)
+        cache.set_many({_schedule_key(service_id): schedule for service_id, schedule in loaded.items()},
+                       _cache_timeout())
+        schedules.update(loaded)
+    return schedules
+
+
+def get(service_id):
+    return get_many([service_id])[service_id]
+
+
+def _in_horizon(day):
+    today = localtime().date()
+    return today <= day <= today + timedelta(days=horizon_days())
+
+
+def _slots_for_day(service_ids, day, schedules, cached):
+    """Fill in the slots ``cached`` lacks; returns them with the cache entries to write."""
+    slots, fresh = {}, {}
+    for service_id in service_ids:
+        key = _slots_key(service_id, day)
+        if key in cached:
+            slots[service_id] = cached[key]
+        else:
+            slots[service_id] = schedules[service_id].slots(day)
+            if _in_horizon(day):
+                fresh[key] = slots[service_id]
+    return slots, fresh
+
+
+def slots_for_day(service_ids, day, schedules=None):
+    """Return ``{service_id: slot start times}`` for ``day``, read from the precomputed slot cache.
+
+    Days inside the rolling horizon are cached as they are generated; days outside it are
+    expanded from the compiled schedule every time.
+    """
+    schedules = schedules or get_many(service_ids)
+    cached = cache.get_many([_slots_key(service_id, day) for service_id in service_ids]) if _in_horizon(day) else {}
+    slots, fresh = _slots_for_day(service_ids, day, schedules, cached)
+    if fresh:
+        cache.set_many(fresh, _cache_timeout())
+    return slots
+
+
+async def aslots_for_day(service_ids, day, schedules):
+    cached = await cache.aget_many(
+        [_slots_key(service_id, day) for service_id in service_ids]) if _in_horizon(day) else {}
+    slots, fresh = _slots_for_day(service_ids, day, schedules, cached)
+    if fresh:
+        await cache.aset_many(fresh, _cache_timeout())
+    return slots
+
+
+def day_slots(service_id, day):
+    return slots_for_day([service_id], day)[service_id]
+
+
+def precompute(service_ids=None, days=None):
+    """Generate and cache the slots of every day in the rolling horizon; returns the number of service days."""
+    if service_ids is None:
+        service_ids = list(Service.objects.values_list('pk', flat=True))
+    schedules = get_many(service_ids)
+    today = localtime().date()
+    days = horizon_days() if days is None else min(days, horizon_days())
+    written = 0
+    for offset in range(days + 1):
+        day = today + timedelta(days=offset)
+        cache.set_many({_slots_key(service_id, day): schedules[service_id].slots(day) for service_id in service_ids},
+                       _cache_timeout())
+        written += len(service_ids)
+    return written
+
+
+def invalidate(service_id):
+    """Forget a service's compiled schedule and every precomputed day it may have produced."""
+    today = localtime().date()
+    keys = [_slots_key(service_id, today + timedelta(days=offset)) for offset in range(-1, horizon_days() + 2)]
+    cache.delete_many([_schedule_key(service_id), *keys])
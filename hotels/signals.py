@@ -0,0 +1,198 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils.timezone import localtime, now
+
+from hotels import availability, caching, pricing, registration, rollups, schedules, thumbnails
+from hotels.models import AvailableTime, BlackoutDate, Hotel, HotelRegisteredUser, OpeningHours, PricingRule, \
+    Reservation, RoomService, RoomServiceRequest, Service, ServiceSchedule
+
+
+def _reservation_slot(reservation_id):
+    return Reservation.objects.filter(pk=reservation_id).values_list(
+        'service_id', 'reserved_for__start_time', 'reserved_for_id').first()
+
+
+@receiver(pre_save, sender=Reservation)
+def remember_previous_reservation_slot(sender, instance, **kwargs):
+    instance._previous_slot = _reservation_slot(instance.pk) if instance.pk else None
+
+
+@receiver(pre_save, sender=Reservation)
+def price_reservation(sender, instance, **kwargs):
+    # Reservations made outside book_slots (e.g. in the admin, or loaded from a fixture without a
+    # price) are priced like a one-slot booking.
+    if instance.price is None:
+        instance.price = pricing.quote(instance.service, [instance.reserved_for.start_time]).total
+
+
+@receiver(post_save, sender=Reservation)
+def index_saved_reservation(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_slot', None)
+    day = localtime(instance.reserved_for.start_time).date()
+    # Reservations saved here (rather than by book_slots) have not been counted against their slot.
+    slot_ids = {instance.reserved_for_id, previous[2]} if previous else {instance.reserved_for_id}
+    availability.recount_slots(AvailableTime.objects.filter(pk__in=slot_ids))
+    if previous and previous[:2] != (instance.service_id, instance.reserved_for.start_time):
+        availability.refresh_day(previous[0], localtime(previous[1]).date(), create=False)
+        rollups.refresh_service_day(previous[0], localtime(previous[1]).date(), create=False)
+    availability.refresh_day(instance.service_id, day)
+    rollups.refresh_service_day(instance.service_id, day)
+
+
+@receiver(post_delete, sender=Reservation)
+def release_deleted_reservation(sender, instance, **kwargs):
+    availability.recount_slots(AvailableTime.objects.filter(pk=instance.reserved_for_id))
+    start_time = AvailableTime.objects.filter(pk=instance.reserved_for_id).values_list(
+        'start_time', flat=True).first()
+    if start_time is not None:
+        availability.refresh_day(instance.service_id, localtime(start_time).date(), create=False)
+        rollups.refresh_service_day(instance.service_id, localtime(start_time).date(), create=False)
+
+
+@receiver(pre_save, sender=AvailableTime)
+def remember_previous_start_time(sender, instance, **kwargs):
+    instance._previous_start_time = AvailableTime.objects.filter(pk=instance.pk).values_list(
+        'start_time', flat=True).first() if instance.pk else None
+
+
+@receiver(post_save, sender=AvailableTime)
+def index_moved_available_time(sender, instance, created=False, raw=False, **kwargs):
+    previous = getattr(instance, '_previous_start_time', None)
+    if created or raw or previous is None or previous == instance.start_time:
+        return
+    service_ids = set(instance.reservation_set.values_list('service_id', flat=True))
+    for service_id in service_ids:
+        availability.refresh_day(service_id, localtime(previous).date(), create=False)
+        availability.refresh_day(service_id, localtime(instance.start_time).date())
+        rollups.refresh_service_day(service_id, localtime(previous).date(), create=False)
+        rollups.refresh_service_day(service_id, localtime(instance.start_time).date())
+
+
+def _schedule_changed(service_id, reindex=False):
+    def refresh():
+        schedules.invalidate(service_id)
+        if not Service.objects.filter(pk=service_id).exists():
+            return
+        if reindex:
+            # Slot bits are numbered by slot length and set by capacity, so the bitmaps are redone.
+            availability.rebuild([service_id])
+        schedules.precompute([service_id])
+
+    schedules.invalidate(service_id)
+    transaction.on_commit(refresh)
+
+
+def _resize_upcoming_slots(service_id, capacity):
+    # Past slots keep the capacity they were booked with.
+    availability.recount_slots(AvailableTime.objects.filter(service_id=service_id, start_time__gt=now()), capacity)
+
+
+@receiver(pre_save, sender=ServiceSchedule)
+def remember_previous_schedule_shape(sender, instance, **kwargs):
+    instance._previous_shape = ServiceSchedule.objects.filter(pk=instance.pk).values_list(
+        'slot_minutes', 'capacity').first() if instance.pk else None
+
+
+@receiver(post_save, sender=ServiceSchedule)
+def refresh_saved_schedule(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_shape', None) or (schedules.DEFAULT_SLOT_MINUTES, 1)
+    if previous[1] != instance.capacity:
+        _resize_upcoming_slots(instance.service_id, instance.capacity)
+    _schedule_changed(instance.service_id, previous != (instance.slot_minutes, instance.capacity))
+
+
+@receiver(post_delete, sender=ServiceSchedule)
+def refresh_deleted_schedule(sender, instance, **kwargs):
+    if instance.capacity != 1:
+        _resize_upcoming_slots(instance.service_id, 1)
+    _schedule_changed(instance.service_id, (instance.slot_minutes, instance.capacity) != (
+        schedules.DEFAULT_SLOT_MINUTES, 1))
+
+
+@receiver(post_save, sender=OpeningHours)
+@receiver(post_delete, sender=OpeningHours)
+@receiver(post_save, sender=BlackoutDate)
+@receiver(post_delete, sender=BlackoutDate)
+def refresh_schedule_details(sender, instance, raw=False, **kwargs):
+    service_id = ServiceSchedule.objects.filter(pk=instance.schedule_id).values_list('service_id', flat=True).first()
+    if service_id is not None and not raw:
+        _schedule_changed(service_id)
+
+
+@receiver(post_save, sender=RoomServiceRequest)
+def count_room_service_request(sender, instance, created=False, raw=False, **kwargs):
+    # The intake queue writes with bulk_create, which sends no signals; it counts its own batches.
+    if created and not raw:
+        rollups.record_room_service_requests([instance])
+
+
+@receiver(post_delete, sender=RoomServiceRequest)
+def uncount_room_service_request(sender, instance, **kwargs):
+    rollups.record_room_service_requests([instance], sign=-1)
+
+
+@receiver(pre_save, sender=PricingRule)
+def remember_previous_pricing_scope(sender, instance, **kwargs):
+    instance._previous_scope = PricingRule.objects.filter(pk=instance.pk).values_list(
+        'hotel_id', 'service_id').first() if instance.pk else None
+
+
+@receiver(post_save, sender=PricingRule)
+@receiver(post_delete, sender=PricingRule)
+def invalidate_cached_pricing(sender, instance, **kwargs):
+    pricing.invalidate_scope(instance.hotel_id, instance.service_id)
+    previous = getattr(instance, '_previous_scope', None)
+    if previous and previous != (instance.hotel_id, instance.service_id):
+        pricing.invalidate_scope(*previous)
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+def invalidate_cached_service_pricing(sender, instance, **kwargs):
+    pricing.invalidate([instance.pk])
+
+
+@receiver(post_save, sender=Hotel)
+@receiver(post_delete, sender=Hotel)
+def invalidate_cached_hotel(sender, instance, **kwargs):
+    caching.invalidate_hotel_detail(instance.pk)
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+@receiver(post_save, sender=RoomService)
+@receiver(post_delete, sender=RoomService)
+def invalidate_cached_hotel_services(sender, instance, **kwargs):
+    caching.invalidate_hotel_detail(instance.hotel_id)
+
+
+@receiver(post_save, sender=Hotel)
+@receiver(post_save, sender=Service)
+@receiver(post_save, sender=RoomService)
+def queue_image_variants(sender, instance, raw=False, **kwargs):
+    if raw or not instance.image or thumbnails.has_variants(instance.image):
+        return
+    hotel_id = instance.pk if sender is Hotel else instance.hotel_id
+    storage, name = instance.image.storage, instance.image.name
+    transaction.on_commit(lambda: thumbnails.thumbnail_queue.submit(
+        storage, name, on_done=lambda: caching.invalidate_hotel_detail(hotel_id)))
+
+
+@receiver(pre_save, sender=HotelRegisteredUser)
+def remember_previous_private_number(sender, instance, **kwargs):
+    instance._previous_private_number = HotelRegisteredUser.objects.filter(pk=instance.pk).values_list(
+        'private_number', flat=True).first() if instance.pk else None
+
+
+@receiver(post_save, sender=HotelRegisteredUser)
+@receiver(post_delete, sender=HotelRegisteredUser)
+def invalidate_cached_registration(sender, instance, **kwargs):
+    registration.invalidate(instance.private_number)
+    previous = getattr(instance, '_previous_private_number', None)
+    if previous and previous != instance.private_number:
+        registration.invalidate(previous)
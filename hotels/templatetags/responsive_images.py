@@ -0,0 +1,55 @@
+from functools import lru_cache
+
+from django import template
+from django.contrib.staticfiles import finders
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from hotels import thumbnails
+
+register = template.Library()
+
+
+@lru_cache(maxsize=None)
+def _static_variants(name):
+    """Variants of the static file ``name``, looked up once per process.
+
+    Static files only change on deploy (``generate_image_variants --static`` runs at build time),
+    and tags like the logo in base.html render on every page, outside any cached fragment.
+    """
+    return thumbnails.find_variants(lambda target: finders.find(target) is not None, name)
+
+
+def _srcset(url, variants):
+    return ', '.join(f'{url(name)} {width}w' for name, width in variants)
+
+
+@register.simple_tag
+def responsive_image(image, alt='', sizes='350px', fallback=None, width=None, loading='lazy'):
+    """Render ``image`` as a ``<picture>`` whose ``srcset`` lists its resized variants.
+
+    ``image`` is an uploaded ``ImageField`` file or a static path; ``fallback`` is the static path
+    used when it is empty. Until variants exist the original is served as a plain ``<img>``.
+    """
+    image = image or fallback
+    if not image:
+        return ''
+    if isinstance(image, str):
+        name, url = image, static
+        # Copied: the default format is popped from it below.
+        variants = dict(_static_variants(name))
+    else:
+        name, url = image.name, image.storage.url
+        variants = thumbnails.find_variants(image.storage.exists, name)
+
+    default_extension = thumbnails.FORMATS[0][0]
+    defaults = variants.pop(default_extension, None)
+    if not defaults:
+        return format_html('<img src="{}" alt="{}"{} loading="{}">', url(name), alt,
+                           format_html(' width="{}"', width) if width else '', loading)
+    sources = format_html_join('', '<source type="image/{}" srcset="{}" sizes="{}">', (
+        (extension, _srcset(url, found), sizes) for extension, found in variants.items()))
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" alt="{}"{} loading="{}" decoding="async"></picture>',
+        sources, url(defaults[0][0]), _srcset(url, defaults), sizes, alt,
+        format_html(' width="{}"', width) if width else '', loading)
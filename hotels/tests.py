@@ -1,3 +1,454 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
+from datetime import datetime, time, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils.timezone import localtime, make_aware, now
+
+from hotels import archival, availability, booking, holds, pricing, rollups, roster, schedules
+from hotels.models import ArchivedReservation, AvailableTime, CustomUser, DailyRollup, Hotel, HotelRegisteredUser, \
+    PricingRule, Reservation, Service, ServiceSchedule, SlotHold
+from hotels.views import serve_static
+
+
+class BookingTestCase(TestCase):
+    def setUp(self):
+        # Compiled schedules and pricing rules are cached per service id, which tests reuse.
+        cache.clear()
+        self.hotel = Hotel.objects.create(name='Hotel', location='City')
+        self.service = Service.objects.create(hotel=self.hotel, name='Spa', description='Spa',
+                                              price=Decimal('50.00'))
+        self.guest = self.make_guest('guest')
+        self.day = localtime().date() + timedelta(days=2)
+
+    def make_guest(self, name):
+        private_number = f'{CustomUser.objects.count() + 1:011d}'
+        HotelRegisteredUser.objects.create(hotel=self.hotel, private_number=private_number,
+                                           email=f'{name}@example.com')
+        return CustomUser.objects.create_user(username=name, email=f'{name}@example.com',
+                                              private_number=private_number, password='password',
+                                              hotel=self.hotel)
+
+    def at(self, hour, day=None):
+        return make_aware(datetime.combine(day or self.day, time(hour)))
+
+    def remaining(self, hour):
+        return AvailableTime.objects.get(service=self.service, start_time=self.at(hour)).remaining
+
+    def assertConsistent(self):
+        self.assertEqual(availability.find_inconsistencies(), [])
+        self.assertEqual(availability.find_miscounted_slots(), [])
+
+
+class BookSlotsTests(BookingTestCase):
+    def test_books_every_slot(self):
+        slot_times = [self.at(hour) for hour in (10, 11, 12)]
+        reservations = booking.book_slots(self.guest, self.service, slot_times)
+
+        self.assertEqual(sorted(reservation.reserved_for.start_time for reservation in reservations), slot_times)
+        self.assertTrue(all(reservation.price for reservation in reservations))
+        self.assertEqual([self.remaining(hour) for hour in (10, 11, 12)], [0, 0, 0])
+        self.assertEqual(availability.free_slots(self.service, self.day)[:2], [self.at(13), self.at(14)])
+        rollup = DailyRollup.objects.get(service=self.service, day=self.day)
+        self.assertEqual(rollup.booked_hours, 3)
+        self.assertConsistent()
+
+    def test_full_slot_conflicts(self):
+        booking.book_slots(self.guest, self.service, [self.at(10)])
+
+        with self.assertRaises(booking.SlotConflictError) as raised:
+            booking.book_slots(self.make_guest('other'), self.service, [self.at(10), self.at(11)])
+        self.assertEqual(raised.exception.times, [self.at(10)])
+        self.assertEqual(Reservation.objects.count(), 1)
+        self.assertFalse(AvailableTime.objects.filter(start_time=self.at(11)).exists())
+        self.assertConsistent()
+
+    def test_capacity_counts_down_remaining(self):
+        ServiceSchedule.objects.create(service=self.service, capacity=2)
+        guests = [self.guest, self.make_guest('second'), self.make_guest('third')]
+
+        booking.book_slots(guests[0], self.service, [self.at(10)])
+        self.assertEqual(self.remaining(10), 1)
+        self.assertIn(self.at(10), availability.free_slots(self.service, self.day))
+        booking.book_slots(guests[1], self.service, [self.at(10)])
+        self.assertEqual(self.remaining(10), 0)
+        self.assertNotIn(self.at(10), availability.free_slots(self.service, self.day))
+        with self.assertRaises(booking.SlotConflictError):
+            booking.book_slots(guests[2], self.service, [self.at(10)])
+        self.assertEqual(Reservation.objects.filter(reserved_for__start_time=self.at(10)).count(), 2)
+        self.assertConsistent()
+
+    def test_failed_booking_rolls_back(self):
+        ServiceSchedule.objects.create(service=self.service, capacity=2)
+        booking.book_slots(self.guest, self.service, [self.at(10)])
+
+        # A unit of 10:00 is still free, so its counter is decremented before the guest's
+        # second reservation of the slot hits the unique constraint.
+        with self.assertRaises(booking.SlotConflictError):
+            booking.book_slots(self.guest, self.service, [self.at(10), self.at(11)])
+        self.assertEqual(self.remaining(10), 1)
+        self.assertFalse(AvailableTime.objects.filter(start_time=self.at(11)).exists())
+        self.assertEqual(Reservation.objects.count(), 1)
+        self.assertEqual(DailyRollup.objects.get(service=self.service, day=self.day).booked_hours, 1)
+        self.assertConsistent()
+
+    def test_rejects_past_and_unoffered_times(self):
+        with self.assertRaises(booking.PastSlotError):
+            booking.book_slots(self.guest, self.service, [self.at(10, localtime().date() - timedelta(days=1))])
+        with self.assertRaises(booking.UnavailableSlotError):
+            booking.book_slots(self.guest, self.service, [self.at(23)])
+        self.assertFalse(Reservation.objects.exists())
+
+
+class SlotHoldTests(BookingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.other = self.make_guest('other')
+
+    def hold(self, guest, hours):
+        return holds.place(guest, self.service, [self.at(hour) for hour in hours], schedules.get(self.service.id))
+
+    def free(self, guest):
+        return availability.free_slots(self.service, self.day, user=guest)
+
+    def test_held_slots_are_taken_for_others_only(self):
+        held, unavailable, _ = self.hold(self.guest, (10, 11))
+
+        self.assertEqual((held, unavailable), ([self.at(10), self.at(11)], []))
+        self.assertNotIn(self.at(10), self.free(self.other))
+        self.assertIn(self.at(10), self.free(self.guest))
+        with self.assertRaises(booking.SlotHeldError) as raised:
+            booking.book_slots(self.other, self.service, [self.at(11), self.at(12)])
+        self.assertEqual(raised.exception.times, [self.at(11)])
+        self.assertFalse(Reservation.objects.exists())
+        self.assertConsistent()
+
+    def test_holder_books_and_releases(self):
+        self.hold(self.guest, (10, 11))
+
+        booking.book_slots(self.guest, self.service, [self.at(10)])
+        self.assertEqual(list(SlotHold.objects.values_list('start_time', flat=True)), [self.at(11)])
+        self.assertIn(self.at(11), self.free(self.guest))
+
+    def test_expired_holds_are_ignored(self):
+        self.hold(self.guest, (10,))
+        SlotHold.objects.update(expires_at=now() - timedelta(seconds=1))
+
+        self.assertIn(self.at(10), self.free(self.other))
+        self.assertEqual(self.hold(self.other, (10,))[0], [self.at(10)])
+        self.assertEqual(holds.sweep(), 1)
+        self.assertEqual(list(SlotHold.objects.values_list('user_id', flat=True)), [self.other.id])
+
+    def test_earliest_hold_wins(self):
+        self.hold(self.guest, (10,))
+
+        held, unavailable, _ = self.hold(self.other, (10, 11))
+        self.assertEqual((held, unavailable), ([self.at(11)], [self.at(10)]))
+        # Placing a new selection replaces the previous one and keeps what is still wanted.
+        self.assertEqual(self.hold(self.other, (11, 12))[0], [self.at(11), self.at(12)])
+        self.assertEqual(sorted(SlotHold.objects.filter(user=self.other).values_list('start_time', flat=True)),
+                         [self.at(11), self.at(12)])
+
+    def test_holds_count_against_each_unit(self):
+        ServiceSchedule.objects.create(service=self.service, capacity=2)
+        third = self.make_guest('third')
+        self.hold(self.guest, (10,))
+
+        self.assertEqual(availability.open_slots(self.service, self.day, user=third)[0], (self.at(10), 1))
+        self.assertEqual(self.hold(self.other, (10,))[0], [self.at(10)])
+        self.assertEqual(self.hold(third, (10,))[1], [self.at(10)])
+        self.assertNotIn(self.at(10), self.free(third))
+        with self.assertRaises(booking.SlotHeldError):
+            booking.book_slots(third, self.service, [self.at(10)])
+        booking.book_slots(self.other, self.service, [self.at(10)])
+        self.assertEqual(self.remaining(10), 1)
+        self.assertConsistent()
+
+
+class ReservationPriceTests(BookingTestCase):
+    def test_raw_saves_are_priced_and_null_is_refused(self):
+        reservation = booking.book_slots(self.guest, self.service, [self.at(10)])[0]
+        loaded = Reservation(user=self.guest, service=self.service, reserved_for=reservation.reserved_for,
+                             reservation_date=reservation.reservation_date)
+        Reservation.objects.filter(pk=reservation.pk).delete()
+        # As loaddata saves fixture rows.
+        loaded.save_base(raw=True)
+        self.assertEqual(loaded.price, reservation.price)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Reservation.objects.filter(pk=loaded.pk).update(price=None)
+        rollups.refresh_service_day(self.service.id, self.day)
+
+
+class PricingTests(BookingTestCase):
+    def rule(self, kind, factor, **fields):
+        return PricingRule.objects.create(kind=kind, factor=Decimal(factor), **fields)
+
+    def prices(self, hours, day=None, rules=None):
+        rules = rules or pricing.rule_set(self.service)
+        return [amount for _, amount in rules.quote([self.at(hour, day) for hour in hours]).lines]
+
+    def test_most_specific_scope_wins_per_kind(self):
+        other_hotel = Hotel.objects.create(name='Other', location='Town')
+        self.rule('rate', '0.5')
+        self.rule('rate', '0.4', hotel=self.hotel)
+        self.rule('rate', '0.3', service=self.service)
+        self.rule('rate', '0.9', hotel=other_hotel)
+        self.rule('rate', '0.1', service=self.service, active=False)
+        self.rule('peak', '2', start_time=time(10), end_time=time(11))
+        self.rule('multi_hour', '0.9', min_hours=2)
+        self.rule('multi_hour', '0.5', min_hours=3, hotel=self.hotel)
+
+        rules = pricing.RuleSet.compile(self.service, PricingRule.objects.all())
+        self.assertEqual(rules.rate, Decimal('0.3'))
+        # Only broader rules of the same kind are replaced; the global peak still applies.
+        self.assertEqual(rules.peaks, [(None, 600, 660, Decimal(2))])
+        self.assertEqual(rules.discounts, [(3, Decimal('0.5'))])
+        self.assertEqual(pricing.rule_set(self.service).rate, Decimal('0.3'))
+
+    def test_peaks_match_weekday_and_minutes(self):
+        weekday = self.day.isoweekday()
+        self.rule('peak', '1.5', start_time=time(9, 30), end_time=time(11), weekdays=str(weekday))
+        self.rule('peak', '2', start_time=time(10), end_time=time(10, 30), weekdays=f'{weekday % 7 + 1},{weekday}')
+
+        # 09:00 starts before the peak and 11:00 at its (exclusive) end; the larger factor wins.
+        self.assertEqual(self.prices([9, 10, 11]), [Decimal('10.00'), Decimal('20.00'), Decimal('10.00')])
+        next_week = self.day + timedelta(days=7)
+        self.assertEqual(self.prices([10], day=next_week), [Decimal('20.00')])
+        self.assertEqual(self.prices([10], day=self.day + timedelta(days=1)), [Decimal('20.00')])
+        self.assertEqual(self.prices([10], day=self.day + timedelta(days=2)), [Decimal('10.00')])
+
+    def test_longest_qualifying_discount_applies(self):
+        self.rule('multi_hour', '0.9', min_hours=2, service=self.service)
+        self.rule('multi_hour', '0.8', min_hours=4, service=self.service)
+
+        for hours, discount, total in ((1, 1, '10.00'), (3, '0.9', '27.00'), (4, '0.8', '32.00'),
+                                       (5, '0.8', '40.00')):
+            quote = pricing.quote(self.service, [self.at(10 + hour) for hour in range(hours)])
+            self.assertEqual((quote.hours, quote.discount, quote.total), (hours, Decimal(discount), Decimal(total)))
+
+    def test_charged_rate_override(self):
+        self.assertEqual(self.prices([10]), [Decimal('10.00')])
+
+        rule = self.rule('rate', '1', service=self.service)
+        self.assertEqual(self.prices([10]), [Decimal('50.00')])
+        rule.delete()
+        self.assertEqual(self.prices([10]), [Decimal('10.00')])
+
+    def test_service_quote_view(self):
+        self.rule('multi_hour', '0.5', min_hours=2)
+        self.client.force_login(self.guest)
+        url = reverse('service_quote', args=[self.service.id])
+
+        response = self.client.get(url, {'times': f'{self.day} 11:00:00,{self.day} 10:00:00'})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((Decimal(data['discount']), Decimal(data['total'])), (Decimal('0.5'), Decimal('10.00')))
+        self.assertEqual([(slot['start'][11:16], Decimal(slot['price'])) for slot in data['slots']],
+                         [('10:00', Decimal('5.00')), ('11:00', Decimal('5.00'))])
+        for times in ('', f'{self.day} 10:00', f'{self.day} 10:30:00'):
+            self.assertEqual(self.client.get(url, {'times': times}).status_code, 400)
+
+
+class ReserveServiceViewTests(BookingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.guest)
+        self.url = reverse('reserve_service', args=[self.service.id]) + f'?date={self.day}'
+
+    def post(self, reservation_times):
+        response = self.client.post(self.url, {'reservation_times': reservation_times})
+        self.assertEqual(response.status_code, 200)
+        return [str(message) for message in get_messages(response.wsgi_request)]
+
+    def test_books_and_redirects(self):
+        response = self.client.post(self.url, {'reservation_times': f'{self.day} 10:00:00,{self.day} 11:00:00'})
+        self.assertRedirects(response, reverse('reserve_service', args=[self.service.id]),
+                             fetch_redirect_response=False)
+        self.assertEqual(Reservation.objects.filter(user=self.guest).count(), 2)
+
+    def test_bad_input_rerenders_with_a_message(self):
+        self.assertEqual(self.post(' , '), ['You have not chosen any time slots.'])
+        self.assertEqual(self.post(f'{self.day} 10:00'),
+                         ['The selected times could not be read. Please choose listed times.'])
+        self.assertFalse(Reservation.objects.exists())
+
+
+class BulkChangeTests(BookingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.other = self.make_guest('other')
+        self.own = Reservation.objects.filter(user=self.guest)
+
+    def book(self, guest, hour):
+        return booking.book_slots(guest, self.service, [self.at(hour)])[0]
+
+    def past_reservation(self):
+        start_time = self.at(10, localtime().date() - timedelta(days=1))
+        slot = AvailableTime.objects.create(service=self.service, start_time=start_time,
+                                            end_time=start_time + timedelta(hours=1), remaining=0, is_reserved=True)
+        return Reservation.objects.create(user=self.guest, service=self.service, reserved_for=slot)
+
+    def test_cancel_outcomes(self):
+        upcoming, past, others = self.book(self.guest, 10), self.past_reservation(), self.book(self.other, 11)
+
+        outcomes = booking.cancel_reservations([upcoming.id, past.id, others.id, 0], self.own)
+
+        self.assertEqual(outcomes, {upcoming.id: booking.CANCELLED, past.id: booking.STARTED,
+                                    others.id: booking.NOT_FOUND, 0: booking.NOT_FOUND})
+        self.assertEqual(set(Reservation.objects.values_list('id', flat=True)), {past.id, others.id})
+        self.assertEqual(self.remaining(10), 1)
+        self.assertEqual(DailyRollup.objects.get(service=self.service, day=self.day).booked_hours, 1)
+        self.assertConsistent()
+
+    def test_reschedule_outcomes(self):
+        moving, blocked, too_late, unoffered = (self.book(self.guest, hour) for hour in (10, 11, 12, 13))
+        full, others, past = self.book(self.other, 15), self.book(self.other, 16), self.past_reservation()
+
+        outcomes = booking.reschedule_reservations([
+            (moving.id, self.at(14)),
+            (blocked.id, self.at(15)),
+            (too_late.id, self.at(10, localtime().date() - timedelta(days=1))),
+            (unoffered.id, self.at(23)),
+            (others.id, self.at(17)),
+            (past.id, self.at(17)),
+        ], self.own)
+
+        self.assertEqual(list(outcomes.values()), [booking.RESCHEDULED, booking.CONFLICT, booking.PAST,
+                                                   booking.UNAVAILABLE, booking.NOT_FOUND, booking.STARTED])
+        moving.refresh_from_db()
+        blocked.refresh_from_db()
+        self.assertEqual(moving.reserved_for.start_time, self.at(14))
+        self.assertEqual(blocked.reserved_for.start_time, self.at(11))
+        self.assertEqual((self.remaining(10), self.remaining(14), self.remaining(15)), (1, 0, 0))
+        self.assertEqual(Reservation.objects.filter(reserved_for=full.reserved_for).count(), 1)
+        self.assertEqual(DailyRollup.objects.get(service=self.service, day=self.day).booked_hours, 6)
+        self.assertConsistent()
+
+
+class ArchivedRollupTests(BookingTestCase):
+    def test_partly_archived_day_keeps_archived_totals(self):
+        booking.book_slots(self.guest, self.service, [self.at(hour) for hour in (10, 11, 15, 16)])
+        # Cut the day in two, as an early cutoff or an interrupted run would.
+        archival.archive(self.at(14))
+        self.assertEqual(ArchivedReservation.objects.count(), 2)
+
+        Reservation.objects.get(reserved_for__start_time=self.at(15)).delete()
+
+        rollup = DailyRollup.objects.get(service=self.service, day=self.day)
+        expected = rollups.expected_rollups()[(self.hotel.id, self.service.id, self.day)]
+        self.assertEqual(rollup.booked_hours, 3)
+        self.assertEqual((rollup.booked_hours, rollup.revenue), (expected['booked_hours'], expected['revenue']))
+
+
+class RacingRosterImport(roster.RosterImport):
+    """Loses a race for ``raced@example.com``: another writer takes it after the chunk's lookup."""
+
+    def upsert(self, guests):
+        if any(guest.email == 'raced@example.com' for guest in guests):
+            raise IntegrityError('UNIQUE constraint failed: hotels_hotelregistereduser.email')
+        super().upsert(guests)
+
+
+class RosterImportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.hotel = Hotel.objects.create(name='Hotel', location='City')
+        self.other_hotel = Hotel.objects.create(name='Other', location='Town')
+        HotelRegisteredUser.objects.create(hotel=self.hotel, private_number='1', email='one@example.com')
+        HotelRegisteredUser.objects.create(hotel=self.hotel, private_number='9', email='taken@example.com')
+        self.errors = []
+
+    def record_error(self, line, message):
+        self.errors.append((line, message))
+
+    def run_import(self, text, importer=roster.RosterImport, **kwargs):
+        result = importer(default_hotel_id=self.hotel.id, on_error=self.record_error, **kwargs)
+        return result.run(roster.read_rows(io.StringIO(text), 'csv'))
+
+    def guests(self):
+        return list(HotelRegisteredUser.objects.order_by('private_number').values_list(
+            'private_number', 'hotel_id', 'email'))
+
+    def test_upserts_and_reports_bad_rows(self):
+        result = self.run_import(
+            'private_number,email,hotel_id\n'
+            f'1,one@new.example.com,{self.other_hotel.id}\n'
+            '2,two@old.example.com,\n'
+            '3,taken@example.com,\n'
+            '4,dup@example.com,\n'
+            '2,two@EXAMPLE.com,\n'
+            '5,dup@example.com,\n'
+            ',blank@example.com,\n'
+            '6,not-an-email,\n'
+            '7,seven@example.com,999\n')
+
+        self.assertEqual((result.created, result.updated, result.failed), (2, 1, 5))
+        self.assertEqual(self.guests(), [
+            ('1', self.other_hotel.id, 'one@new.example.com'),
+            ('2', self.hotel.id, 'two@example.com'),
+            ('4', self.hotel.id, 'dup@example.com'),
+            ('9', self.hotel.id, 'taken@example.com'),
+        ])
+        self.assertEqual(self.errors, [
+            (7, 'email dup@example.com is also used for private number 4 in this file'),
+            (8, 'private_number is required'),
+            (9, "invalid email 'not-an-email'"),
+            (10, 'unknown hotel 999'),
+            (4, 'email taken@example.com is already registered to private number 9'),
+        ])
+
+    def test_later_row_frees_an_email_within_the_file(self):
+        # Private number 2 moves to another address, so 3 can take its first one.
+        result = self.run_import('private_number,email\n2,a@example.com\n2,b@example.com\n3,a@example.com\n')
+
+        self.assertEqual((result.created, result.failed), (2, 0))
+        self.assertEqual([guest[::2] for guest in self.guests()],
+                         [('1', 'one@example.com'), ('2', 'b@example.com'), ('3', 'a@example.com'),
+                          ('9', 'taken@example.com')])
+
+    def test_failed_batch_is_retried_row_by_row(self):
+        result = self.run_import(
+            'private_number,email\n1,one@new.example.com\n2,raced@example.com\n3,three@example.com\n',
+            importer=RacingRosterImport, chunk_size=2)
+
+        self.assertEqual((result.created, result.updated, result.failed), (1, 1, 1))
+        self.assertEqual([guest[::2] for guest in self.guests()],
+                         [('1', 'one@new.example.com'), ('3', 'three@example.com'), ('9', 'taken@example.com')])
+        self.assertEqual(len(self.errors), 1)
+        self.assertEqual(self.errors[0][0], 3)
+        self.assertTrue(self.errors[0][1].startswith('could not be saved: UNIQUE constraint failed'))
+
+
+class ServeStaticTests(TestCase):
+    def setUp(self):
+        static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, static_root)
+        for name, content in (('app.js', b'js'), ('app.js.br', b'br'), ('app.js.gz', b'gz')):
+            with open(os.path.join(static_root, name), 'wb') as fh:
+                fh.write(content)
+        settings_override = override_settings(STATIC_ROOT=static_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def served(self, accept_encoding):
+        response = serve_static(RequestFactory().get('/static/app.js', HTTP_ACCEPT_ENCODING=accept_encoding),
+                                'app.js')
+        self.addCleanup(response.close)
+        return response.get('Content-Encoding'), b''.join(response.streaming_content)
+
+    def test_picks_an_accepted_encoding(self):
+        self.assertEqual(self.served('gzip, deflate, br'), ('br', b'br'))
+        self.assertEqual(self.served('br;q=0, gzip'), ('gzip', b'gz'))
+        self.assertEqual(self.served('BR ; Q=0.0, gzip;q=0'), (None, b'js'))
+        self.assertEqual(self.served('*;q=0.5, br;q=0'), ('gzip', b'gz'))
+        # Neither name is a substring match for another coding any more.
+        self.assertEqual(self.served('x-brotli, gzipped'), (None, b'js'))
+        self.assertEqual(self.served(''), (None, b'js'))
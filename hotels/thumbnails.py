@@ -0,0 +1,134 @@
+import logging
+import os
+import queue
+import threading
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# (extension, Pillow format, save options); the first is the <img> fallback, the rest <source>s.
+FORMATS = (
+    ('jpg', 'JPEG', {'quality': 80, 'optimize': True, 'progressive': True}),
+    ('webp', 'WEBP', {'quality': 75, 'method': 4}),
+)
+
+
+def widths():
+    # Cards are 350 CSS pixels wide; 700 covers 2x screens.
+    return tuple(getattr(settings, 'THUMBNAIL_WIDTHS', (350, 700)))
+
+
+def variant_name(name, width, extension):
+    """``hotel_images/spa.jpg`` -> ``hotel_images/spa.350w.webp``, stored beside the original."""
+    return f'{os.path.splitext(name)[0]}.{width}w.{extension}'
+
+
+def is_variant(name):
+    stem = os.path.splitext(name)[0]
+    return any(stem.endswith(f'.{width}w') for width in widths())
+
+
+def planned_widths(original_width):
+    """Widths worth generating for an original this wide.
+
+    Originals are never upscaled; one narrower than every width is recompressed at its own size
+    under the smallest width's name, so the page always finds it.
+    """
+    return [width for width in widths() if width <= original_width] or [min(widths())]
+
+
+def _flatten(image):
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def generate_variants(storage, name, force=False):
+    """Write the resized, recompressed variants of ``name`` into ``storage``; returns the names written."""
+    with storage.open(name, 'rb') as fh:
+        image = _flatten(Image.open(fh))
+
+    written = []
+    for width in planned_widths(image.width):
+        resized = image if width >= image.width else image.resize(
+            (width, round(image.height * width / image.width)), Image.LANCZOS)
+        for extension, image_format, options in FORMATS:
+            target = variant_name(name, width, extension)
+            if storage.exists(target):
+                if not force:
+                    continue
+                storage.delete(target)
+            buffer = BytesIO()
+            resized.save(buffer, image_format, **options)
+            storage.save(target, ContentFile(buffer.getvalue()))
+            written.append(target)
+    return written
+
+
+def has_variants(field_file):
+    return field_file.storage.exists(variant_name(field_file.name, min(widths()), FORMATS[0][0]))
+
+
+def find_variants(exists, name):
+    """Return ``{extension: [(variant name, width), ...]}`` for the variants of ``name`` that exist.
+
+    ``exists`` checks a name in whichever storage holds the original.
+    """
+    found = {}
+    for extension, _, _ in FORMATS:
+        for width in widths():
+            target = variant_name(name, width, extension)
+            if exists(target):
+                found.setdefault(extension, []).append((target, width))
+    return found
+
+
+class ThumbnailQueue:
+    """Background worker that makes image variants after an upload, off the request thread."""
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def submit(self, storage, name, on_done=None):
+        """Queue variants of ``name``; ``on_done()`` runs in the worker once they are written."""
+        self._ensure_worker()
+        self._queue.put((storage, name, on_done))
+
+    def join(self):
+        """Block until everything submitted so far has been processed."""
+        self._queue.join()
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='thumbnail-queue', daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            storage, name, on_done = self._queue.get()
+            try:
+                written = generate_variants(storage, name, force=True)
+                if on_done is not None:
+                    on_done()
+            except Exception:
+                logger.exception('thumbnails failed name=%s', name)
+            else:
+                logger.info('thumbnails generated name=%s variants=%d', name, len(written))
+            finally:
+                self._queue.task_done()
+
+
+thumbnail_queue = ThumbnailQueue()
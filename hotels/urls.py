@@ -1,16 +1,39 @@
 from django.urls import path
 from .views import hotel_detail, reserve_service, room_service_request, register, \
-    custom_logout_view, CustomLoginView, UserReservationsView
+    custom_logout_view, CustomLoginView, UserReservationsView, service_availability, hotel_availability, \
+    dispatch_board, dispatch_updates, dispatch_complete, hotel_detail_async, service_availability_async, \
+    AsyncUserReservationsView, request_metrics_report, export_reservations, export_room_service_requests, \
+    rollup_dashboard, service_quote, hold_slots, cancel_reservations, reschedule_reservations, \
+    dispatch_updates_async
 
 
 urlpatterns = [
     # path('', hotel_list, name='hotel_list'),
     path('hotel/<int:hotel_id>/', hotel_detail, name='hotel_detail'),
+    path('hotel/<int:hotel_id>/availability/', hotel_availability, name='hotel_availability'),
+    path('hotel/<int:hotel_id>/dispatch/', dispatch_board, name='dispatch_board'),
+    path('hotel/<int:hotel_id>/dispatch/updates/', dispatch_updates, name='dispatch_updates'),
+    path('hotel/<int:hotel_id>/dispatch/complete/', dispatch_complete, name='dispatch_complete'),
 
     path('reserve/<int:service_id>/', reserve_service, name='reserve_service'),
+    path('reserve/<int:service_id>/availability/', service_availability, name='service_availability'),
+    path('reserve/<int:service_id>/quote/', service_quote, name='service_quote'),
+    path('reserve/<int:service_id>/hold/', hold_slots, name='hold_slots'),
     path('room_service_request/<int:room_service_id>/', room_service_request, name='room_service_request'),
+    path('metrics/', request_metrics_report, name='request_metrics'),
+    path('dashboard/', rollup_dashboard, name='rollup_dashboard'),
+    path('exports/reservations/', export_reservations, name='export_reservations'),
+    path('exports/room_service_requests/', export_room_service_requests, name='export_room_service_requests'),
     path('register/', register, name='register'),
     path('login/', CustomLoginView.as_view(), name='login'),
     path('logout/', custom_logout_view, name='logout'),
     path('reservations/', UserReservationsView.as_view(), name='user_reservations'),
+    path('reservations/cancel/', cancel_reservations, name='cancel_reservations'),
+    path('reservations/reschedule/', reschedule_reservations, name='reschedule_reservations'),
+
+    path('async/hotel/<int:hotel_id>/', hotel_detail_async, name='hotel_detail_async'),
+    path('async/reserve/<int:service_id>/availability/', service_availability_async,
+         name='service_availability_async'),
+    path('async/reservations/', AsyncUserReservationsView.as_view(), name='user_reservations_async'),
+    path('async/hotel/<int:hotel_id>/dispatch/updates/', dispatch_updates_async, name='dispatch_updates_async'),
 ]
\ No newline at end of file
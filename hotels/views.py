@@ -1,45 +1,85 @@
+import json
+import logging
+import mimetypes
+import posixpath
+from functools import lru_cache, wraps
+from urllib.parse import urlencode
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import logout, login
-from django.contrib.auth.views import LoginView
-from django.http import JsonResponse
-from django.shortcuts import render, redirect, get_object_or_404
+from django.contrib.auth.views import LoginView, redirect_to_login
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import PermissionDenied
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, JsonResponse, \
+    StreamingHttpResponse
+from django.db.models import Q
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.urls import reverse_lazy
-from datetime import datetime, time, timedelta
-from django.utils.timezone import make_aware, now
-from hotels.models import (Hotel, Service, RoomService, HotelRegisteredUser, AvailableTime, Reservation,
-                           RoomServiceRequest)
+from django.urls import reverse, reverse_lazy
+from django.utils.http import http_date
+from django.views.decorators.http import require_POST, require_safe
+from django.views.static import was_modified_since
+from datetime import datetime, timedelta
+from django.utils.timezone import localtime, make_aware, now
+from hotels import availability, booking, caching, dispatch, exports, holds, pricing, registration, \
+    request_metrics, rollups, schedules
+from hotels.models import ArchivedReservation, Hotel, Service, RoomService, HotelRegisteredUser, Reservation, \
+    RoomServiceRequest
+from hotels.room_service_queue import room_service_queue
 from hotels.forms import CustomUserCreationForm, CustomAuthenticationForm, RoomServiceRequestForm
-from django.views.generic import ListView
+from django.views.generic import ListView, View
 from django.contrib.auth.mixins import LoginRequiredMixin
-from decimal import Decimal
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CALENDAR_DAYS = 31
+MAX_CALENDAR_DAYS = 366
+DEFAULT_DASHBOARD_DAYS = 30
+MAX_QUOTE_SLOTS = 1000
+MAX_HOLD_SLOTS = 48
+MAX_BULK_RESERVATIONS = 1000
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+STATIC_CACHE_CONTROL = 'public, max-age=300'
+STATIC_ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
 
 
 def hotel_detail(request, hotel_id=1):  # default to hotel_id=1
     hotel = get_object_or_404(Hotel, id=hotel_id)
-    is_registered = False
-    if request.user.is_authenticated:
-        is_registered = HotelRegisteredUser.objects.filter(
-            hotel=hotel,
-            private_number=request.user.private_number
-        ).exists()
+    is_registered = registration.is_registered(request.user, hotel.id)
 
     return render(request, 'hotel_detail.html', {
         'hotel': hotel,
-        'is_registered': is_registered
+        'is_registered': is_registered,
+        'viewer_state': caching.viewer_state(request.user, is_registered),
+        'cache_timeout': caching.hotel_detail_timeout(),
+        'services': hotel.services.all(),
+        'room_services': hotel.room_services.all(),
     })
 
 
-@login_required
-def reserve_service(request, service_id):
-    service = get_object_or_404(Service, id=service_id)
+def _redirect_to_hotel(request, obj):
+    return redirect('hotel_detail', hotel_id=obj.hotel_id)
+
+
+def _not_registered(request, obj):
+    logger.info('hotel registration denied path=%s user_id=%s', request.path, request.user.id)
+    return JsonResponse({'error': 'User not registered at this hotel'}, status=400)
+
 
-    if not HotelRegisteredUser.objects.filter(
-            hotel=service.hotel,
-            private_number=request.user.private_number
-    ).exists():
-        return redirect('hotel_detail', hotel_id=service.hotel.id)
+def _parse_slot_times(value):
+    """Parse a comma-separated list of ``YYYY-MM-DD HH:MM:SS`` slot times. Raises ``ValueError``."""
+    return [make_aware(datetime.strptime(time_str.strip(), "%Y-%m-%d %H:%M:%S"))
+            for time_str in value.split(',') if time_str.strip()]
 
+
+@login_required
+@registration.registration_required(Service, 'service_id', _redirect_to_hotel)
+def reserve_service(request, service):
     selected_date_str = request.GET.get('date')
     if not selected_date_str:
         # If no date is selected, handle GET requests
@@ -55,26 +95,8 @@ def reserve_service(request, service_id):
     except ValueError:
         selected_date = now().date()
 
-    start_time = datetime.combine(selected_date, time(10, 0))
-    end_time = datetime.combine(selected_date, time(21, 0))
-    delta = timedelta(hours=1)
-    time_slots = []
-
-    current_time = make_aware(start_time)
-    end_time = make_aware(end_time)
-    while current_time <= end_time:
-        time_slots.append(current_time)
-        current_time += delta
-
-    reserved_times = Reservation.objects.filter(
-        service=service,
-        reserved_for__start_time__gte=start_time,
-        reserved_for__start_time__lt=end_time + timedelta(hours=1)
-    ).values_list('reserved_for__start_time', flat=True)
-    reserved_times_set = set(reserved_times)
-
-    available_times = sorted(slot for slot in time_slots
-                             if slot not in reserved_times_set and slot > now())
+    available_times = availability.open_slots(service, selected_date, after=now(), user=request.user)
+    capacity = schedules.get(service.id).capacity
 
     no_times_message = None
     if not available_times:
@@ -83,69 +105,40 @@ def reserve_service(request, service_id):
     if request.method == 'POST':
         reservation_times_str = request.POST.get('reservation_times')
         if reservation_times_str:
-            reservation_times = [make_aware(datetime.strptime(time_str.strip(), "%Y-%m-%d %H:%M:%S"))
-                                 for time_str in reservation_times_str.split(',') if time_str.strip()]
-
-            total_hours = len(reservation_times)
-            service_price = Decimal(service.price)
-            total_price = service_price * total_hours
-            discount_price = total_price * Decimal('0.2')
-
-            conflict_times = [time for time in reservation_times if time in reserved_times_set]
-            if conflict_times:
+            try:
+                reservations = booking.book_slots(request.user, service, _parse_slot_times(reservation_times_str))
+            except ValueError:
+                messages.error(request, 'The selected times could not be read. Please choose listed times.')
+            except booking.SlotHeldError as exc:
                 messages.error(request,
-                               f'The following times are already reserved: {", ".join([time.strftime("%Y-%m-%d %H:%M") for time in conflict_times])}. Please choose different times.')
-                return render(request, 'reserve_service.html', {
-                    'service': service,
-                    'available_times': available_times,
-                    'no_times_message': None,  # Clear this message
-                    'selected_date': selected_date
-                })
-            elif any(time <= now() for time in reservation_times):
+                               f'Another guest is booking these times right now: {", ".join([time.strftime("%Y-%m-%d %H:%M") for time in exc.times])}. Please choose different times.')
+            except booking.SlotConflictError as exc:
+                messages.error(request,
+                               f'The following times are already reserved: {", ".join([time.strftime("%Y-%m-%d %H:%M") for time in exc.times])}. Please choose different times.')
+            except booking.PastSlotError:
                 messages.error(request, 'Some of the selected times are in the past. Please choose future times.')
-                return render(request, 'reserve_service.html', {
-                    'service': service,
-                    'available_times': available_times,
-                    'no_times_message': None,
-                    'selected_date': selected_date
-                })
+            except booking.UnavailableSlotError:
+                messages.error(request, 'Some of the selected times are not offered. Please choose listed times.')
+            except booking.BookingError:
+                # Only separators were sent, e.g. " , ".
+                messages.error(request, 'You have not chosen any time slots.')
             else:
-                for reservation_time in reservation_times:
-                    available_time = AvailableTime.objects.filter(
-                        service=service,
-                        start_time=reservation_time,
-                        end_time=reservation_time + timedelta(hours=1)
-                    ).first()
-
-                    if available_time:
-                        available_time.is_reserved = True
-                        available_time.save()
-                    else:
-                        available_time = AvailableTime.objects.create(
-                            service=service,
-                            start_time=reservation_time,
-                            end_time=reservation_time + timedelta(hours=1),
-                            is_reserved=True
-                        )
-
-                    if not Reservation.objects.filter(
-                            user=request.user,
-                            service=service,
-                            reserved_for=available_time
-                    ).exists():
-                        Reservation.objects.create(
-                            user=request.user,
-                            service=service,
-                            reserved_for=available_time
-                        )
-
-                messages.success(request, f'Service reserved successfully. Total cost: ${discount_price:.2f}')
+                total = sum(reservation.price for reservation in reservations)
+                messages.success(request, f'Service reserved successfully. Total cost: ${total:.2f}')
                 return redirect('reserve_service', service_id=service.id)
+            return render(request, 'reserve_service.html', {
+                'service': service,
+                'available_times': availability.open_slots(service, selected_date, after=now(), user=request.user),
+                'capacity': capacity,
+                'no_times_message': None,  # Clear this message
+                'selected_date': selected_date
+            })
         else:
             messages.error(request, 'You have not chosen any time slots.')
             return render(request, 'reserve_service.html', {
                 'service': service,
                 'available_times': available_times,
+                'capacity': capacity,
                 # 'no_times_message': 'You have not chosen any time slots.',
                 'selected_date': selected_date
             })
@@ -153,36 +146,283 @@ def reserve_service(request, service_id):
     return render(request, 'reserve_service.html', {
         'service': service,
         'available_times': available_times,
+        'capacity': capacity,
         'no_times_message': no_times_message,
         'selected_date': selected_date
     })
 
 
 @login_required
-def room_service_request(request, room_service_id):
-    print(f"Room service request received for room_service_id: {room_service_id}")
-    room_service = get_object_or_404(RoomService, id=room_service_id)
+@registration.registration_required(Service, 'service_id', _not_registered)
+def service_quote(request, service):
+    try:
+        slot_times = _parse_slot_times(request.GET.get('times', ''))
+    except ValueError:
+        return JsonResponse({'error': 'times must be comma-separated YYYY-MM-DD HH:MM:SS values'}, status=400)
+    if not slot_times:
+        return JsonResponse({'error': 'No time slots were chosen.'}, status=400)
+    if len(slot_times) > MAX_QUOTE_SLOTS:
+        return JsonResponse({'error': f'At most {MAX_QUOTE_SLOTS} slots can be quoted at once'}, status=400)
+
+    schedule = schedules.get(service.id)
+    if not all(schedule.is_slot(slot_time) for slot_time in slot_times):
+        return JsonResponse({'error': 'Some of the selected times are not offered.'}, status=400)
+
+    quote = pricing.quote(service, set(slot_times), schedule)
+    return JsonResponse({
+        'service_id': service.id,
+        'hours': quote.hours,
+        'discount': quote.discount,
+        'total': quote.total,
+        'slots': [{'start': localtime(start_time), 'price': amount} for start_time, amount in quote.lines],
+    })
+
+
+@login_required
+@require_POST
+@registration.registration_required(Service, 'service_id', _not_registered)
+def hold_slots(request, service):
+    """Hold the guest's current slot selection for a few minutes; an empty selection releases it."""
+    try:
+        slot_times = _parse_slot_times(request.POST.get('times', ''))
+    except ValueError:
+        return JsonResponse({'error': 'times must be comma-separated YYYY-MM-DD HH:MM:SS values'}, status=400)
+    if len(slot_times) > MAX_HOLD_SLOTS:
+        return JsonResponse({'error': f'At most {MAX_HOLD_SLOTS} slots can be held at once'}, status=400)
+
+    schedule = schedules.get(service.id)
+    if not all(schedule.is_slot(slot_time) and slot_time > now() for slot_time in slot_times):
+        return JsonResponse({'error': 'Some of the selected times are not offered.'}, status=400)
+
+    held, unavailable, expires_at = holds.place(request.user, service, slot_times, schedule)
+    logger.info('slots held service_id=%s user_id=%s held=%d unavailable=%d',
+                service.id, request.user.id, len(held), len(unavailable))
+    return JsonResponse({
+        'service_id': service.id,
+        'held': [localtime(slot_time) for slot_time in held],
+        'unavailable': [localtime(slot_time) for slot_time in unavailable],
+        'expires_at': localtime(expires_at),
+    })
 
-    if not HotelRegisteredUser.objects.filter(
-            hotel=room_service.hotel,
-            private_number=request.user.private_number
-    ).exists():
-        print("User not registered at this hotel")
-        return JsonResponse({'error': 'User not registered at this hotel'}, status=400)
 
+@login_required
+@registration.registration_required(Service, 'service_id', _not_registered)
+def service_availability(request, service):
+    return _availability_calendar(request, [service.id])
+
+
+@login_required
+@registration.registration_required(Hotel, 'hotel_id', _not_registered)
+def hotel_availability(request, hotel):
+    return _availability_calendar(request, list(hotel.services.order_by('id').values_list('id', flat=True)))
+
+
+def _calendar_range(request):
+    """Return ``(start, end, None)`` for the requested range or ``(None, None, error_response)``."""
+    try:
+        start = datetime.strptime(request.GET['start'], '%Y-%m-%d').date() if 'start' in request.GET \
+            else now().date()
+        end = datetime.strptime(request.GET['end'], '%Y-%m-%d').date() if 'end' in request.GET \
+            else start + timedelta(days=DEFAULT_CALENDAR_DAYS - 1)
+    except ValueError:
+        return None, None, JsonResponse({'error': 'Dates must use the YYYY-MM-DD format'}, status=400)
+    if end < start or (end - start).days >= MAX_CALENDAR_DAYS:
+        return None, None, JsonResponse(
+            {'error': f'The date range must cover 1 to {MAX_CALENDAR_DAYS} days'}, status=400)
+    return start, end, None
+
+
+def _calendar_day_json(index, day, services):
+    return (', ' if index else '') + json.dumps({
+        'date': day.isoformat(),
+        'services': [{
+            'id': service_id,
+            'free': [localtime(slot).strftime('%H:%M') for slot in free],
+            'taken': [localtime(slot).strftime('%H:%M') for slot in taken],
+        } for service_id, free, taken in services],
+    })
+
+
+def _availability_calendar(request, service_ids):
+    start, end, error = _calendar_range(request)
+    if error:
+        return error
+
+    def stream():
+        yield f'{{"start": "{start}", "end": "{end}", "days": ['
+        for index, (day, services) in enumerate(availability.iter_calendar(service_ids, start, end, after=now(),
+                                                                           user=request.user)):
+            yield _calendar_day_json(index, day, services)
+        yield ']}'
+
+    if isinstance(request, ASGIRequest):
+        # ASGI would buffer a sync iterator anyway, with a warning; the range is bounded by
+        # MAX_CALENDAR_DAYS, so build the body at once. /hotels/async/ streams it instead.
+        return HttpResponse(''.join(stream()), content_type='application/json')
+    return StreamingHttpResponse(stream(), content_type='application/json')
+
+
+@login_required
+@registration.registration_required(RoomService, 'room_service_id', _not_registered)
+def room_service_request(request, room_service):
     if request.method == 'POST':
-        print("Processing POST request")
-        room_service_request = RoomServiceRequest.objects.create(
+        if settings.ROOM_SERVICE_INTAKE == 'queue':
+            room_service_queue.submit(request.user.id, room_service.id)
+            logger.info('room_service_request queued room_service_id=%s user_id=%s',
+                        room_service.id, request.user.id)
+            return JsonResponse({'success': 'Room service request received.'}, status=202)
+
+        RoomServiceRequest.objects.create(
             user=request.user,
             room_service=room_service
         )
-        print("Room service request created successfully")
+        logger.info('room_service_request created room_service_id=%s user_id=%s', room_service.id, request.user.id)
         return JsonResponse({'success': 'Room service requested successfully.'})
 
-    print("Invalid request method")
+    logger.info('room_service_request rejected method=%s room_service_id=%s', request.method, room_service.id)
     return JsonResponse({'error': 'Invalid request method'}, status=400)
 
 
+def _staff_can_dispatch(user, hotel):
+    return user.is_superuser or user.hotel_id in (None, hotel.id)
+
+
+@staff_member_required
+def dispatch_board(request, hotel_id):
+    hotel = get_object_or_404(Hotel, id=hotel_id)
+    if not _staff_can_dispatch(request.user, hotel):
+        return redirect('hotel_detail', hotel_id=hotel.id)
+
+    pending, cursor = dispatch.board_snapshot(hotel.id)
+    # On ASGI the board long-polls the async endpoint, which waits without holding a thread.
+    on_asgi = isinstance(request, ASGIRequest)
+    return render(request, 'dispatch_board.html', {
+        'hotel': hotel,
+        'requests': [dispatch.serialize(room_service_request) for room_service_request in pending],
+        'cursor': cursor,
+        'updates_url': reverse('dispatch_updates_async' if on_asgi else 'dispatch_updates', args=[hotel.id]),
+        'updates_wait': dispatch.MAX_ASYNC_WAIT_SECONDS if on_asgi else dispatch.MAX_WAIT_SECONDS,
+    })
+
+
+def _dispatch_wait(request):
+    try:
+        return max(0, int(request.GET.get('wait', 0)))
+    except ValueError:
+        return 0
+
+
+def _dispatch_changes_json(request, changes):
+    return JsonResponse({
+        'cursor': dispatch.format_cursor(changes[-1]) if changes else request.GET.get('cursor', ''),
+        'requests': [dispatch.serialize(room_service_request) for room_service_request in changes],
+    })
+
+
+@staff_member_required
+def dispatch_updates(request, hotel_id):
+    hotel = get_object_or_404(Hotel, id=hotel_id)
+    if not _staff_can_dispatch(request.user, hotel):
+        return JsonResponse({'error': 'Not a member of this hotel\'s staff'}, status=403)
+
+    changes = dispatch.wait_for_changes(hotel.id, dispatch.parse_cursor(request.GET.get('cursor')),
+                                        _dispatch_wait(request))
+    return _dispatch_changes_json(request, changes)
+
+
+@staff_member_required
+@require_POST
+def dispatch_complete(request, hotel_id):
+    hotel = get_object_or_404(Hotel, id=hotel_id)
+    if not _staff_can_dispatch(request.user, hotel):
+        return JsonResponse({'error': 'Not a member of this hotel\'s staff'}, status=403)
+
+    try:
+        request_ids = [int(request_id) for request_id in request.POST.getlist('ids')]
+    except ValueError:
+        return JsonResponse({'error': 'Request ids must be integers'}, status=400)
+    updated = dispatch.complete_requests(hotel.id, request_ids)
+    logger.info('dispatch completed hotel_id=%s requested=%d updated=%d user_id=%s',
+                hotel.id, len(request_ids), updated, request.user.id)
+    return JsonResponse({'updated': updated})
+
+
+def _visible_hotel_id(user, hotel_id):
+    """Hotel staff only ever see their own hotel; other staff may look at any hotel, or all of them."""
+    if user.is_superuser or user.hotel_id is None:
+        return hotel_id
+    if hotel_id not in (None, user.hotel_id):
+        raise PermissionDenied
+    return user.hotel_id
+
+
+def _export(request, rows, columns, basename):
+    file_format = request.GET.get('format', 'csv')
+    if file_format not in exports.FORMATS:
+        return JsonResponse({'error': f'format must be one of {", ".join(exports.FORMATS)}'}, status=400)
+    try:
+        start, end = exports.parse_day(request.GET.get('start')), exports.parse_day(request.GET.get('end'))
+        hotel_id = int(request.GET['hotel']) if request.GET.get('hotel') else None
+    except ValueError:
+        return JsonResponse({'error': 'start and end must use the YYYY-MM-DD format and hotel must be an id'},
+                            status=400)
+    try:
+        hotel_id = _visible_hotel_id(request.user, hotel_id)
+    except PermissionDenied:
+        return JsonResponse({'error': 'Not a member of this hotel\'s staff'}, status=403)
+
+    response = StreamingHttpResponse(
+        exports.serialize(rows(start, end, hotel_id), columns, file_format),
+        content_type=exports.CONTENT_TYPES[file_format])
+    response['Content-Disposition'] = f'attachment; filename="{basename}.{file_format}"'
+    return response
+
+
+@staff_member_required
+def export_reservations(request):
+    return _export(request, exports.reservation_rows, exports.RESERVATION_COLUMNS, 'reservations')
+
+
+@staff_member_required
+def export_room_service_requests(request):
+    return _export(request, exports.room_service_rows, exports.ROOM_SERVICE_COLUMNS, 'room_service_requests')
+
+
+@staff_member_required
+@require_safe
+def rollup_dashboard(request):
+    end = localtime().date()
+    start = end - timedelta(days=DEFAULT_DASHBOARD_DAYS - 1)
+    hotel_id, error = None, None
+    try:
+        end = exports.parse_day(request.GET.get('end')) or end
+        start = exports.parse_day(request.GET.get('start')) or end - timedelta(days=DEFAULT_DASHBOARD_DAYS - 1)
+        hotel_id = int(request.GET['hotel']) if request.GET.get('hotel') else None
+    except ValueError:
+        error = 'Start and end must use the YYYY-MM-DD format and hotel must be an id.'
+    start, end = min(start, end), max(start, end)
+    hotel_id = _visible_hotel_id(request.user, hotel_id)
+
+    hotels = Hotel.objects.only('name').order_by('name')
+    if not request.user.is_superuser and request.user.hotel_id is not None:
+        hotels = hotels.filter(id=request.user.hotel_id)
+    return render(request, 'rollup_dashboard.html', {
+        'start': start,
+        'end': end,
+        'hotel_id': hotel_id,
+        'hotels': hotels,
+        'error': error,
+        **rollups.dashboard(start, end, hotel_id),
+    })
+
+
+@staff_member_required
+def request_metrics_report(request):
+    if request.method == 'POST':
+        request_metrics.reset()
+    return JsonResponse(request_metrics.snapshot())
+
+
 def register(request):
     if request.method == 'POST':
         form = CustomUserCreationForm(request.POST)
@@ -219,10 +459,282 @@ def custom_logout_view(request):
     return redirect('hotel_detail', hotel_id=1)
 
 
-class UserReservationsView(LoginRequiredMixin, ListView):
+class ReservationPageMixin:
+    """Keyset pagination over the signed-in guest's reservations, newest first.
+
+    ``?archived=1`` pages through the reservations the retention job has archived instead.
+    """
+    page_size = 25
+
+    def get_queryset(self):
+        if self.archived_only():
+            reservations = ArchivedReservation.objects.filter(user=self.request.user).order_by(
+                '-reservation_date', '-id')
+        else:
+            reservations = Reservation.objects.filter(user=self.request.user).select_related(
+                'service', 'reserved_for'
+            ).order_by('-reservation_date', '-id')
+            if self.upcoming_only():
+                reservations = reservations.filter(reserved_for__start_time__gte=now())
+
+        cursor = self.get_cursor()
+        if cursor:
+            reservation_date, reservation_id = cursor
+            reservations = reservations.filter(
+                Q(reservation_date__lt=reservation_date) |
+                Q(reservation_date=reservation_date, id__lt=reservation_id)
+            )
+        return reservations
+
+    def split_page(self, rows):
+        """Trim the look-ahead row fetched past the page and build the pagination context."""
+        next_page_url = None
+        if len(rows) > self.page_size:
+            rows = rows[:self.page_size]
+            last = rows[-1]
+            next_page_url = self.page_url(cursor=f'{last.reservation_date.isoformat()},{last.id}')
+        return rows, {
+            'upcoming_only': self.upcoming_only(),
+            'archived_only': self.archived_only(),
+            'is_first_page': self.get_cursor() is None,
+            'first_page_url': self.page_url(),
+            'next_page_url': next_page_url,
+            'toggle_upcoming_url': '?' + urlencode({} if self.upcoming_only() else {'upcoming': 1}),
+            'toggle_archived_url': '?' + urlencode({} if self.archived_only() else {'archived': 1}),
+        }
+
+    def upcoming_only(self):
+        return bool(self.request.GET.get('upcoming')) and not self.archived_only()
+
+    def archived_only(self):
+        return bool(self.request.GET.get('archived'))
+
+    def get_cursor(self):
+        try:
+            reservation_date, reservation_id = self.request.GET['cursor'].split(',')
+            return datetime.fromisoformat(reservation_date), int(reservation_id)
+        except (KeyError, ValueError):
+            return None
+
+    def page_url(self, cursor=None):
+        params = {'archived': 1} if self.archived_only() else {'upcoming': 1} if self.upcoming_only() else {}
+        if cursor:
+            params['cursor'] = cursor
+        return '?' + urlencode(params)
+
+
+class UserReservationsView(LoginRequiredMixin, ReservationPageMixin, ListView):
     model = Reservation
     template_name = 'user_reservations.html'
     context_object_name = 'reservations'
 
-    def get_queryset(self):
-        return Reservation.objects.filter(user=self.request.user).order_by('-reservation_date')
+    def get_context_data(self, **kwargs):
+        page, pagination = self.split_page(list(self.object_list[:self.page_size + 1]))
+        context = super().get_context_data(object_list=page, **kwargs)
+        context.update(pagination)
+        return context
+
+
+def _manageable_reservations(user):
+    """Guests manage their own reservations; staff also manage every reservation at the hotels they run."""
+    reservations = Reservation.objects.all()
+    if not user.is_staff:
+        return reservations.filter(user=user)
+    if user.is_superuser or user.hotel_id is None:
+        return reservations
+    return reservations.filter(Q(user=user) | Q(service__hotel_id=user.hotel_id))
+
+
+def _reservation_ids(request):
+    """Return ``(ids, None)`` for the posted ``ids`` or ``(None, error_response)``."""
+    try:
+        reservation_ids = [int(reservation_id) for reservation_id in request.POST.getlist('ids')]
+    except ValueError:
+        return None, JsonResponse({'error': 'Reservation ids must be integers'}, status=400)
+    if not reservation_ids:
+        return None, JsonResponse({'error': 'No reservations were chosen.'}, status=400)
+    if len(reservation_ids) > MAX_BULK_RESERVATIONS:
+        return None, JsonResponse(
+            {'error': f'At most {MAX_BULK_RESERVATIONS} reservations can be changed at once'}, status=400)
+    return reservation_ids, None
+
+
+def _outcomes_json(outcomes):
+    return JsonResponse({'results': [{'id': reservation_id, 'status': outcome}
+                                     for reservation_id, outcome in outcomes.items()]})
+
+
+@login_required
+@require_POST
+def cancel_reservations(request):
+    reservation_ids, error = _reservation_ids(request)
+    if error:
+        return error
+    outcomes = booking.cancel_reservations(reservation_ids, _manageable_reservations(request.user))
+    logger.info('reservations cancelled user_id=%s requested=%d cancelled=%d', request.user.id,
+                len(outcomes), list(outcomes.values()).count(booking.CANCELLED))
+    return _outcomes_json(outcomes)
+
+
+@login_required
+@require_POST
+def reschedule_reservations(request):
+    """Move each reservation in ``ids`` to the start time at the same position in ``times``."""
+    reservation_ids, error = _reservation_ids(request)
+    if error:
+        return error
+    try:
+        slot_times = _parse_slot_times(','.join(request.POST.getlist('times')))
+    except ValueError:
+        return JsonResponse({'error': 'times must be YYYY-MM-DD HH:MM:SS values'}, status=400)
+    if len(slot_times) != len(reservation_ids):
+        return JsonResponse({'error': 'Give one time for every reservation id'}, status=400)
+
+    try:
+        outcomes = booking.reschedule_reservations(zip(reservation_ids, slot_times),
+                                                   _manageable_reservations(request.user))
+    except booking.SlotConflictError:
+        return JsonResponse({'error': 'Another booking took some of these slots; please try again.'}, status=409)
+    logger.info('reservations rescheduled user_id=%s requested=%d rescheduled=%d', request.user.id,
+                len(outcomes), list(outcomes.values()).count(booking.RESCHEDULED))
+    return _outcomes_json(outcomes)
+
+
+# Async read paths, served under /hotels/async/ when the project runs on ASGI
+# (see Hotel_management/asgi.py). Django 5.0's login_required does not wrap coroutines,
+# hence the local decorator.
+
+def _async_login_required(view):
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        request.user = await request.auser()
+        if not request.user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+async def hotel_detail_async(request, hotel_id=1):
+    hotel = await aget_object_or_404(Hotel, id=hotel_id)
+    request.user = await request.auser()
+    is_registered = await registration.ais_registered(request.user, hotel.id)
+    viewer_state = caching.viewer_state(request.user, is_registered)
+
+    context = {
+        'hotel': hotel,
+        'is_registered': is_registered,
+        'viewer_state': viewer_state,
+        'cache_timeout': caching.hotel_detail_timeout(),
+        # Left lazy so a cached fragment costs no query; loaded below on a cache miss.
+        'services': hotel.services.all(),
+        'room_services': hotel.room_services.all(),
+    }
+    if not await caching.ahas_hotel_detail(hotel.id, viewer_state):
+        context['services'] = [service async for service in hotel.services.all()]
+        context['room_services'] = [room_service async for room_service in hotel.room_services.all()]
+    return await sync_to_async(render)(request, 'hotel_detail.html', context)
+
+
+@_async_login_required
+@registration.registration_required(Service, 'service_id', _not_registered)
+async def service_availability_async(request, service):
+    start, end, error = _calendar_range(request)
+    if error:
+        return error
+
+    async def stream():
+        yield f'{{"start": "{start}", "end": "{end}", "days": ['
+        index = 0
+        async for day, services in availability.aiter_calendar([service.id], start, end, after=now(),
+                                                               user=request.user):
+            yield _calendar_day_json(index, day, services)
+            index += 1
+        yield ']}'
+
+    return StreamingHttpResponse(stream(), content_type='application/json')
+
+
+class AsyncUserReservationsView(ReservationPageMixin, View):
+    template_name = 'user_reservations.html'
+
+    async def get(self, request):
+        request.user = await request.auser()
+        if not request.user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+
+        rows = [reservation async for reservation in self.get_queryset()[:self.page_size + 1]]
+        page, pagination = self.split_page(rows)
+        return await sync_to_async(render)(request, self.template_name, {'reservations': page, **pagination})
+
+
+async def dispatch_updates_async(request, hotel_id):
+    request.user = await request.auser()
+    if not (request.user.is_active and request.user.is_staff):
+        return redirect_to_login(request.get_full_path(), reverse('admin:login'))
+    hotel = await aget_object_or_404(Hotel, id=hotel_id)
+    if not _staff_can_dispatch(request.user, hotel):
+        return JsonResponse({'error': 'Not a member of this hotel\'s staff'}, status=403)
+
+    changes = await dispatch.await_for_changes(hotel.id, dispatch.parse_cursor(request.GET.get('cursor')),
+                                               _dispatch_wait(request))
+    return _dispatch_changes_json(request, changes)
+
+
+@lru_cache
+def _fingerprinted_static_names():
+    return frozenset(getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+
+def _encoding_qualities(header):
+    """Map each content coding listed in an Accept-Encoding header to its ``q`` value."""
+    qualities = {}
+    for item in header.split(','):
+        coding, *params = item.split(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+    return qualities
+
+
+@require_safe
+def serve_static(request, path):
+    """Serve collected static files with far-future caching for fingerprinted names.
+
+    Picks the pre-compressed ``.br`` or ``.gz`` copy written by collectstatic when the client
+    accepts it. Unhashed names are only cached briefly since their content can change.
+    """
+    name = posixpath.normpath(path).lstrip('/')
+    if name.startswith('..') or name.endswith(('.br', '.gz')) or not staticfiles_storage.exists(name):
+        raise Http404(f'"{path}" does not exist')
+
+    served, content_encoding = name, None
+    qualities = _encoding_qualities(request.headers.get('Accept-Encoding', ''))
+    for encoding, suffix in STATIC_ENCODINGS:
+        # q=0 refuses a coding; "*" covers the ones not listed by name.
+        if qualities.get(encoding, qualities.get('*', 0)) > 0 and staticfiles_storage.exists(name + suffix):
+            served, content_encoding = name + suffix, encoding
+            break
+
+    full_path = staticfiles_storage.path(served)
+    modified = staticfiles_storage.get_modified_time(served).timestamp()
+    if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), modified):
+        response = HttpResponseNotModified()
+    else:
+        content_type, _ = mimetypes.guess_type(name)
+        response = FileResponse(open(full_path, 'rb'), content_type=content_type or 'application/octet-stream')
+        response['Last-Modified'] = http_date(modified)
+        if content_encoding:
+            response['Content-Encoding'] = content_encoding
+    response['Vary'] = 'Accept-Encoding'
+    response['Cache-Control'] = (IMMUTABLE_CACHE_CONTROL if name in _fingerprinted_static_names()
+                                 else STATIC_CACHE_CONTROL)
+    return response